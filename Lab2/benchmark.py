@@ -0,0 +1,292 @@
+"""Замеры производительности конвертера валют.
+
+Курсы и история загружаются с локальной заглушки ЦБ (cbr_stub_server.py)
+в отдельный временный каталог данных, поэтому сеть и рабочие файлы
+конвертера не нужны. Замеряются:
+
+    convert    - CurrencyRates.convert и convert_many (конвертаций в секунду)
+    history    - convert_on и convert_many_on по истории курсов
+    fetch      - разбор XML ЦБ, загрузка с разбором и условный запрос (304)
+    snapshot   - save_rates, load_rates и чтение файла снимка
+    keystroke  - от нажатия клавиши в поле CurrencyConverter до записи
+                 сумм во все видимые поля (платформа Qt offscreen)
+
+    python benchmark.py                                  # -> benchmark_results.json
+    python benchmark.py --output new.json --compare benchmark_results.json
+    python benchmark.py --only convert,fetch --history-days 90
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Окно конвертера создается без экрана; переменная должна быть задана до загрузки Qt
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+from cbr_stub_server import CbrStubServer
+from currency_convertor import CurrencyConverter
+from currency_rates import CurrencyRates
+from rate_history import cbr_fetch_day
+from rate_snapshot import load_snapshot
+from rate_sources import READ_CHUNK_SIZE, cbr_xml_source, create_session, parse_cbr_xml
+
+RESULTS_FILE = "benchmark_results.json"
+BENCHMARKS = ("convert", "history", "fetch", "snapshot", "keystroke")
+
+
+def summarize(samples):
+    """Статистика времени выполнения в миллисекундах"""
+    samples_ms = sorted(sample * 1000 for sample in samples)
+    return {
+        "runs": len(samples_ms),
+        "median_ms": statistics.median(samples_ms),
+        "p95_ms": samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))],
+        "min_ms": samples_ms[0],
+    }
+
+
+def measure(func, repeat, warmup=3):
+    """Время каждого из repeat вызовов func после нескольких прогревочных"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def throughput(func, operations, repeat=5):
+    """Операций в секунду по лучшему из repeat прогонов func, выполняющей operations операций"""
+    best = min(measure(func, repeat, warmup=1))
+    return {"operations": operations, "ops_per_s": operations / best}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Скрывает сообщения CurrencyRates о загрузке и сохранении курсов"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class Benchmark:
+    def __init__(self, app, stub, data_dir, history_days, size):
+        self.app = app
+        self.stub = stub
+        self.data_dir = data_dir
+        self.size = size
+        with quiet():
+            self.rates = CurrencyRates([cbr_xml_source(stub.daily_url)], data_dir=data_dir)
+            self.load_history(history_days)
+            self.refresh()
+        self.codes = self.rates.codes
+        self.rng = np.random.default_rng(0)
+
+    def load_history(self, days):
+        session = create_session()
+        end = date.today()
+        self.rates.history.backfill(end - timedelta(days=days), end,
+                                    cbr_fetch_day(session, self.stub.daily_url))
+        session.close()
+
+    def refresh(self):
+        """Загружает курсы с заглушки и дожидается их обработки в потоке Qt"""
+        self.rates.update_rates()
+        self.rates.fetcher.wait()
+        self.app.processEvents()
+
+    def bench_convert(self):
+        rates, codes = self.rates, self.codes
+        pairs = [(codes[i % len(codes)], codes[(i * 7 + 3) % len(codes)]) for i in range(10000)]
+
+        def scalar():
+            for from_curr, to_curr in pairs:
+                rates.convert(from_curr, to_curr, 100.0)
+
+        amounts = self.rng.uniform(1, 1e6, self.size)
+        from_codes = self.rng.choice(codes, self.size)
+        to_codes = self.rng.choice(codes, self.size)
+        return {
+            "scalar": throughput(scalar, len(pairs)),
+            "batch_one_pair": throughput(lambda: rates.convert_many("USD", "RUB", amounts), self.size),
+            "batch_mixed_pairs": throughput(
+                lambda: rates.convert_many(from_codes, to_codes, amounts), self.size),
+        }
+
+    def bench_history(self):
+        rates = self.rates
+        cache = rates.history.cache
+        first, last = cache.days[0].astype(date), cache.days[-1].astype(date)
+        span = (last - first).days + 1
+        days = [(first + timedelta(days=i % span)).isoformat() for i in range(10000)]
+
+        def scalar():
+            for day in days:
+                rates.convert_on("USD", "EUR", 100.0, day)
+
+        amounts = self.rng.uniform(1, 1e6, self.size)
+        batch_days = cache.days[0] + self.rng.integers(0, span, self.size).astype("timedelta64[D]")
+        from_codes = self.rng.choice(cache.codes, self.size)
+        return {
+            "days": len(cache),
+            "scalar": throughput(scalar, len(days)),
+            "batch_mixed_pairs": throughput(
+                lambda: rates.convert_many_on(from_codes, "RUB", amounts, batch_days), self.size),
+        }
+
+    def bench_fetch(self):
+        with open(os.path.join(self.stub.fixtures_dir, "XML_daily.xml"), "rb") as f:
+            body = f.read()
+        chunks = [body[i:i + READ_CHUNK_SIZE] for i in range(0, len(body), READ_CHUNK_SIZE)]
+        session = create_session()
+
+        def cold():
+            # Новый источник без ETag: полный ответ и его разбор
+            cbr_xml_source(self.stub.daily_url).fetch(session)
+
+        source = cbr_xml_source(self.stub.daily_url)
+        source.fetch(session)
+        results = {
+            "response_bytes": len(body),
+            "parse": summarize(measure(lambda: parse_cbr_xml(iter(chunks)), 200)),
+            "fetch_parse": summarize(measure(cold, 100)),
+            "fetch_not_modified": summarize(measure(lambda: source.fetch(session), 100)),
+        }
+        session.close()
+        return results
+
+    def bench_snapshot(self):
+        rates = self.rates
+        with quiet():
+            results = {
+                "save": summarize(measure(rates.save_rates, 30)),
+                "load": summarize(measure(rates.load_rates, 30)),
+                "read_file": summarize(measure(lambda: load_snapshot(rates.snapshot_file), 30)),
+            }
+        results["file_bytes"] = os.path.getsize(rates.snapshot_file)
+        return results
+
+    def bench_keystroke(self, presses=300):
+        # Конвертер берет каталог данных из окружения и находит в нем свежие курсы
+        os.environ["CURRENCY_DATA_DIR"] = self.data_dir
+        with quiet():
+            converter = CurrencyConverter()
+        converter.rates.stop_auto_refresh()
+        converter.resize(420, 700)
+        converter.show()
+        self.app.processEvents()
+
+        line_edit = converter.fields["USD"].input
+        line_edit.setText("1")
+        line_edit.setFocus()
+        self.app.processEvents()
+
+        samples = []
+        for number in range(presses):
+            # Дописываем цифры до шести знаков, затем стираем до одного
+            key = Qt.Key_Backspace if (number // 5) % 2 else Qt.Key_2 + number % 5
+            start = time.perf_counter()
+            QTest.keyClick(line_edit, key)
+            while converter.recompute_timer.isActive():
+                self.app.processEvents()
+            # Отрисовка измененных полей
+            self.app.processEvents()
+            samples.append(time.perf_counter() - start)
+
+        results = summarize(samples)
+        results["fields"] = len(converter.fields)
+        results["visible_fields"] = len(converter.visible_codes())
+        converter.close()
+        return results
+
+    def run(self, names):
+        results = {}
+        for name in names:
+            print(f"{name}...", file=sys.stderr)
+            results[name] = getattr(self, "bench_" + name)()
+        return results
+
+
+def flatten(results, prefix=""):
+    """{'convert': {'scalar': {'ops_per_s': 1}}} -> {'convert.scalar.ops_per_s': 1}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def print_results(results, baseline=None):
+    current = flatten(results)
+    previous = flatten(baseline) if baseline else {}
+    for key, value in current.items():
+        line = f"{key:45} {value:>14,.3f}"
+        old = previous.get(key)
+        if old:
+            line += f"   было {old:>14,.3f}  ({(value - old) / old * 100:+.1f}%)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности конвертера валют")
+    parser.add_argument("--output", default=RESULTS_FILE, help="файл для результатов (JSON)")
+    parser.add_argument("--compare", help="файл прошлых результатов для сравнения")
+    parser.add_argument("--only", help="замеры через запятую: " + ",".join(BENCHMARKS))
+    parser.add_argument("--history-days", type=int, default=365,
+                        help="сколько дней истории загрузить с заглушки")
+    parser.add_argument("--size", type=int, default=1_000_000,
+                        help="число сумм для векторной конвертации")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    app = QApplication(sys.argv)
+    stub = CbrStubServer()
+    stub.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="currency-bench-") as data_dir:
+            benchmark = Benchmark(app, stub, data_dir, args.history_days, args.size)
+            results = benchmark.run(names)
+            benchmark.rates.close()
+    finally:
+        stub.stop()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Пакетная конвертация CSV-файлов с транзакциями без графического интерфейса.
+
+Входной файл: строки вида amount,currency,date[,...]. К каждой строке
+добавляется колонка с суммой в целевой валюте. Файл читается и пишется
+блоками, поэтому расход памяти не зависит от его размера.
+
+    python bulk_convert.py transactions.csv converted.csv --to RUB
+
+С ключом --historical сумма пересчитывается по курсу ЦБ на дату операции
+(дата в формате ГГГГ-ММ-ДД) из истории курсов RateHistory.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from currency_rates import CurrencyRates
+from rate_history import HistoryCache, to_days_array
+from rate_matrix import RateMatrix
+
+DEFAULT_CHUNK_ROWS = 200_000
+
+# Матрица курсов в процессе-обработчике (задается инициализатором пула);
+# для конвертации по датам вместо нее используется таблица истории
+_worker_matrix = None
+
+
+def _init_worker(rates):
+    global _worker_matrix
+    _worker_matrix = rates if isinstance(rates, HistoryCache) else RateMatrix(rates)
+
+
+def convert_chunk(lines, to_curr, delimiter=",", matrix=None):
+    """Конвертирует блок строк CSV.
+
+    matrix - RateMatrix (текущие курсы) или HistoryCache (курсы на дату
+    из третьей колонки). Возвращает (текст результата, число строк,
+    число строк с ошибками). Строки с неизвестной валютой, некорректной
+    суммой или датой получают пустое значение.
+    """
+    if matrix is None:
+        matrix = _worker_matrix
+
+    # Разбор блока создает сотни тысяч мелких списков, на которых сборщик
+    # мусора срабатывает впустую: на время блока он отключается
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _convert_chunk(lines, to_curr, delimiter, matrix)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _convert_chunk(lines, to_curr, delimiter, matrix):
+    lines = [line.rstrip("\r\n") for line in lines]
+    fields = [line.split(delimiter, 2) for line in lines]
+    historical = isinstance(matrix, HistoryCache)
+
+    valid = np.ones(len(lines), dtype=bool)
+    try:
+        amounts = np.array([f[0] for f in fields], dtype=np.float64)
+        codes = np.array([f[1].strip() for f in fields])
+    except (ValueError, IndexError):
+        # Медленный путь только для блоков с испорченными строками
+        amounts = np.zeros(len(lines), dtype=np.float64)
+        code_list = []
+        for i, f in enumerate(fields):
+            try:
+                amounts[i] = float(f[0])
+                code_list.append(f[1].strip())
+            except (ValueError, IndexError):
+                code_list.append("")
+                valid[i] = False
+        codes = np.array(code_list)
+
+    # Векторный поиск индексов валют; неизвестные коды помечаются как ошибки
+    positions = np.minimum(np.searchsorted(matrix.codes_array, codes), len(matrix.codes) - 1)
+    valid &= matrix.codes_array[positions] == codes
+    # float() и numpy принимают "nan" и "inf": такие суммы - ошибки, как и нечисловые
+    valid &= np.isfinite(amounts)
+    with np.errstate(over="ignore"):
+        if historical:
+            days = _parse_days(fields, delimiter, valid)
+            converted = matrix.convert_many(positions, matrix.index[to_curr], amounts, days)
+        else:
+            converted = amounts * matrix.matrix[positions, matrix.index[to_curr]]
+    # Нет курса на дату (NaN) или переполнение результата
+    valid &= np.isfinite(converted)
+
+    values = [f"{value:.2f}" for value in converted.tolist()]
+    invalid = np.flatnonzero(~valid)
+    for i in invalid.tolist():
+        values[i] = ""
+    out = "\n".join([f"{line}{delimiter}{value}" for line, value in zip(lines, values)])
+    return out + "\n" if out else "", len(lines), len(invalid)
+
+
+def _parse_days(fields, delimiter, valid):
+    """Даты операций из третьей колонки; строки с ошибкой в дате помечаются в valid"""
+    try:
+        return to_days_array([f[2].split(delimiter, 1)[0].strip() for f in fields])
+    except (ValueError, IndexError):
+        pass
+    # Медленный путь только для блоков с испорченными датами
+    days = np.zeros(len(fields), dtype='datetime64[D]')
+    for i, f in enumerate(fields):
+        try:
+            days[i] = np.datetime64(f[2].split(delimiter, 1)[0].strip(), 'D')
+        except (ValueError, IndexError):
+            valid[i] = False
+    return days
+
+
+def _read_chunks(f, chunk_rows):
+    while True:
+        chunk = list(islice(f, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _is_header(line, delimiter):
+    try:
+        float(line.split(delimiter, 1)[0])
+        return False
+    except ValueError:
+        return True
+
+
+def bulk_convert(input_path, output_path, to_curr="RUB", rates=None,
+                 chunk_rows=DEFAULT_CHUNK_ROWS, workers=None, delimiter=",", progress=None,
+                 historical=False):
+    """Потоково конвертирует CSV-файл и возвращает статистику.
+
+    workers - число процессов (None - по числу ядер, 1 - без пула).
+    progress(rows, elapsed) вызывается после записи каждого блока.
+    historical - конвертировать по курсу на дату операции, а не по текущему.
+    """
+    rates = rates or CurrencyRates()
+    if historical:
+        matrix = rates.history.cache
+        if not len(matrix):
+            raise KeyError("История курсов пуста: загрузите ее через rate_history.py backfill")
+        worker_rates = matrix
+    else:
+        matrix = rates.matrix
+        worker_rates = matrix.rub_rates()
+    if to_curr not in matrix.index:
+        raise KeyError(f"Неизвестная валюта: {to_curr}")
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    rows = errors = 0
+    with open(input_path, "r", encoding="utf-8", newline="") as src, \
+            open(output_path, "w", encoding="utf-8", newline="") as dst:
+        first = src.readline()
+        if not first:
+            return {"rows": 0, "errors": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        if _is_header(first, delimiter):
+            header = first.rstrip("\r\n")
+            dst.write(f"{header}{delimiter}amount_{to_curr}\n")
+            pending_first = []
+        else:
+            pending_first = [first]
+
+        def chunks():
+            first_chunk = pending_first + list(islice(src, chunk_rows - len(pending_first)))
+            if first_chunk:
+                yield first_chunk
+            yield from _read_chunks(src, chunk_rows)
+
+        def write(result):
+            nonlocal rows, errors
+            text, count, bad = result
+            dst.write(text)
+            rows += count
+            errors += bad
+            if progress:
+                progress(rows, time.perf_counter() - start)
+
+        if workers == 1:
+            for chunk in chunks():
+                write(convert_chunk(chunk, to_curr, delimiter, matrix))
+        else:
+            # Не больше двух блоков на процесс в работе: память ограничена,
+            # а порядок строк в результате сохраняется
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(worker_rates,)) as pool:
+                in_flight = deque()
+                for chunk in chunks():
+                    in_flight.append(pool.submit(convert_chunk, chunk, to_curr, delimiter))
+                    if len(in_flight) >= workers * 2:
+                        write(in_flight.popleft().result())
+                while in_flight:
+                    write(in_flight.popleft().result())
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "errors": errors,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная конвертация CSV-файлов с суммами")
+    parser.add_argument("input", help="входной CSV: amount,currency,date")
+    parser.add_argument("output", help="выходной CSV")
+    parser.add_argument("--to", default="RUB", help="целевая валюта (по умолчанию RUB)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="строк в одном блоке")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="число процессов (1 - без пула)")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--historical", action="store_true",
+                        help="конвертировать по курсу ЦБ на дату операции")
+    args = parser.parse_args()
+
+    def progress(rows, elapsed):
+        print(f"\rОбработано строк: {rows} ({rows / elapsed:,.0f} строк/с)",
+              end="", file=sys.stderr, flush=True)
+
+    stats = bulk_convert(args.input, args.output, args.to.upper(),
+                         chunk_rows=args.chunk_rows, workers=args.workers,
+                         delimiter=args.delimiter, progress=progress,
+                         historical=args.historical)
+    print(file=sys.stderr)
+    print(f"Готово: {stats['rows']} строк за {stats['seconds']:.2f} с "
+          f"({stats['rows_per_sec']:,.0f} строк/с), ошибок: {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Локальная замена сервера ЦБ РФ для проверки загрузки курсов без интернета.
+
+Отдает записанные ответы из каталога fixtures с заголовками ETag и
+Last-Modified и отвечает 304 на условные запросы. На запрос курсов за
+дату (?date_req=ДД/ММ/ГГГГ) отдается файл XML_daily_ДДММГГГГ.xml, а если
+его нет - ответ, построенный из основного: с датой последнего рабочего
+дня и курсами, детерминированно сдвинутыми от этой даты. Умеет имитировать
+сбои сервера (--fail-first) и медленную сеть (--delay).
+
+    python cbr_stub_server.py --port 8081
+    # затем CurrencyRates([cbr_xml_source("http://127.0.0.1:8081/scripts/XML_daily.asp")])
+"""
+import argparse
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Путь запроса -> (файл ответа, Content-Type)
+ROUTES = {
+    "/scripts/XML_daily.asp": ("XML_daily.xml", "application/xml; charset=windows-1251"),
+    "/daily_json.js": ("daily_json.js", "application/javascript; charset=utf-8"),
+}
+
+
+VALUE_PATTERN = re.compile(rb"<(Value|VunitRate)>([0-9]+,[0-9]+)</")
+
+
+def synthesize_day(body, day):
+    """Строит ответ ЦБ на дату из основного ответа.
+
+    Как и ЦБ, на выходные отдает курсы пятницы. Курсы умножаются на
+    множитель, зависящий только от даты, поэтому повторные запросы
+    дают одинаковый ответ.
+    """
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    factor = 1 + 0.05 * math.sin(day.toordinal() / 30)
+
+    def shift(match):
+        value = float(match.group(2).replace(b",", b".")) * factor
+        return b"<%s>%s</" % (match.group(1), f"{value:.4f}".replace(".", ",").encode())
+
+    body = re.sub(rb'Date="[0-9.]+"', b'Date="' + day.strftime("%d.%m.%Y").encode() + b'"', body, count=1)
+    return VALUE_PATTERN.sub(shift, body)
+
+
+class CbrStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело пишутся отдельно: без этого keep-alive ждет задержанного ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        if server.delay:
+            time.sleep(server.delay)
+
+        with server.lock:
+            fail = server.fail_remaining > 0
+            if fail:
+                server.fail_remaining -= 1
+        if fail:
+            self._send_empty(503)
+            return
+
+        url = urlparse(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            self._send_empty(404)
+            return
+        fixture, content_type = route
+        path = os.path.join(server.fixtures_dir, fixture)
+        day = None
+        date_req = parse_qs(url.query).get("date_req")
+        if date_req:
+            try:
+                day = datetime.strptime(date_req[0], "%d/%m/%Y").date()
+            except ValueError:
+                self._send_empty(400)
+                return
+            stem, ext = os.path.splitext(fixture)
+            dated = os.path.join(server.fixtures_dir, f"{stem}_{day:%d%m%Y}{ext}")
+            if os.path.exists(dated):
+                path, day = dated, None
+        with open(path, "rb") as f:
+            body = f.read()
+        if day is not None:
+            body = synthesize_day(body, day)
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        mtime = int(os.path.getmtime(path))
+
+        if self._not_modified(etag, mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            server.not_modified_count += 1
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент не дождался ответа (таймаут на его стороне)
+            pass
+
+    def _not_modified(self, etag, mtime):
+        # If-None-Match имеет приоритет над If-Modified-Since (RFC 7232)
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class CbrStubServer(ThreadingHTTPServer):
+    """HTTP-сервер с ответами из fixtures.
+
+    fail_first - сколько первых запросов получат 503,
+    delay - задержка перед каждым ответом в секундах.
+    Список путей запросов накапливается в requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, fixtures_dir=FIXTURES_DIR,
+                 fail_first=0, delay=0.0, verbose=False):
+        super().__init__((host, port), CbrStubHandler)
+        self.fixtures_dir = fixtures_dir
+        self.fail_remaining = fail_first
+        self.delay = delay
+        self.verbose = verbose
+        self.requests = []
+        self.not_modified_count = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def daily_url(self):
+        return self.base_url + "/scripts/XML_daily.asp"
+
+    @property
+    def json_url(self):
+        return self.base_url + "/daily_json.js"
+
+    def start(self):
+        """Запускает сервер в фоновом потоке и возвращает его адрес"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная замена сервера курсов ЦБ РФ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="каталог с ответами")
+    parser.add_argument("--fail-first", type=int, default=0,
+                        help="сколько первых запросов получат ответ 503")
+    parser.add_argument("--delay", type=float, default=0.0, help="задержка ответа, с")
+    args = parser.parse_args()
+
+    server = CbrStubServer(args.host, args.port, args.fixtures,
+                           args.fail_first, args.delay, verbose=True)
+    print(f"Сервер курсов: {server.daily_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
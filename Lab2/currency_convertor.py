@@ -1,44 +1,67 @@
 import sys
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QGroupBox, QLabel, 
-    QPushButton, QMessageBox, QHBoxLayout
+    QApplication, QWidget, QVBoxLayout, QGroupBox, QLabel,
+    QPushButton, QMessageBox, QHBoxLayout, QScrollArea, QStyle, QSystemTrayIcon
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QEvent, QRect
 
 from currency_field import CurrencyField
-from currency_rates import CurrencyRates
-from usd_currency import USDCurrency
-from eur_currency import EURCurrency
-from rub_currency import RUBCurrency
+from currency_rates import CurrencyRates, MAIN_CURRENCIES
+from rate_alerts import format_event
+
+# Сколько последних оповещений показывать в окне
+ALERTS_SHOWN = 5
 
 
 class CurrencyConverter(QWidget):
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("Конвертер валют (USD / EUR / RUB)")
+        self.setWindowTitle("Конвертер валют")
         self.setMinimumWidth(420)
 
         # Инициализация менеджера курсов
         self.rates = CurrencyRates()
-        self.updating = False
+        # Поля ввода по кодам валют в порядке отображения
+        self.fields = {}
+        # Последнее введенное значение (код, сумма) и рассчитанные по нему суммы
+        self.source = ("USD", 1.0)
+        self.values = {}
+        # Поля, которые были вне области прокрутки при последнем пересчете
+        self.stale_fields = set()
+        # Ошибки показываются окном только при обновлении по кнопке
+        self.manual_refresh = False
+        # Значок в системном лотке для всплывающих оповещений, создается при первом
+        self.tray_icon = None
 
-        # Инициализация валютных классов
-        self.usd = USDCurrency()
-        self.eur = EURCurrency()
-        self.rub = RUBCurrency()
+        # Пересчет откладывается до конца текущей итерации цикла событий:
+        # несколько правок подряд (ввод, вставка) дают один пересчет
+        self.recompute_timer = QTimer(self)
+        self.recompute_timer.setSingleShot(True)
+        self.recompute_timer.setInterval(0)
+        self.recompute_timer.timeout.connect(self.recompute)
 
         self.init_ui()
+        self.build_fields()
         self.connect_signals()
 
         # Установка начального значения
-        self.usd_field.set_value(1.00)
+        self.fields["USD"].set_value(1.00)
+        self.schedule_recompute("USD", 1.00)
+
+        # Курсы проверяются в фоне; пока идет загрузка, работают прежние
+        self.rates.start_auto_refresh()
 
     def init_ui(self):
-        # Создание полей ввода
-        self.usd_field = CurrencyField("USD")
-        self.eur_field = CurrencyField("EUR")
-        self.rub_field = CurrencyField("RUB")
+        # Поля ввода создаются по таблице курсов в build_fields
+        self.fields_widget = QWidget()
+        self.fields_layout = QVBoxLayout(self.fields_widget)
+        self.fields_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setWidget(self.fields_widget)
+        self.scroll_area.setMinimumHeight(200)
 
         # Кнопка обновления курсов
         self.update_button = QPushButton("Обновить курсы с ЦБ РФ")
@@ -50,16 +73,30 @@ class CurrencyConverter(QWidget):
         self.info_label.setFont(QFont("Consolas", 9))
         self.info_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
 
-        # Лейбл времени обновления
-        self.update_time_label = QLabel(f"Обновлено: {self.rates.get_last_updated()}")
+        info_scroll = QScrollArea()
+        info_scroll.setWidgetResizable(True)
+        info_scroll.setWidget(self.info_label)
+        info_scroll.setMinimumHeight(120)
+
+        # Задержка и состояние источников курсов
+        self.sources_label = QLabel(self.rates.get_sources_text())
+        self.sources_label.setFont(QFont("Consolas", 8))
+
+        # Последние оповещения о пересечении курсами уровней подписок
+        self.alerts_label = QLabel()
+        self.alerts_label.setWordWrap(True)
+        self.alerts_label.setFont(QFont("Consolas", 8))
+        self.alerts_label.setStyleSheet("color: #b00020;")
+        self.alerts_label.hide()
+
+        # Лейбл времени обновления и свежести курсов
+        self.update_time_label = QLabel(self.rates.get_status_text())
         self.update_time_label.setFont(QFont("Arial", 8))
         self.update_time_label.setAlignment(Qt.AlignRight)
 
         # Компоновка
         currencies_layout = QVBoxLayout()
-        currencies_layout.addWidget(self.usd_field)
-        currencies_layout.addWidget(self.eur_field)
-        currencies_layout.addWidget(self.rub_field)
+        currencies_layout.addWidget(self.scroll_area)
 
         box = QGroupBox("Конвертация")
         box.setLayout(currencies_layout)
@@ -70,64 +107,156 @@ class CurrencyConverter(QWidget):
         time_layout.addWidget(self.update_time_label)
 
         main_layout = QVBoxLayout()
-        main_layout.addWidget(box)
+        main_layout.addWidget(box, 2)
         main_layout.addWidget(self.update_button)
+        main_layout.addWidget(self.alerts_label)
         main_layout.addWidget(QLabel("Текущие курсы:"))
-        main_layout.addWidget(self.info_label)
+        main_layout.addWidget(info_scroll, 1)
+        main_layout.addWidget(QLabel("Источники:"))
+        main_layout.addWidget(self.sources_label)
         main_layout.addLayout(time_layout)
-        main_layout.addStretch()
         self.setLayout(main_layout)
 
-    def connect_signals(self):
-        # Подключение сигналов от полей ввода к валютам
-        self.usd_field.valueChanged.connect(self.usd.valueChanged.emit)
-        self.eur_field.valueChanged.connect(self.eur.valueChanged.emit)
-        self.rub_field.valueChanged.connect(self.rub.valueChanged.emit)
+    def build_fields(self):
+        """Создает поля ввода для всех валют из таблицы курсов.
+
+        Основные валюты идут первыми, остальные - по алфавиту.
+        Уже существующие поля сохраняются вместе с введенными значениями.
+        """
+        codes = [code for code in MAIN_CURRENCIES if code in self.rates.matrix]
+        codes += [code for code in self.rates.codes if code not in codes]
+        if codes == list(self.fields):
+            return
 
-        # Подключение сигналов валют к обработчикам
-        self.usd.valueChanged.connect(lambda v: self.convert_from("USD", v))
-        self.eur.valueChanged.connect(lambda v: self.convert_from("EUR", v))
-        self.rub.valueChanged.connect(lambda v: self.convert_from("RUB", v))
+        for code in list(self.fields):
+            if code not in codes:
+                field = self.fields.pop(code)
+                self.fields_layout.removeWidget(field)
+                field.deleteLater()
+
+        fields = {}
+        for position, code in enumerate(codes):
+            field = self.fields.get(code)
+            if field is None:
+                field = CurrencyField(code)
+                field.valueChanged.connect(
+                    lambda value, code=code: self.schedule_recompute(code, value))
+            self.fields_layout.insertWidget(position, field)
+            fields[code] = field
+        self.fields = fields
+        self.stale_fields = set(fields)
+
+    def connect_signals(self):
+        # При прокрутке и изменении размера заполняются ставшие видимыми поля
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.refresh_visible)
+        self.scroll_area.viewport().installEventFilter(self)
 
         # Подключение кнопки обновления курсов
-        self.update_button.clicked.connect(self.rates.update_rates)
-        
+        self.update_button.clicked.connect(self.on_update_clicked)
+
         # Подключение сигналов обновления курсов
         self.rates.rates_updated.connect(self.on_rates_updated)
         self.rates.rates_error.connect(self.on_rates_error)
+        self.rates.staleness_changed.connect(self.update_status)
+        self.rates.alerts_triggered.connect(self.on_alerts_triggered)
+
+        # Возраст курсов в строке состояния меняется и без событий
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(30000)
+        self.status_timer.timeout.connect(self.update_status)
+        self.status_timer.start()
+
+    def on_update_clicked(self):
+        self.manual_refresh = True
+        # Если курсы обновляет другой процесс, снимок только перечитывается
+        if not self.rates.update_rates() and not self.rates.staleness()['refreshing']:
+            self.manual_refresh = False
+
+    def update_status(self):
+        refreshing = self.rates.staleness()['refreshing']
+        self.update_button.setEnabled(not refreshing)
+        self.update_button.setText("Обновление курсов..." if refreshing else "Обновить курсы с ЦБ РФ")
+        self.update_time_label.setText(self.rates.get_status_text())
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.Resize, QEvent.Show):
+            QTimer.singleShot(0, self.refresh_visible)
+        return False
+
+    def schedule_recompute(self, from_currency, value):
+        """Запоминает последнюю правку; пересчет выполнится один раз за итерацию цикла событий"""
+        self.source = (from_currency, value)
+        if not self.recompute_timer.isActive():
+            self.recompute_timer.start()
+
+    def recompute(self):
+        self.convert_from(*self.source)
 
     def convert_from(self, from_currency, value):
-        if self.updating:
+        """Пересчитывает все валюты одной строкой матрицы и обновляет видимые поля"""
+        matrix = self.rates.matrix
+        if from_currency not in matrix:
             return
+        row = matrix.matrix[matrix.index[from_currency]] * value
+        self.values = dict(zip(matrix.codes, row.tolist()))
+        self.stale_fields = {code for code in self.fields if code != from_currency}
+        self.refresh_visible()
+
+    def visible_codes(self):
+        """Коды валют, поля которых попадают в видимую часть области прокрутки"""
+        viewport = self.scroll_area.viewport()
+        visible = QRect(0, self.scroll_area.verticalScrollBar().value(),
+                        viewport.width(), viewport.height())
+        return [code for code, field in self.fields.items()
+                if field.geometry().intersects(visible)]
 
-        self.updating = True
-
-        try:
-            if from_currency == "USD":
-                self.eur_field.set_value(self.rates.convert("USD", "EUR", value))
-                self.rub_field.set_value(self.rates.convert("USD", "RUB", value))
-            elif from_currency == "EUR":
-                self.usd_field.set_value(self.rates.convert("EUR", "USD", value))
-                self.rub_field.set_value(self.rates.convert("EUR", "RUB", value))
-            elif from_currency == "RUB":
-                self.usd_field.set_value(self.rates.convert("RUB", "USD", value))
-                self.eur_field.set_value(self.rates.convert("RUB", "EUR", value))
-        finally:
-            self.updating = False
+    def refresh_visible(self):
+        """Записывает рассчитанные суммы в видимые поля, еще не получившие их"""
+        if not self.stale_fields:
+            return
+        for code in self.visible_codes():
+            if code in self.stale_fields and code in self.values:
+                self.fields[code].set_value(self.values[code])
+                self.stale_fields.discard(code)
 
     def on_rates_updated(self):
         """Обновляет интерфейс при изменении курсов"""
         self.info_label.setText(self.rates.get_rates_text())
-        self.update_time_label.setText(f"Обновлено: {self.rates.get_last_updated()}")
-        
-        # Пересчитываем текущие значения
-        current_usd = self.usd_field.get_value()
-        if current_usd != 0:
-            self.usd_field.set_value(current_usd)
+        self.sources_label.setText(self.rates.get_sources_text())
+        self.update_status()
+        self.manual_refresh = False
+        self.build_fields()
+
+        # Пересчитываем от последнего введенного значения
+        from_currency, value = self.source
+        if from_currency in self.fields:
+            self.fields[from_currency].set_value(value)
+        self.schedule_recompute(from_currency, value)
+
+    def on_alerts_triggered(self, events):
+        """Показывает сработавшие подписки в окне и всплывающим сообщением в системном лотке"""
+        lines = [format_event(event) for event in events]
+        shown = self.alerts_label.text().splitlines() if not self.alerts_label.isHidden() else []
+        self.alerts_label.setText("\n".join((lines + shown)[:ALERTS_SHOWN]))
+        self.alerts_label.show()
+
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray_icon is None:
+                self.tray_icon = QSystemTrayIcon(self.style().standardIcon(QStyle.SP_MessageBoxInformation), self)
+                self.tray_icon.setToolTip(self.windowTitle())
+                self.tray_icon.show()
+            self.tray_icon.showMessage("Оповещение о курсе", "\n".join(lines),
+                                       QSystemTrayIcon.Information)
+        # Без системного лотка окно хотя бы подсвечивается на панели задач
+        QApplication.alert(self)
 
     def on_rates_error(self, error_message):
-        """Показывает сообщение об ошибке"""
-        QMessageBox.warning(self, "Ошибка обновления курсов", error_message)
+        """Показывает ошибку: окном - для обновления по кнопке, в строке состояния - для фонового"""
+        self.sources_label.setText(self.rates.get_sources_text())
+        self.update_status()
+        if self.manual_refresh:
+            self.manual_refresh = False
+            QMessageBox.warning(self, "Ошибка обновления курсов", error_message)
 
 
 def main():
@@ -138,4 +267,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
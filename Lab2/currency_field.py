@@ -34,8 +34,12 @@ class CurrencyField(QWidget):
                 pass
 
     def set_value(self, value):
+        text = f"{value:.2f}"
+        # Одинаковый текст не перерисовываем
+        if self.input.text() == text:
+            return
         self.input.blockSignals(True)
-        self.input.setText(f"{value:.2f}")
+        self.input.setText(text)
         self.input.blockSignals(False)
 
     def get_value(self):
@@ -1,109 +1,294 @@
 import json
 import os
-import requests
-from datetime import datetime
-from PyQt5.QtCore import QObject, pyqtSignal, QThread, pyqtSlot
-from bs4 import BeautifulSoup
+from datetime import date, datetime, time, timedelta, timezone
+
+import numpy as np
+
+from PyQt5.QtCore import QLockFile, QObject, pyqtSignal, QThread, QTimer, pyqtSlot
+
+from rate_alerts import ALERTS_FILE, AlertEngine
+from rate_history import HISTORY_FILE, HistoryCache, RateHistory
+from rate_matrix import RateMatrix, BASE_CURRENCY
+from rate_snapshot import SNAPSHOT_FILE, SnapshotError, load_snapshot, resolve_data_dir, save_snapshot
+from rate_sources import MODE_FIRST, RateAggregator
+
+# Валюты, курсы которых показываются "каждый к каждому"
+MAIN_CURRENCIES = ["USD", "EUR", "RUB"]
+
+# ЦБ устанавливает курсы в рабочие дни около 15:30 по Москве
+MOSCOW_TZ = timezone(timedelta(hours=3))
+PUBLICATION_TIME = time(15, 30)
+# Запас после времени публикации, чтобы курсы успели появиться у источников
+PUBLICATION_GRACE = timedelta(minutes=10)
+# Через сколько секунд после последней проверки курсы считаются устаревшими
+DEFAULT_TTL = 3600
+# Пауза перед повтором после ошибки: от минуты с удвоением до TTL
+RETRY_MIN_DELAY = 60
+# Блокировка каталога данных: ее держит процесс, который обновляет и записывает курсы
+OWNER_LOCK_FILE = "rates.lock"
+# Как часто процесс без блокировки перечитывает снимок и пробует ее захватить, мс
+FOLLOW_INTERVAL = 5000
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def next_publication(moment):
+    """Ближайшее после moment (локальное время) время публикации курсов ЦБ.
+
+    Праздники не учитываются: в праздник проверка просто вернет 304.
+    """
+    moment_msk = moment.astimezone(MOSCOW_TZ)
+    day = moment_msk.date()
+    while True:
+        candidate = datetime.combine(day, PUBLICATION_TIME, MOSCOW_TZ)
+        if candidate > moment_msk and day.weekday() < 5:
+            return candidate.astimezone().replace(tzinfo=None)
+        day += timedelta(days=1)
 
 
 class RateFetcher(QThread):
-    finished = pyqtSignal(dict)
+    # Курсы получены (QThread.finished испускается позже, когда поток завершится)
+    fetched = pyqtSignal(dict)
     error = pyqtSignal(str)
+    # Источник ответил 304: курсы не изменились с прошлой загрузки
+    not_modified = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, aggregator):
         super().__init__()
+        # Источники опрашиваются параллельно, поток ждет первый ответ (или консенсус)
+        self.aggregator = aggregator
         self.rates = {}
+        self.rates_date = None
+        self.source = None
 
     def run(self):
         try:
-            # Получаем курсы с сайта ЦБ РФ
-            url = "https://www.cbr.ru/currency_base/daily/"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Ищем таблицу с курсами валют
-            table = soup.find('table', {'class': 'data'})
-            if not table:
-                self.error.emit("Не удалось найти таблицу с курсами")
-                return
-
-            rates = {}
-            for row in table.find_all('tr')[1:]:  # Пропускаем заголовок
-                cols = row.find_all('td')
-                if len(cols) >= 5:
-                    code = cols[1].text.strip()
-                    if code in ['USD', 'EUR']:
-                        unit = int(cols[2].text.strip())
-                        rate = float(cols[4].text.strip().replace(',', '.'))
-                        # Приводим к курсу за 1 единицу валюты
-                        rates[code] = rate / unit
-
-            if not rates:
-                self.error.emit("Не удалось извлечь курсы валют")
-                return
-
-            self.rates = rates
-            self.finished.emit(rates)
-
+            result = self.aggregator.fetch()
         except Exception as e:
             self.error.emit(f"Ошибка при получении курсов: {str(e)}")
+            return
+
+        self.source = result.source
+        self.rates_date = result.rates_date
+        if result.not_modified:
+            self.not_modified.emit()
+            return
+        self.rates = result.rates
+        self.fetched.emit(result.rates)
 
 
 class CurrencyRates(QObject):
+    """Текущие курсы, их хранение и обновление.
+
+    Пока идет загрузка, конвертация продолжает работать по прежним
+    курсам: матрица заменяется целиком только после получения новых.
+    Автообновление (start_auto_refresh) проверяет курсы по истечении
+    ttl секунд или вскоре после очередной публикации ЦБ - что раньше.
+
+    Если с одним каталогом данных работают несколько процессов (конвертер
+    и rate_service.py), курсы загружает и записывает только владелец
+    блокировки OWNER_LOCK_FILE; остальные перечитывают снимок, когда он
+    меняется, и забирают блокировку, когда владелец завершается.
+    """
     rates_updated = pyqtSignal()
     rates_error = pyqtSignal(str)
+    # Началась фоновая загрузка курсов
+    refresh_started = pyqtSignal()
+    # Изменилось состояние свежести курсов (см. staleness())
+    staleness_changed = pyqtSignal()
+    # Обновление курсов пересекло уровни подписок: список rate_alerts.AlertEvent
+    alerts_triggered = pyqtSignal(list)
 
-    def __init__(self):
+    def __init__(self, sources=None, mode=MODE_FIRST, data_dir=None, ttl=DEFAULT_TTL):
         super().__init__()
-        self.rates_file = "Lab2/currency_rates.json"
-        self.rates = {}
+        # Все файлы лежат в каталоге данных (по умолчанию - рядом с модулем,
+        # переопределяется параметром или переменной CURRENCY_DATA_DIR)
+        self.data_dir = resolve_data_dir(data_dir)
+        self.snapshot_file = os.path.join(self.data_dir, SNAPSHOT_FILE)
+        # JSON старых версий читается, только если снимка еще нет
+        self.rates_file = os.path.join(self.data_dir, "currency_rates.json")
+        # История курсов по дням для конвертации по дате операции
+        self.history = RateHistory(os.path.join(self.data_dir, HISTORY_FILE))
+        # Подписки на пересечение курсами заданных уровней
+        self.alerts = AlertEngine(os.path.join(self.data_dir, ALERTS_FILE))
+        # Матрица кросс-курсов; при обновлении заменяется целиком
+        self.matrix = RateMatrix({})
         self.last_updated = None
-        self.fetcher = RateFetcher()
-        self.fetcher.finished.connect(self._on_rates_fetched)
-        self.fetcher.error.connect(self.rates_error.emit)
-        
+        # Дата, на которую ЦБ установил текущие курсы
+        self.rates_date = None
+        # sources=None - ЦБ РФ и его JSON-зеркало (rate_sources.default_sources)
+        self.aggregator = RateAggregator(sources, mode)
+        self.fetcher = RateFetcher(self.aggregator)
+        self.fetcher.fetched.connect(self._on_rates_fetched)
+        self.fetcher.not_modified.connect(self._on_rates_not_modified)
+        self.fetcher.error.connect(self._on_fetch_error)
+        # Результат загрузки приходит раньше, чем завершается поток; загрузка
+        # считается законченной и следующая планируется только после завершения
+        self.fetcher.finished.connect(self._on_fetcher_finished)
+        self._refreshing = False
+
+        self.ttl = ttl
+        self.auto_refresh = False
+        self.last_error = None
+        # Сколько запросов обновления пришлось на уже идущую загрузку
+        self.coalesced_requests = 0
+        self._retry_delay = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.update_rates)
+
+        # Блокировка захватывается при первом обновлении; устаревшей считается
+        # только блокировка завершившегося процесса
+        self._owner_lock = QLockFile(os.path.join(self.data_dir, OWNER_LOCK_FILE))
+        self._owner_lock.setStaleLockTime(0)
+        self.owner = False
+        # (mtime, размер) прочитанного или записанного снимка
+        self._snapshot_stamp = None
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(FOLLOW_INTERVAL)
+        self.follow_timer.timeout.connect(self._follow)
+
         self.load_rates()
 
     def load_rates(self):
-        """Загружает курсы из файла или устанавливает значения по умолчанию"""
+        """Загружает курсы из снимка, из JSON старого формата, из последнего дня
+        истории или устанавливает значения по умолчанию"""
+        try:
+            self._load_snapshot()
+            print(f"Курсы загружены из снимка (обновлено: {self.last_updated})")
+            return
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            # SnapshotError - подкласс ValueError; прочие ValueError - на случай
+            # несогласованных данных, не распознанных при разборе снимка
+            print(f"Ошибка чтения снимка курсов: {e}")
+            # Поврежденный файл не перезаписываем, а откладываем для разбора
+            try:
+                os.replace(self.snapshot_file, self.snapshot_file + ".corrupt")
+            except OSError:
+                pass
+
         if os.path.exists(self.rates_file):
             try:
                 with open(self.rates_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.rates = data.get('rates', {})
-                    self.last_updated = data.get('last_updated')
-                    print(f"Курсы загружены из файла (обновлено: {self.last_updated})")
+                self.matrix = RateMatrix(self._rub_rates_from_file(data))
+                self._restore_meta(data)
+                print(f"Курсы загружены из файла (обновлено: {self.last_updated})")
+                # Дальше курсы хранятся в снимке
+                self.save_rates()
+                return
             except Exception as e:
-                print(f"Ошибка загрузки курсов: {e}. Используются значения по умолчанию.")
-                self.set_default_rates()
+                print(f"Ошибка загрузки курсов: {e}")
+
+        if self._load_from_history():
+            print(f"Курсы восстановлены из истории (на {self.rates_date})")
+            self.save_rates()
         else:
+            print("Используются курсы по умолчанию.")
             self.set_default_rates()
 
+    def _load_from_history(self):
+        cache = self.history.cache
+        if not len(cache):
+            return False
+        last = cache.table[-1]
+        known = ~np.isnan(last)
+        self.matrix = RateMatrix(dict(zip(np.array(cache.codes)[known].tolist(), last[known].tolist())))
+        self.rates_date = cache.days[-1].astype(date).strftime("%d.%m.%Y")
+        self.last_updated = None
+        return True
+
+    def _snapshot_file_stamp(self):
+        try:
+            stat = os.stat(self.snapshot_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_snapshot(self):
+        stamp = self._snapshot_file_stamp()
+        snapshot = load_snapshot(self.snapshot_file)
+        meta = snapshot['meta']
+        # Снимок с верной контрольной суммой все равно может быть несогласован
+        # (например, записан другой версией программы)
+        try:
+            if not isinstance(meta, dict):
+                raise ValueError("метаданные снимка должны быть словарем")
+            matrix = RateMatrix.from_arrays(snapshot['codes'], snapshot['rub'])
+            history = HistoryCache(*snapshot['history']) if snapshot['history'] is not None else None
+        except ValueError as e:
+            raise SnapshotError(f"снимок несогласован: {e}") from e
+        self.matrix = matrix
+        self._restore_meta(meta)
+        self._snapshot_stamp = stamp
+        # Готовая таблица истории подходит, только если с момента записи
+        # снимка в хранилище ничего не записывалось; иначе она строится заново
+        if history is not None and meta.get('history_stamp') == self.history.stamp():
+            self.history.set_cache(history)
+        else:
+            self.history.set_cache(None)
+
+    def _restore_meta(self, meta):
+        self.last_updated = meta.get('last_updated')
+        self.rates_date = meta.get('rates_date')
+        self.fetcher.source = meta.get('source')
+        # ETag источников годится для условного запроса, только если
+        # источник отдавал курсы на ту же дату, что сейчас загружены
+        sources = {}
+        for name, state in meta.get('sources', {}).items():
+            if state.get('rates') is None and state.get('rates_date') == self.rates_date:
+                state = dict(state, rates=self.matrix.rub_rates())
+            if state.get('rates') is not None:
+                sources[name] = state
+        self.aggregator.restore(sources)
+
+    def _rub_rates_from_file(self, data):
+        """Достает курсы к рублю из файла (включая старый формат "каждый к каждому")"""
+        if 'rub_rates' in data:
+            return data['rub_rates']
+        rates = data.get('rates', {})
+        rub_rates = {code: to_rates[BASE_CURRENCY]
+                     for code, to_rates in rates.items() if BASE_CURRENCY in to_rates}
+        if not rub_rates:
+            raise ValueError("в файле нет курсов к рублю")
+        return rub_rates
+
+    @property
+    def codes(self):
+        """Коды всех известных валют в алфавитном порядке"""
+        return self.matrix.codes
+
     def set_default_rates(self):
         """Устанавливает курсы по умолчанию"""
-        self.rates = {
-            "USD": {"EUR": 1/1.16, "RUB": 81.27},
-            "EUR": {"USD": 1.16, "RUB": 93.90},
-            "RUB": {"USD": 1/81.27, "EUR": 1/93.90},
-        }
-        self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.matrix = RateMatrix({"USD": 81.27, "EUR": 93.90})
+        # Курсы по умолчанию никогда не проверялись и сразу считаются устаревшими
+        self.last_updated = None
+        self.rates_date = None
         self.save_rates()
 
     def save_rates(self):
-        """Сохраняет курсы в файл"""
-        data = {
-            'rates': self.rates,
-            'last_updated': self.last_updated
+        """Атомарно сохраняет курсы и таблицу истории в снимок.
+
+        Процесс, который уступил обновление другому, снимок не пишет.
+        """
+        if self.is_follower():
+            return
+        # Курсы источников не дублируются: при загрузке они восстанавливаются из матрицы
+        sources = {name: {key: value for key, value in state.items() if key != 'rates'}
+                   for name, state in self.aggregator.state().items()}
+        meta = {
+            'last_updated': self.last_updated,
+            'rates_date': self.rates_date,
+            'source': self.fetcher.source,
+            'sources': sources,
+            'history_stamp': self.history.stamp(),
         }
         try:
-            with open(self.rates_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            save_snapshot(self.snapshot_file, self.matrix.codes, self.matrix.rub, meta,
+                          self.history.cache)
+            self._snapshot_stamp = self._snapshot_file_stamp()
         except Exception as e:
             print(f"Ошибка сохранения курсов: {e}")
 
@@ -111,41 +296,226 @@ class CurrencyRates(QObject):
     def _on_rates_fetched(self, new_rates):
         """Обрабатывает полученные курсы с сайта ЦБ"""
         try:
-            # Получаем курсы USD/RUB и EUR/RUB
-            usd_rub = new_rates.get('USD')
-            eur_rub = new_rates.get('EUR')
-            
-            if usd_rub and eur_rub:
-                # Пересчитываем все курсы на основе полученных данных
-                self.rates = {
-                    "USD": {
-                        "EUR": usd_rub / eur_rub,
-                        "RUB": usd_rub
-                    },
-                    "EUR": {
-                        "USD": eur_rub / usd_rub,
-                        "RUB": eur_rub
-                    },
-                    "RUB": {
-                        "USD": 1 / usd_rub,
-                        "EUR": 1 / eur_rub
-                    }
-                }
-                
-                self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if all(code in new_rates for code in MAIN_CURRENCIES if code != BASE_CURRENCY):
+                # Пересчитываем матрицу кросс-курсов по всем полученным курсам к рублю
+                old_matrix = self.matrix
+                # Курсы по умолчанию не опубликованы ЦБ, от них уровни не отсчитываются
+                had_rates = self.rates_date is not None
+                self.matrix = RateMatrix(new_rates)
+                self.rates_date = self.fetcher.rates_date
+                if self.rates_date:
+                    self.history.add_day(self.rates_date, new_rates)
+
+                self.last_updated = datetime.now().strftime(TIME_FORMAT)
                 self.save_rates()
+                self._on_refresh_done()
                 self.rates_updated.emit()
-                print("Курсы успешно обновлены с сайта ЦБ РФ")
+                if had_rates:
+                    # Диапазонный поиск по уровням; уведомления уходят в поток AlertEngine
+                    events = self.alerts.evaluate(old_matrix, self.matrix)
+                    if events:
+                        self.alerts_triggered.emit(events)
+                print(f"Курсы успешно обновлены (источник: {self.fetcher.source}, "
+                      f"валют: {len(self.matrix)})")
             else:
-                self.rates_error.emit("Не удалось получить все необходимые курсы")
-                
+                self._on_fetch_error("Не удалось получить все необходимые курсы")
+
         except Exception as e:
-            self.rates_error.emit(f"Ошибка обработки курсов: {str(e)}")
+            self._on_fetch_error(f"Ошибка обработки курсов: {str(e)}")
+
+    @pyqtSlot()
+    def _on_rates_not_modified(self):
+        """Курсы на сервере не изменились: обновляем только время проверки"""
+        self.last_updated = datetime.now().strftime(TIME_FORMAT)
+        self.save_rates()
+        self._on_refresh_done()
+        self.rates_updated.emit()
+        print("Курсы ЦБ РФ не изменились с прошлой загрузки")
 
     def update_rates(self):
-        """Запускает обновление курсов"""
-        if not self.fetcher.isRunning():
-            self.fetcher.start()
+        """Запускает обновление курсов в фоне.
+
+        Если загрузка уже идет, новая не запускается: вызывающий получит
+        результат идущей загрузки через rates_updated/rates_error. Если
+        курсы обновляет другой процесс, снимок только перечитывается.
+        Возвращает True, если загрузка запущена этим вызовом.
+        """
+        if self._refreshing:
+            self.coalesced_requests += 1
+            return False
+        if not self._acquire_ownership():
+            self.reload_snapshot()
+            return False
+        self.refresh_timer.stop()
+        self._refreshing = True
+        self.fetcher.start()
+        self.refresh_started.emit()
+        self.staleness_changed.emit()
+        return True
+
+    def start_auto_refresh(self):
+        """Включает автообновление; устаревшие курсы обновляются сразу.
+
+        Если курсы уже обновляет другой процесс, вместо загрузки снимок
+        перечитывается каждые FOLLOW_INTERVAL мс.
+        """
+        self.auto_refresh = True
+        if self._acquire_ownership():
+            self._schedule_refresh()
+        else:
+            print("Курсы обновляет другой процесс, снимок будет перечитываться")
+            self.follow_timer.start()
+            self.staleness_changed.emit()
+
+    def stop_auto_refresh(self):
+        self.auto_refresh = False
+        self.refresh_timer.stop()
+        self.follow_timer.stop()
+
+    def close(self):
+        """Останавливает обновление, передает его другим процессам и закрывает историю.
+
+        Блокировка снимается до удаления каталога данных (иначе QLockFile
+        не сможет удалить свой файл) и чтобы обновление сразу подхватил
+        другой процесс.
+        """
+        self.stop_auto_refresh()
+        if self.owner:
+            self._owner_lock.unlock()
+            self.owner = False
+        self.alerts.close()
+        self.history.close()
+
+    def _acquire_ownership(self):
+        """Захватывает блокировку каталога данных; True, если процесс - владелец"""
+        if not self.owner:
+            self.owner = self._owner_lock.tryLock(0)
+            if self.owner:
+                self.follow_timer.stop()
+        return self.owner
+
+    def is_follower(self):
+        """Курсы обновляет и записывает другой процесс"""
+        return not self.owner and self.follow_timer.isActive()
+
+    @pyqtSlot()
+    def _follow(self):
+        if self._acquire_ownership():
+            print("Обновление курсов перешло к этому процессу")
+            self._schedule_refresh()
+            self.staleness_changed.emit()
+            return
+        self.reload_snapshot()
+
+    def reload_snapshot(self):
+        """Перечитывает снимок, если его записал другой процесс; True, если курсы обновились"""
+        stamp = self._snapshot_file_stamp()
+        if stamp is None or stamp == self._snapshot_stamp:
+            return False
+        old_matrix = self.matrix
+        had_rates = self.rates_date is not None
+        try:
+            self._load_snapshot()
+        except (OSError, ValueError) as e:
+            # Владелец пишет снимок атомарно; ошибка - повод попробовать в следующий раз
+            print(f"Ошибка чтения снимка курсов: {e}")
+            self._snapshot_stamp = stamp
+            return False
+        self.last_error = None
+        self.rates_updated.emit()
+        self.staleness_changed.emit()
+        if had_rates:
+            # Уведомления отправляет и сработавшие подписки удаляет владелец,
+            # здесь срабатывания только показываются
+            events = self.alerts.evaluate(old_matrix, self.matrix, notify=False)
+            if events:
+                self.alerts_triggered.emit(events)
+        return True
+
+    def last_checked(self):
+        """Время последней успешной проверки курсов (datetime) или None"""
+        try:
+            return datetime.strptime(self.last_updated, TIME_FORMAT)
+        except (TypeError, ValueError):
+            return None
+
+    def next_refresh_time(self):
+        """Когда курсы станут устаревшими: через ttl после проверки или после публикации ЦБ"""
+        checked = self.last_checked()
+        if checked is None:
+            return datetime.now()
+        return min(checked + timedelta(seconds=self.ttl),
+                   next_publication(checked) + PUBLICATION_GRACE)
+
+    def staleness(self):
+        """Сведения о свежести курсов для интерфейса"""
+        checked = self.last_checked()
+        now = datetime.now()
+        expires = self.next_refresh_time()
+        return {
+            'last_checked': checked,
+            'age': (now - checked).total_seconds() if checked else None,
+            'rates_date': self.rates_date,
+            'expires': expires,
+            'stale': checked is None or now >= expires,
+            'refreshing': self._refreshing,
+            'last_error': self.last_error,
+            'next_refresh': self._next_timer_time(),
+            'follower': self.is_follower(),
+        }
+
+    def _next_timer_time(self):
+        if not self.refresh_timer.isActive():
+            return None
+        return datetime.now() + timedelta(milliseconds=self.refresh_timer.remainingTime())
+
+    def _schedule_refresh(self):
+        # Во время загрузки таймер не нужен: следующая проверка планируется
+        # в _on_fetcher_finished
+        if not self.auto_refresh or self._refreshing or not self.owner:
+            return
+        if self._retry_delay is not None:
+            delay = self._retry_delay
+        else:
+            delay = (self.next_refresh_time() - datetime.now()).total_seconds()
+        # QTimer принимает интервал в мс как int32 (до ~24 дней)
+        self.refresh_timer.start(int(min(max(delay, 0), 86400) * 1000))
+        self.staleness_changed.emit()
+
+    def _on_refresh_done(self):
+        self.last_error = None
+        self._retry_delay = None
+
+    @pyqtSlot(str)
+    def _on_fetch_error(self, message):
+        self.last_error = message
+        # После ошибки повторяем раньше, чем через полный TTL
+        self._retry_delay = RETRY_MIN_DELAY if self._retry_delay is None else \
+            min(self._retry_delay * 2, self.ttl)
+        self.rates_error.emit(message)
+
+    @pyqtSlot()
+    def _on_fetcher_finished(self):
+        """Поток загрузки завершился: планируем следующую проверку и обновляем состояние"""
+        self._refreshing = False
+        self._schedule_refresh()
+        self.staleness_changed.emit()
+
+    def get_status_text(self) -> str:
+        """Строка состояния: время проверки, дата курсов и их свежесть"""
+        info = self.staleness()
+        text = f"Обновлено: {self.get_last_updated()}"
+        if info['rates_date']:
+            text += f" (курсы на {info['rates_date']})"
+        if info['refreshing']:
+            text += " - обновление..."
+        elif info['follower']:
+            text += " - обновляет другой процесс"
+        elif info['last_error']:
+            text += " - ошибка обновления"
+        elif info['stale']:
+            text += " - устарели"
+        return text
 
     def convert(self, from_curr: str, to_curr: str, amount: float) -> float:
         """Конвертирует сумму из одной валюты в другую"""
@@ -153,21 +523,53 @@ class CurrencyRates(QObject):
             return amount
         
         try:
-            rate = self.rates[from_curr][to_curr]
-            return amount * rate
+            return self.matrix.convert(from_curr, to_curr, amount)
         except KeyError:
-            for mid_curr in self.rates.get(from_curr, {}):
-                if to_curr in self.rates.get(mid_curr, {}):
-                    return amount * self.rates[from_curr][mid_curr] * self.rates[mid_curr][to_curr]
             return 0.0
 
+    def convert_many(self, from_curr, to_curr, amounts):
+        """Векторно конвертирует массив сумм.
+
+        from_curr/to_curr - код валюты или массив кодов той же длины, что amounts.
+        Возвращает numpy-массив; KeyError для неизвестной валюты.
+        """
+        return self.matrix.convert_many(from_curr, to_curr, amounts)
+
+    def convert_on(self, from_curr, to_curr, amount, day):
+        """Конвертирует сумму по курсу ЦБ на дату; KeyError, если курса нет в истории"""
+        return self.history.convert_on(from_curr, to_curr, amount, day)
+
+    def convert_many_on(self, from_curr, to_curr, amounts, days):
+        """Векторная конвертация по курсам на даты операций (NaN для дат раньше истории)"""
+        return self.history.convert_many_on(from_curr, to_curr, amounts, days)
+
     def get_rates_text(self) -> str:
         """Возвращает текст с курсами для отображения"""
+        matrix = self.matrix
+        main = [code for code in MAIN_CURRENCIES if code in matrix]
         lines = []
-        for from_curr, to_rates in self.rates.items():
-            for to_curr, rate in to_rates.items():
-                lines.append(f"   1 {from_curr} = {rate:.6f} {to_curr}")
+        for from_curr in main:
+            for to_curr in main:
+                if to_curr != from_curr:
+                    lines.append(f"   1 {from_curr} = {matrix.rate(from_curr, to_curr):.6f} {to_curr}")
             lines.append("")
+
+        others = [code for code in matrix.codes if code not in main]
+        for code in others:
+            lines.append(f"   1 {code} = {matrix.rate(code, BASE_CURRENCY):.6f} {BASE_CURRENCY}")
+        return "\n".join(lines)
+
+    def source_stats(self):
+        """Состояние, задержка и ошибки каждого источника курсов"""
+        return self.aggregator.stats()
+
+    def get_sources_text(self) -> str:
+        """Возвращает текст с задержкой источников для отображения"""
+        lines = []
+        for stats in self.source_stats():
+            latency = "-" if stats['latency'] is None else f"{stats['latency'] * 1000:.0f} мс"
+            state = "" if stats['state'] == "closed" else f" [{stats['state']}]"
+            lines.append(f"   {stats['name']}: {latency}{state}")
         return "\n".join(lines)
 
     def get_last_updated(self) -> str:
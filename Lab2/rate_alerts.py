@@ -0,0 +1,343 @@
+"""Оповещения о пересечении курсом заданных уровней.
+
+Уровни хранятся по валютным парам в отсортированных массивах: отдельно
+для пересечения снизу вверх и сверху вниз. При обновлении курсов
+сработавшие уровни находятся бинарным поиском диапазона между старым
+и новым курсом, поэтому время проверки не зависит от числа подписок.
+Уведомления и запись сработавших подписок выполняются в отдельном
+потоке и не задерживают интерфейс. Файл подписок меняется под
+блокировкой поверх его текущего содержимого, поэтому подписки,
+добавленные из командной строки при запущенном конвертере, не теряются.
+
+    python rate_alerts.py add USD RUB 100 --direction up --user treasury
+    python rate_alerts.py list
+    python rate_alerts.py remove 3
+"""
+import argparse
+import bisect
+import json
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QLockFile
+
+from rate_matrix import BASE_CURRENCY
+from rate_snapshot import atomic_write, resolve_data_dir
+
+ALERTS_FILE = "rate_alerts.json"
+# Сколько ждать, пока файл подписок записывает другой процесс, мс
+LOCK_TIMEOUT = 5000
+
+UP = "up"
+DOWN = "down"
+BOTH = "both"
+DIRECTIONS = (UP, DOWN, BOTH)
+
+# Подписка: курс from_curr -> to_curr пересек level в направлении direction;
+# once - удалить подписку после первого срабатывания
+Alert = namedtuple("Alert", "id user from_curr to_curr level direction once")
+# Срабатывание: подписка, курс до и после обновления
+AlertEvent = namedtuple("AlertEvent", "alert old_rate new_rate")
+
+
+class LevelIndex:
+    """Уровни одной пары и направления, отсортированные по значению"""
+
+    def __init__(self):
+        self.levels = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.levels)
+
+    def add(self, level, alert_id):
+        position = bisect.bisect_right(self.levels, level)
+        self.levels.insert(position, level)
+        self.ids.insert(position, alert_id)
+
+    def remove(self, level, alert_id):
+        start = bisect.bisect_left(self.levels, level)
+        end = bisect.bisect_right(self.levels, level)
+        position = self.ids.index(alert_id, start, end)
+        del self.levels[position]
+        del self.ids[position]
+
+    def crossed_up(self, old, new):
+        """Подписки с old < level <= new"""
+        return self.ids[bisect.bisect_right(self.levels, old):bisect.bisect_right(self.levels, new)]
+
+    def crossed_down(self, old, new):
+        """Подписки с new <= level < old"""
+        return self.ids[bisect.bisect_left(self.levels, new):bisect.bisect_left(self.levels, old)]
+
+
+def format_event(event):
+    """Текст оповещения: подписка, уровень и изменение курса"""
+    alert = event.alert
+    arrow = "вверх" if event.new_rate > event.old_rate else "вниз"
+    user = f" ({alert.user})" if alert.user else ""
+    return (f"#{alert.id}{user}: {alert.from_curr}/{alert.to_curr} пересек {alert.level:g} {arrow}: "
+            f"{event.old_rate:.4f} -> {event.new_rate:.4f}")
+
+
+def print_notifier(events):
+    for event in events:
+        print(f"Оповещение {format_event(event)}")
+
+
+class AlertEngine:
+    """Подписки на пересечение уровней и их проверка при обновлении курсов.
+
+    Подписки меняются и проверяются в одном потоке (потоке Qt у
+    CurrencyRates); уведомители получают список AlertEvent в фоновом
+    потоке в порядке срабатываний. Подписки хранятся в JSON-файле path;
+    изменения записываются под блокировкой path.lock после перечитывания
+    файла, если его изменил другой процесс.
+    """
+
+    def __init__(self, path=None, notifiers=None):
+        self.path = path
+        self.alerts = {}
+        # (from_curr, to_curr) -> LevelIndex
+        self._up = {}
+        self._down = {}
+        self.next_id = 1
+        # (время изменения, размер) файла при последнем чтении или записи
+        self._stamp = None
+        # Сработавшие разовые подписки: их удаление из файла записывается
+        # в фоновом потоке, до тех пор при перечитывании они пропускаются
+        self._fired = set()
+        self.notifiers = list(notifiers) if notifiers is not None else [print_notifier]
+        # Один поток: уведомления приходят в порядке срабатываний
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-alerts")
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @contextmanager
+    def _file_lock(self):
+        """Блокировка файла подписок между процессами (конвертер, сервис, rate_alerts.py)"""
+        lock = QLockFile(self.path + ".lock")
+        if not lock.tryLock(LOCK_TIMEOUT):
+            raise OSError(f"файл подписок занят другим процессом: {self.path}")
+        try:
+            yield
+        finally:
+            lock.unlock()
+
+    def load(self):
+        stamp = self._file_stamp()
+        data = self._read()
+        self.alerts.clear()
+        self._up.clear()
+        self._down.clear()
+        for item in data.get("alerts", []):
+            if item["id"] not in self._fired:
+                self._index(Alert(**item))
+        self.next_id = max(data.get("next_id", 1), max(self.alerts, default=0) + 1)
+        self._stamp = stamp
+
+    def reload_if_changed(self):
+        """Перечитывает файл, если его изменил другой процесс (например, rate_alerts.py add)"""
+        if self.path and self._file_stamp() not in (None, self._stamp):
+            self.load()
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"next_id": self.next_id,
+                "alerts": [alert._asdict() for alert in self.alerts.values()]}
+        atomic_write(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+        self._stamp = self._file_stamp()
+
+    def _change(self, save, change):
+        """Выполняет change(); с save=True - поверх текущего файла и под его блокировкой"""
+        if not (save and self.path):
+            return change()
+        with self._file_lock():
+            self.reload_if_changed()
+            result = change()
+            self.save()
+        return result
+
+    def _remove_fired(self, ids):
+        """Удаляет сработавшие подписки из файла (в потоке уведомлений).
+
+        Файл перечитывается под блокировкой, поэтому подписки, добавленные
+        другим процессом после последнего чтения, сохраняются.
+        """
+        try:
+            with self._file_lock():
+                data = self._read() if os.path.exists(self.path) else {}
+                data["alerts"] = [item for item in data.get("alerts", []) if item["id"] not in ids]
+                data.setdefault("next_id", max(ids) + 1)
+                atomic_write(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Ошибка сохранения подписок: {e}", file=sys.stderr)
+
+    def _index(self, alert):
+        pair = (alert.from_curr, alert.to_curr)
+        self.alerts[alert.id] = alert
+        if alert.direction in (UP, BOTH):
+            self._up.setdefault(pair, LevelIndex()).add(alert.level, alert.id)
+        if alert.direction in (DOWN, BOTH):
+            self._down.setdefault(pair, LevelIndex()).add(alert.level, alert.id)
+
+    def _unindex(self, alert):
+        pair = (alert.from_curr, alert.to_curr)
+        for by_pair, directions in ((self._up, (UP, BOTH)), (self._down, (DOWN, BOTH))):
+            if alert.direction in directions:
+                index = by_pair[pair]
+                index.remove(alert.level, alert.id)
+                if not index:
+                    del by_pair[pair]
+        del self.alerts[alert.id]
+
+    def add(self, from_curr, to_curr, level, direction=BOTH, user="", once=True, save=True):
+        """Добавляет подписку и возвращает ее (Alert); ValueError при неверных параметрах"""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"направление должно быть одним из: {', '.join(DIRECTIONS)}")
+        level = float(level)
+        if not level > 0:
+            raise ValueError("уровень должен быть положительным числом")
+
+        def change():
+            alert = Alert(self.next_id, user, from_curr.upper(), to_curr.upper(), level, direction, once)
+            self.next_id += 1
+            self._index(alert)
+            return alert
+        return self._change(save, change)
+
+    def remove(self, alert_id, save=True):
+        """Удаляет подписку; KeyError, если ее нет"""
+        self._change(save, lambda: self._unindex(self.alerts[alert_id]))
+
+    def pairs(self):
+        return set(self._up) | set(self._down)
+
+    def crossed(self, from_curr, to_curr, old_rate, new_rate):
+        """Подписки пары, уровни которых лежат между старым и новым курсом"""
+        pair = (from_curr, to_curr)
+        if new_rate > old_rate and pair in self._up:
+            ids = self._up[pair].crossed_up(old_rate, new_rate)
+        elif new_rate < old_rate and pair in self._down:
+            ids = self._down[pair].crossed_down(old_rate, new_rate)
+        else:
+            return []
+        return [self.alerts[alert_id] for alert_id in ids]
+
+    def evaluate(self, old_matrix, new_matrix, notify=True):
+        """Находит сработавшие подписки при замене матрицы курсов и отправляет уведомления.
+
+        Разовые подписки удаляются. Возвращает список AlertEvent. С notify=False
+        (курсы обновил другой процесс, и уведомления отправляет он) события только
+        возвращаются: уведомители не вызываются, подписки не удаляются.
+        """
+        # Подписки могли добавить (rate_alerts.py add) или удалить после
+        # срабатывания (процесс-владелец) другие процессы
+        try:
+            self.reload_if_changed()
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения подписок: {e}")
+        events = []
+        for from_curr, to_curr in self.pairs():
+            try:
+                old_rate = old_matrix.rate(from_curr, to_curr)
+                new_rate = new_matrix.rate(from_curr, to_curr)
+            except KeyError:
+                continue
+            events += [AlertEvent(alert, old_rate, new_rate)
+                       for alert in self.crossed(from_curr, to_curr, old_rate, new_rate)]
+        events.sort(key=lambda event: event.alert.id)
+        if not events or not notify:
+            return events
+
+        fired_once = {event.alert.id for event in events if event.alert.once}
+        for alert_id in fired_once:
+            self._unindex(self.alerts[alert_id])
+        self._fired |= fired_once
+        # Запись файла с fsync не задерживает поток Qt
+        if fired_once and self.path:
+            self._executor.submit(self._remove_fired, fired_once)
+        self.dispatch(events)
+        return events
+
+    def dispatch(self, events):
+        """Передает события уведомителям в фоновом потоке"""
+        for notifier in self.notifiers:
+            self._executor.submit(self._notify, notifier, events)
+
+    @staticmethod
+    def _notify(notifier, events):
+        try:
+            notifier(events)
+        except Exception as e:
+            print(f"Ошибка отправки оповещения: {e}", file=sys.stderr)
+
+    def close(self):
+        """Дожидается отправки уже поставленных уведомлений"""
+        self._executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Оповещения о курсах валют")
+    parser.add_argument("--file", default=None,
+                        help=f"файл подписок (по умолчанию {ALERTS_FILE} в каталоге данных)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="добавить подписку")
+    add.add_argument("from_curr")
+    add.add_argument("to_curr", nargs="?", default=BASE_CURRENCY)
+    add.add_argument("level", type=float)
+    add.add_argument("--direction", choices=DIRECTIONS, default=BOTH)
+    add.add_argument("--user", default="")
+    add.add_argument("--repeat", action="store_true",
+                     help="не удалять подписку после срабатывания")
+
+    commands.add_parser("list", help="показать подписки")
+
+    remove = commands.add_parser("remove", help="удалить подписку")
+    remove.add_argument("id", type=int)
+    args = parser.parse_args()
+
+    engine = AlertEngine(args.file or os.path.join(resolve_data_dir(), ALERTS_FILE), notifiers=[])
+    try:
+        if args.command == "add":
+            alert = engine.add(args.from_curr, args.to_curr, args.level, args.direction,
+                               args.user, once=not args.repeat)
+            print(f"Добавлена подписка #{alert.id}")
+        elif args.command == "remove":
+            engine.remove(args.id)
+            print(f"Подписка #{args.id} удалена")
+        else:
+            for alert in engine.alerts.values():
+                print(f"#{alert.id:<5} {alert.from_curr}/{alert.to_curr} {alert.level:>12g} "
+                      f"{alert.direction:5} {'разовая' if alert.once else 'постоянная':10} {alert.user}")
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyError:
+        print(f"Ошибка: нет подписки #{args.id}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Хранилище исторических курсов ЦБ РФ по дням.
+
+Курсы хранятся в SQLite (таблица rates: день, код, рублей за единицу).
+Для поиска по дате вся история загружается в HistoryCache - плотную
+таблицу NumPy "день x валюта", по которой курс на любую дату находится
+бинарным поиском, а массивы дат конвертируются векторно.
+
+    python rate_history.py backfill 2025-01-01 2025-03-31
+    python rate_history.py rate USD 2025-02-15
+"""
+import argparse
+import bisect
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from rate_matrix import BASE_CURRENCY
+from rate_snapshot import resolve_data_dir
+from rate_sources import CBR_DAILY_URL, READ_CHUNK_SIZE, create_session, parse_cbr_xml
+
+HISTORY_FILE = "rate_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates (
+    day TEXT NOT NULL,
+    code TEXT NOT NULL,
+    rate REAL NOT NULL,
+    PRIMARY KEY (code, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checked_days (
+    day TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def to_day(value):
+    """Приводит дату (date, datetime, 'ГГГГ-ММ-ДД' или 'ДД.ММ.ГГГГ') к datetime.date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[D]').astype(date)
+    text = str(value).strip()
+    if '.' in text:
+        return datetime.strptime(text, "%d.%m.%Y").date()
+    return date.fromisoformat(text)
+
+
+def to_days_array(values):
+    """Приводит дату или массив дат к массиву numpy datetime64[D]"""
+    if isinstance(values, (str, date, np.datetime64)):
+        return np.array([to_day(values)], dtype='datetime64[D]')
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[D]')
+    try:
+        # Быстрый путь для строк ISO 'ГГГГ-ММ-ДД'
+        return values.astype('datetime64[D]')
+    except ValueError:
+        return np.array([to_day(v) for v in values.tolist()], dtype='datetime64[D]')
+
+
+class HistoryCache:
+    """Неизменяемая таблица курсов к рублю "день x валюта".
+
+    table[i, j] - курс codes[j] на дату days[i]. Дни без публикации ЦБ
+    (выходные) в таблицу не попадают: курс действует до следующей
+    публикации, поэтому для даты берется последний день не позже нее.
+    Пропуски заполнены предыдущим известным курсом, до первого курса
+    валюты стоит NaN.
+    """
+
+    def __init__(self, days, codes, table):
+        self.days = np.asarray(days, dtype='datetime64[D]')
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.codes_array = np.array(self.codes)
+        self.table = table
+        # Номера дней для бинарного поиска без накладных расходов NumPy
+        self._day_numbers = self.days.astype(np.int64).tolist()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Строит таблицу из строк (день 'ГГГГ-ММ-ДД', код, курс)"""
+        if not rows:
+            return cls([], [BASE_CURRENCY], np.ones((0, 1)))
+        day_values, code_values, rate_values = zip(*rows)
+        days, day_idx = np.unique(np.array(day_values, dtype='datetime64[D]'),
+                                  return_inverse=True)
+        codes = sorted(set(code_values) | {BASE_CURRENCY})
+        code_index = {code: i for i, code in enumerate(codes)}
+        code_idx = np.array([code_index[code] for code in code_values])
+
+        table = np.full((len(days), len(codes)), np.nan)
+        table[day_idx, code_idx] = rate_values
+        table[:, code_index[BASE_CURRENCY]] = 1.0
+
+        # Заполняем пропуски последним известным курсом в каждой колонке
+        rows_idx = np.where(np.isnan(table), 0, np.arange(len(days))[:, None])
+        np.maximum.accumulate(rows_idx, axis=0, out=rows_idx)
+        table = table[rows_idx, np.arange(len(codes))[None, :]]
+        return cls(days, codes, table)
+
+    def __len__(self):
+        return len(self.days)
+
+    def day_index(self, day):
+        """Номер строки таблицы для даты; -1, если дата раньше истории"""
+        number = (to_day(day) - date(1970, 1, 1)).days
+        return bisect.bisect_right(self._day_numbers, number) - 1
+
+    def day_indexes(self, days):
+        """Векторный вариант day_index для массива дат"""
+        return np.searchsorted(self.days, to_days_array(days), side='right') - 1
+
+    def lookup(self, codes):
+        """Переводит код или массив кодов в номера колонок; KeyError для неизвестных"""
+        if isinstance(codes, str):
+            return self.index[codes]
+        codes = np.asarray(codes)
+        if codes.dtype.kind in 'iu':
+            return codes
+        positions = np.minimum(np.searchsorted(self.codes_array, codes), len(self.codes) - 1)
+        unknown = self.codes_array[positions] != codes
+        if unknown.any():
+            raise KeyError(f"Неизвестные валюты: {sorted(set(codes[unknown].tolist()))}")
+        return positions
+
+    def rate_on(self, code, day, to_curr=BASE_CURRENCY):
+        """Курс code -> to_curr на дату; KeyError, если курса на эту дату нет"""
+        row = self.day_index(day)
+        if row < 0:
+            raise KeyError(f"Нет курсов на {to_day(day)}")
+        rate = self.table[row, self.index[code]] / self.table[row, self.index[to_curr]]
+        if np.isnan(rate):
+            raise KeyError(f"Нет курса {code}/{to_curr} на {to_day(day)}")
+        return float(rate)
+
+    def convert_many(self, from_curr, to_curr, amounts, days):
+        """Векторная конвертация сумм по курсам на их даты.
+
+        from_curr/to_curr - код или массив кодов (номеров колонок),
+        days - дата или массив дат той же длины, что amounts.
+        Для дат раньше истории результат NaN.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        rows = self.day_indexes(days)
+        before = rows < 0
+        rows = np.maximum(rows, 0)
+        if len(self.days) == 0:
+            return np.full(np.broadcast(amounts, rows).shape, np.nan)
+        result = amounts * (self.table[rows, self.lookup(from_curr)]
+                            / self.table[rows, self.lookup(to_curr)])
+        if before.any():
+            result = np.where(before, np.nan, result)
+        return result
+
+
+class RateHistory:
+    """Постоянное хранилище дневных курсов с кэшем в памяти.
+
+    Кэш (HistoryCache) строится при первом обращении и сбрасывается
+    при добавлении новых курсов.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(resolve_data_dir(), HISTORY_FILE)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.executescript(SCHEMA)
+        self._cache = None
+
+    def close(self):
+        self.connection.close()
+
+    def add_day(self, day, rub_rates):
+        """Сохраняет курсы к рублю на дату (повторная запись заменяет курсы)"""
+        day = to_day(day).isoformat()
+        rows = [(day, code, float(rate)) for code, rate in rub_rates.items()
+                if code != BASE_CURRENCY]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO rates (day, code, rate) VALUES (?, ?, ?)", rows)
+            # Номер ревизии меняется при любой записи, в том числе при исправлении
+            # курсов уже известного дня, когда число записей и последний день те же
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('revision', 1) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+        self._cache = None
+
+    def known_days(self):
+        """Дни, на которые в хранилище есть курсы"""
+        return [date.fromisoformat(row[0]) for row in
+                self.connection.execute("SELECT DISTINCT day FROM rates ORDER BY day")]
+
+    def date_range(self):
+        """(первый, последний) день истории или (None, None)"""
+        first, last = self.connection.execute("SELECT MIN(day), MAX(day) FROM rates").fetchone()
+        if first is None:
+            return None, None
+        return date.fromisoformat(first), date.fromisoformat(last)
+
+    def revision(self):
+        """Номер последней записи курсов (0 для пустого хранилища)"""
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return row[0] if row else 0
+
+    def stamp(self):
+        """Отметка состояния хранилища (число записей, последний день, ревизия) для проверки кэша"""
+        count, last = self.connection.execute("SELECT COUNT(*), MAX(day) FROM rates").fetchone()
+        return [count, last, self.revision()]
+
+    def set_cache(self, cache):
+        """Подставляет готовую таблицу (например, из снимка курсов)"""
+        self._cache = cache
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            rows = self.connection.execute("SELECT day, code, rate FROM rates").fetchall()
+            self._cache = HistoryCache.from_rows(rows)
+        return self._cache
+
+    def rate_on(self, code, day, to_curr=BASE_CURRENCY):
+        return self.cache.rate_on(code, day, to_curr)
+
+    def convert_on(self, from_curr, to_curr, amount, day):
+        """Конвертирует сумму по курсу на дату; KeyError, если курса нет"""
+        if from_curr == to_curr:
+            return amount
+        return amount * self.cache.rate_on(from_curr, day, to_curr)
+
+    def convert_many_on(self, from_curr, to_curr, amounts, days):
+        return self.cache.convert_many(from_curr, to_curr, amounts, days)
+
+    def backfill(self, start, end, fetch, progress=None):
+        """Загружает курсы за каждый день диапазона, которого еще нет в хранилище.
+
+        fetch(day) должен вернуть (дата курсов 'ДД.ММ.ГГГГ', {код: курс}).
+        На выходные ЦБ отдает курсы последнего рабочего дня, поэтому
+        курсы сохраняются под датой из ответа, а проверенные дни
+        запоминаются, чтобы не запрашивать их повторно.
+        Возвращает число добавленных дней с курсами.
+        """
+        start, end = to_day(start), to_day(end)
+        done = {row[0] for row in self.connection.execute(
+            "SELECT DISTINCT day FROM rates UNION SELECT day FROM checked_days")}
+        today = date.today()
+
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        pending = [day for day in days if day.isoformat() not in done]
+        fetched = 0
+        for number, day in enumerate(pending, 1):
+            rates_date, rates = fetch(day)
+            rates_day = to_day(rates_date) if rates_date else day
+            # Для выходных приходят уже сохраненные курсы пятницы
+            if rates and rates_day.isoformat() not in done:
+                self.add_day(rates_day, rates)
+                done.add(rates_day.isoformat())
+                fetched += 1
+            # Сегодняшний и будущие дни ЦБ может еще опубликовать
+            if day < today:
+                with self.connection:
+                    self.connection.execute(
+                        "INSERT OR IGNORE INTO checked_days (day) VALUES (?)", (day.isoformat(),))
+            if progress:
+                progress(number, len(pending))
+        return fetched
+
+
+def cbr_fetch_day(session, url):
+    """Возвращает функцию загрузки курсов ЦБ РФ на дату для RateHistory.backfill"""
+    def fetch(day):
+        params = {'date_req': day.strftime("%d/%m/%Y")}
+        with session.get(url, params=params, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            return parse_cbr_xml(response.iter_content(READ_CHUNK_SIZE))
+
+    return fetch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="История курсов ЦБ РФ")
+    parser.add_argument("--db", default=None,
+                        help="файл хранилища (по умолчанию rate_history.db в каталоге данных)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill", help="загрузить курсы за период")
+    backfill.add_argument("start", help="первый день, ГГГГ-ММ-ДД")
+    backfill.add_argument("end", help="последний день, ГГГГ-ММ-ДД")
+    backfill.add_argument("--url", default=CBR_DAILY_URL, help="адрес XML-ленты курсов")
+
+    rate = commands.add_parser("rate", help="курс валюты на дату")
+    rate.add_argument("code")
+    rate.add_argument("day", help="ГГГГ-ММ-ДД")
+    rate.add_argument("--to", default=BASE_CURRENCY)
+    args = parser.parse_args()
+
+    history = RateHistory(args.db)
+    try:
+        if args.command == "backfill":
+            def progress(done, total):
+                print(f"\rЗагружено дней: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+            count = history.backfill(args.start, args.end,
+                                     cbr_fetch_day(create_session(), args.url), progress)
+            print(file=sys.stderr)
+            first, last = history.date_range()
+            print(f"Добавлено дней с курсами: {count}; история: {first} - {last}")
+        else:
+            code, to_curr = args.code.upper(), args.to.upper()
+            print(f"1 {code} = {history.rate_on(code, args.day, to_curr):.6f} {to_curr}")
+    except KeyError as e:
+        print(f"Ошибка: {e.args[0]}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
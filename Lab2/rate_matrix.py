@@ -0,0 +1,84 @@
+import numpy as np
+
+BASE_CURRENCY = "RUB"
+
+
+class RateMatrix:
+    """Плотная матрица кросс-курсов, построенная из курсов к рублю.
+
+    matrix[i, j] - сколько единиц валюты codes[j] стоит одна единица codes[i].
+    Объект не изменяется после создания, поэтому при обновлении курсов
+    достаточно заменить ссылку на новую матрицу.
+    """
+
+    def __init__(self, rub_rates):
+        rates = dict(rub_rates)
+        rates[BASE_CURRENCY] = 1.0
+
+        self.codes = sorted(rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        # Отсортированный массив кодов для векторного поиска через searchsorted
+        self.codes_array = np.array(self.codes)
+        self.rub = np.array([rates[code] for code in self.codes], dtype=np.float64)
+        self.matrix = self.rub[:, None] / self.rub[None, :]
+
+    @classmethod
+    def from_arrays(cls, codes, rub):
+        """Строит матрицу из отсортированных кодов (включая рубль) и массива курсов к рублю
+        без промежуточного словаря - для загрузки из снимка"""
+        matrix = cls.__new__(cls)
+        matrix.codes = list(codes)
+        matrix.index = {code: i for i, code in enumerate(matrix.codes)}
+        matrix.codes_array = np.array(matrix.codes)
+        matrix.rub = np.asarray(rub, dtype=np.float64)
+        if BASE_CURRENCY not in matrix.index or matrix.codes != sorted(matrix.codes):
+            raise ValueError("коды должны быть отсортированы и включать рубль")
+        matrix.matrix = matrix.rub[:, None] / matrix.rub[None, :]
+        return matrix
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def __len__(self):
+        return len(self.codes)
+
+    def rub_rates(self):
+        """Возвращает курсы к рублю в виде словаря {код: рублей за единицу}"""
+        return {code: float(rate) for code, rate in zip(self.codes, self.rub)}
+
+    def rate(self, from_curr, to_curr):
+        """Курс from_curr -> to_curr; KeyError для неизвестной валюты"""
+        return float(self.matrix[self.index[from_curr], self.index[to_curr]])
+
+    def convert(self, from_curr, to_curr, amount):
+        return amount * self.rate(from_curr, to_curr)
+
+    def lookup(self, codes):
+        """Переводит код или массив кодов в индексы матрицы.
+
+        Целочисленные массивы считаются уже готовыми индексами.
+        """
+        if isinstance(codes, str):
+            return self.index[codes]
+
+        codes = np.asarray(codes)
+        if codes.dtype.kind in 'iu':
+            return codes
+
+        positions = np.searchsorted(self.codes_array, codes)
+        positions = np.minimum(positions, len(self.codes) - 1)
+        unknown = self.codes_array[positions] != codes
+        if unknown.any():
+            raise KeyError(f"Неизвестные валюты: {sorted(set(codes[unknown].tolist()))}")
+        return positions
+
+    def convert_many(self, from_curr, to_curr, amounts):
+        """Векторная конвертация.
+
+        from_curr и to_curr - код валюты или массив кодов (индексов) той же
+        длины, что и amounts. Возвращает массив numpy float64.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if isinstance(from_curr, str) and isinstance(to_curr, str):
+            return amounts * self.matrix[self.index[from_curr], self.index[to_curr]]
+        return amounts * self.matrix[self.lookup(from_curr), self.lookup(to_curr)]
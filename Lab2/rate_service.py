@@ -0,0 +1,321 @@
+"""Локальный HTTP/JSON-сервис конвертации валют без графического интерфейса.
+
+Курсы берутся из того же CurrencyRates, что и в конвертере: тот же
+каталог данных (снимок, история) и то же автообновление. Загружает и
+записывает курсы только один процесс (см. CurrencyRates): если конвертер
+уже запущен, сервис перечитывает снимок после его обновлений. CurrencyRates
+работает в цикле событий Qt главного потока, а HTTP-сервер на asyncio -
+в отдельном потоке и отвечает из неизменяемой матрицы курсов в памяти.
+
+    python rate_service.py --port 8765
+    python rate_service.py --unix /tmp/rates.sock
+
+Запросы (соединения keep-alive, HTTP/1.1):
+
+    GET  /convert?from=USD&to=EUR&amount=100[&date=2024-06-15]
+    POST /convert/batch  {"from": "USD" | [...], "to": "RUB" | [...],
+                          "amounts": [...], "dates": "2024-06-15" | [...]}
+    GET  /rates
+    GET  /health
+"""
+import argparse
+import asyncio
+import json
+import math
+import signal
+import sys
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from currency_rates import CurrencyRates
+from rate_sources import cbr_xml_source
+
+DEFAULT_PORT = 8765
+# Ограничения на запрос: размер тела и время ожидания следующего запроса в соединении
+MAX_BODY_SIZE = 16 * 1024 * 1024
+IDLE_TIMEOUT = 60
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(value):
+    """float для JSON: NaN (нет курса на дату) и переполнение передаются как null"""
+    return value if math.isfinite(value) else None
+
+
+class RateService:
+    """HTTP-сервер конвертации поверх CurrencyRates.
+
+    Состояние курсов (матрица, таблица истории, сведения о свежести)
+    передается серверу методом publish() из потока Qt; сервер только
+    читает эти неизменяемые объекты и не обращается к CurrencyRates
+    и SQLite из своего потока.
+    """
+
+    def __init__(self, rates, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None):
+        self.rates = rates
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.matrix = None
+        self.history = None
+        self.info = {}
+        self.requests_served = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.routes = {
+            "/convert": ("GET", self.handle_convert),
+            "/convert/batch": ("POST", self.handle_batch),
+            "/rates": ("GET", self.handle_rates),
+            "/health": ("GET", self.handle_health),
+        }
+        self.publish()
+        rates.rates_updated.connect(self.publish)
+        rates.staleness_changed.connect(self.publish)
+
+    def publish(self):
+        """Передает серверу текущие курсы (вызывается в потоке Qt)"""
+        info = self.rates.staleness()
+        self.info = {
+            "rates_date": info['rates_date'],
+            "last_updated": self.rates.last_updated,
+            "stale": info['stale'],
+            "refreshing": info['refreshing'],
+            "last_error": info['last_error'],
+            "source": self.rates.fetcher.source,
+            # Курсы обновляет другой процесс с тем же каталогом данных
+            "follower": info['follower'],
+        }
+        self.history = self.rates.history.cache
+        self.matrix = self.rates.matrix
+
+    # --- обработчики ---
+
+    def handle_convert(self, query, body):
+        try:
+            from_curr = query["from"][0].upper()
+            to_curr = query["to"][0].upper()
+            amount = float(query.get("amount", ["1"])[0])
+        except (KeyError, ValueError):
+            raise RequestError(400, "нужны параметры from, to и числовой amount")
+        if not math.isfinite(amount):
+            raise RequestError(400, "amount должен быть конечным числом")
+        day = query.get("date", [None])[0]
+        table = self.history if day else self.matrix
+        for code in (from_curr, to_curr):
+            if code not in table.index:
+                raise RequestError(400, f"Неизвестная валюта: {code}")
+        try:
+            if day:
+                rate = table.rate_on(from_curr, day, to_curr)
+                rates_date = day
+            else:
+                rate = table.rate(from_curr, to_curr)
+                rates_date = self.info["rates_date"]
+        except KeyError as e:
+            raise RequestError(404, e.args[0])
+        except ValueError:
+            raise RequestError(400, "дата должна быть в формате ГГГГ-ММ-ДД")
+        return {"from": from_curr, "to": to_curr, "amount": amount,
+                "result": _number(amount * rate), "rate": rate, "rates_date": rates_date}
+
+    def handle_batch(self, query, body):
+        try:
+            data = json.loads(body)
+            from_curr = data["from"]
+            to_curr = data["to"]
+            amounts = np.asarray(data["amounts"], dtype=np.float64)
+        except (ValueError, KeyError, TypeError):
+            raise RequestError(400, 'нужен JSON с полями "from", "to" и числовым массивом "amounts"')
+        # json.loads принимает NaN и Infinity, но клиенты не смогут разобрать их в ответе
+        if not np.isfinite(amounts).all():
+            raise RequestError(400, '"amounts" должны быть конечными числами')
+        dates = data.get("dates")
+        table = self.history if dates is not None else self.matrix
+        # Целочисленные индексы матрицы - внутренняя возможность RateMatrix:
+        # они сдвигаются при изменении списка валют, поэтому принимаются только коды
+        for code in (from_curr, to_curr):
+            if isinstance(code, str):
+                if code not in table.index:
+                    raise RequestError(400, f"Неизвестная валюта: {code}")
+            elif not (isinstance(code, list) and all(isinstance(item, str) for item in code)):
+                raise RequestError(400, '"from" и "to" должны быть кодом валюты или списком кодов')
+        try:
+            if dates is not None:
+                results = table.convert_many(from_curr, to_curr, amounts, dates)
+            else:
+                results = table.convert_many(from_curr, to_curr, amounts)
+        except KeyError as e:
+            raise RequestError(400, e.args[0])
+        except (ValueError, IndexError):
+            raise RequestError(400, "длины массивов не совпадают или дата задана неверно")
+        results = np.broadcast_to(results, amounts.shape)
+        if dates is not None or not np.isfinite(results).all():
+            results = [_number(value) for value in results.tolist()]
+        else:
+            results = results.tolist()
+        return {"results": results, "rates_date": self.info["rates_date"]}
+
+    def handle_rates(self, query, body):
+        matrix = self.matrix
+        return {"base": "RUB", "rates_date": self.info["rates_date"],
+                "last_updated": self.info["last_updated"], "rates": matrix.rub_rates()}
+
+    def handle_health(self, query, body):
+        return dict(self.info, status="ok", currencies=len(self.matrix),
+                    history_days=len(self.history), requests_served=self.requests_served)
+
+    def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            raise RequestError(404, f"нет такого адреса: {url.path}")
+        expected, handler = route
+        if method != expected:
+            raise RequestError(405, f"{url.path} принимает только {expected}")
+        return handler(parse_qs(url.query), body)
+
+    # --- HTTP ---
+
+    async def handle_connection(self, reader, writer):
+        # Простой соединения ограничивается таймером, который перезапускается
+        # на каждый запрос: это дешевле, чем asyncio.wait_for вокруг чтения
+        loop = asyncio.get_running_loop()
+        idle = None
+        try:
+            while True:
+                idle = loop.call_later(IDLE_TIMEOUT, writer.transport.abort)
+                head = await reader.readuntil(b"\r\n\r\n")
+                idle.cancel()
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for header in header_lines:
+                    name, _, value = header.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = True
+                try:
+                    method, target, version = request_line.split()
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" \
+                        else connection != "close"
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_SIZE:
+                        keep_alive = False
+                        raise RequestError(413, "слишком большой запрос")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = 200, self.dispatch(method, target, body)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "некорректный запрос"}, False
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                self.requests_served += 1
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            if idle is not None:
+                idle.cancel()
+            writer.close()
+
+    async def _serve(self):
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self.handle_connection, self.unix_path)
+        else:
+            self._server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            # При port=0 порт выбирает система
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке и ждет, пока он начнет принимать соединения"""
+        self._thread = threading.Thread(target=self._run, name="rate-service", daemon=True)
+        self._thread.start()
+        self._ready.wait(10)
+
+    def stop(self):
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self._thread:
+            self._thread.join(5)
+
+    @property
+    def address(self):
+        return self.unix_path or f"http://{self.host}:{self.port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервис конвертации валют")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="слушать Unix-сокет вместо TCP")
+    parser.add_argument("--data-dir", help="каталог данных (как у конвертера)")
+    parser.add_argument("--ttl", type=int, default=None, help="TTL курсов, с")
+    parser.add_argument("--cbr-url", help="адрес XML_daily.asp (например, cbr_stub_server.py)")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    options = {"data_dir": args.data_dir}
+    if args.ttl:
+        options["ttl"] = args.ttl
+    if args.cbr_url:
+        options["sources"] = [cbr_xml_source(args.cbr_url)]
+    rates = CurrencyRates(**options)
+    rates.rates_error.connect(lambda message: print(f"Ошибка обновления курсов: {message}",
+                                                    file=sys.stderr))
+    rates.start_auto_refresh()
+
+    service = RateService(rates, args.host, args.port, args.unix)
+    service.start()
+    print(f"Сервис конвертации: {service.address}")
+
+    # Цикл Qt не отдает управление Python, поэтому Ctrl+C обрабатывается по таймеру
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    ticker = QTimer()
+    ticker.timeout.connect(lambda: None)
+    ticker.start(200)
+
+    code = app.exec_()
+    service.stop()
+    rates.close()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
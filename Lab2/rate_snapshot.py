@@ -0,0 +1,162 @@
+"""Компактный двоичный снимок курсов для быстрого запуска.
+
+Формат файла (все числа little-endian):
+
+    заголовок  '<8sHHIIIII': сигнатура, версия, резерв, число валют,
+               число дней истории, число валют истории, длина метаданных,
+               CRC32 всего, что идет после заголовка
+    метаданные JSON (время обновления, дата курсов, состояние источников),
+               дополненные нулями до кратности 8
+    коды валют    n_codes x 8 байт ASCII
+    курсы к рублю n_codes x float64
+    коды истории  n_hist_codes x 8 байт ASCII
+    дни истории   n_days x int64 (дни от 1970-01-01)
+    таблица       n_days x n_hist_codes x float64
+
+Массивы читаются через np.frombuffer без разбора отдельных значений.
+Запись атомарна: временный файл, fsync, os.replace.
+"""
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+SNAPSHOT_FILE = "rates.snap"
+SNAPSHOT_MAGIC = b"CBRSNAP\0"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<8sHHIIIII")
+CODE_DTYPE = "S8"
+
+
+class SnapshotError(ValueError):
+    """Файл снимка поврежден или имеет неизвестный формат"""
+
+
+def resolve_data_dir(data_dir=None):
+    """Каталог данных: явный параметр, переменная CURRENCY_DATA_DIR или каталог модуля"""
+    data_dir = data_dir or os.environ.get("CURRENCY_DATA_DIR") \
+        or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+def _pad(data):
+    return data + b"\0" * (-len(data) % 8)
+
+
+def atomic_write(path, data):
+    """Записывает файл целиком или не записывает вовсе.
+
+    Данные пишутся во временный файл в том же каталоге, сбрасываются
+    на диск и атомарно подменяют старый файл.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Запись о переименовании тоже должна попасть на диск
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def encode_snapshot(codes, rub, meta, history=None):
+    """Собирает снимок в байты.
+
+    codes/rub - коды валют и курсы к рублю, meta - словарь для JSON,
+    history - HistoryCache или None.
+    """
+    if any(len(code) > 8 for code in codes):
+        raise ValueError("код валюты длиннее 8 символов")
+    meta_bytes = _pad(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    meta_len = len(meta_bytes)
+    parts = [
+        meta_bytes,
+        np.asarray(codes, dtype=CODE_DTYPE).tobytes(),
+        np.asarray(rub, dtype="<f8").tobytes(),
+    ]
+    n_days = n_hist_codes = 0
+    if history is not None and len(history):
+        n_days, n_hist_codes = history.table.shape
+        parts += [
+            np.asarray(history.codes, dtype=CODE_DTYPE).tobytes(),
+            history.days.astype("<i8").tobytes(),
+            np.ascontiguousarray(history.table, dtype="<f8").tobytes(),
+        ]
+    payload = b"".join(parts)
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(codes), n_days,
+                         n_hist_codes, meta_len, zlib.crc32(payload))
+    return header + payload
+
+
+def decode_snapshot(data):
+    """Разбирает снимок.
+
+    Возвращает словарь: codes (список), rub (массив float64), meta,
+    history - (дни datetime64[D], коды, таблица) или None.
+    SnapshotError при повреждении файла.
+    """
+    if len(data) < HEADER.size:
+        raise SnapshotError("файл снимка обрезан")
+    magic, version, _, n_codes, n_days, n_hist_codes, meta_len, crc = \
+        HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("неизвестная сигнатура файла снимка")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"неподдерживаемая версия снимка: {version}")
+    payload = memoryview(data)[HEADER.size:]
+    expected = meta_len + 16 * n_codes + 8 * n_hist_codes + 8 * n_days * (1 + n_hist_codes)
+    if len(payload) != expected:
+        raise SnapshotError("размер файла снимка не совпадает с заголовком")
+    if zlib.crc32(payload) != crc:
+        raise SnapshotError("контрольная сумма снимка не совпадает")
+
+    offset = 0
+
+    def take(count, dtype):
+        nonlocal offset
+        array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        return array
+
+    try:
+        meta = json.loads(bytes(payload[:meta_len]).rstrip(b"\0").decode("utf-8"))
+    except ValueError as e:
+        raise SnapshotError(f"метаданные снимка не читаются: {e}") from e
+    offset = meta_len
+    codes = take(n_codes, CODE_DTYPE).astype(str).tolist()
+    rub = take(n_codes, "<f8")
+    history = None
+    if n_days:
+        hist_codes = take(n_hist_codes, CODE_DTYPE).astype(str).tolist()
+        days = take(n_days, "<i8").astype("datetime64[D]")
+        table = take(n_days * n_hist_codes, "<f8").reshape(n_days, n_hist_codes)
+        history = (days, hist_codes, table)
+    return {"codes": codes, "rub": rub, "meta": meta, "history": history}
+
+
+def save_snapshot(path, codes, rub, meta, history=None):
+    atomic_write(path, encode_snapshot(codes, rub, meta, history))
+
+
+def load_snapshot(path):
+    """Читает снимок; OSError, если файла нет, SnapshotError, если он поврежден"""
+    with open(path, "rb") as f:
+        return decode_snapshot(f.read())
@@ -0,0 +1,405 @@
+"""Источники курсов валют и их параллельный опрос.
+
+RateSource - один HTTP-источник (адрес, разборщик ответа, таймаут,
+автомат отключения CircuitBreaker). RateAggregator опрашивает все
+доступные источники одновременно в пуле потоков и возвращает первый
+корректный ответ или медиану по нескольким ответам.
+"""
+import json
+import statistics
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# XML-лента ЦБ РФ с курсами на день (в 20 раз меньше HTML-страницы с таблицей)
+CBR_DAILY_URL = "https://www.cbr.ru/scripts/XML_daily.asp"
+# Зеркало тех же курсов ЦБ в формате JSON
+CBR_JSON_URL = "https://www.cbr-xml-daily.ru/daily_json.js"
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+READ_CHUNK_SIZE = 8192
+
+# Без этих курсов ответ источника считается некорректным
+REQUIRED_CURRENCIES = ("USD", "EUR")
+
+MODE_FIRST = "first"
+MODE_CONSENSUS = "consensus"
+
+# Ответ источника: дата курсов 'ДД.ММ.ГГГГ', курсы к рублю,
+# признак ответа 304 и время запроса в секундах
+SourceResult = namedtuple("SourceResult", "source rates_date rates not_modified latency")
+# Итог опроса: source - имя источника (или нескольких через запятую)
+AggregateResult = namedtuple("AggregateResult", "source rates_date rates not_modified results")
+
+
+def create_session(retries=3, backoff=0.5):
+    """Создает сессию с пулом соединений и повторами при сбоях сервера.
+
+    Повторяются только GET-запросы при ошибках соединения и ответах
+    429/5xx; пауза между попытками растет как backoff * 2^n.
+    """
+    retry = Retry(total=retries, backoff_factor=backoff,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'GET'}),
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=4)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def _parse_decimal(text):
+    return float(text.strip().replace(',', '.'))
+
+
+def parse_cbr_xml(chunks):
+    """Потоково разбирает XML-ленту ЦБ РФ.
+
+    chunks - итератор байтовых блоков (например, response.iter_content()).
+    Возвращает (дата курсов 'ДД.ММ.ГГГГ', {код: рублей за 1 единицу}).
+    Разобранные элементы сразу очищаются, поэтому дерево целиком
+    в памяти не строится.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    rates_date = None
+    rates = {}
+
+    def handle_events():
+        nonlocal rates_date
+        for event, element in parser.read_events():
+            if event == 'start':
+                if element.tag == 'ValCurs':
+                    rates_date = element.get('Date')
+                continue
+            if element.tag != 'Valute':
+                continue
+            code = (element.findtext('CharCode') or '').strip()
+            try:
+                nominal = int(element.findtext('Nominal'))
+                value = _parse_decimal(element.findtext('Value'))
+            except (TypeError, ValueError):
+                element.clear()
+                continue  # Пропускаем записи с некорректными данными
+            if code and nominal > 0:
+                # Приводим к курсу за 1 единицу валюты
+                rates[code] = value / nominal
+            element.clear()
+
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            handle_events()
+    parser.close()
+    handle_events()
+    return rates_date, rates
+
+
+def parse_cbr_json(chunks):
+    """Разбирает JSON-зеркало курсов ЦБ (daily_json.js).
+
+    Возвращает то же, что parse_cbr_xml: (дата 'ДД.ММ.ГГГГ', {код: курс}).
+    """
+    data = json.loads(b"".join(chunks))
+    rates_date = None
+    if data.get('Date'):
+        rates_date = datetime.fromisoformat(data['Date']).strftime("%d.%m.%Y")
+    rates = {}
+    for code, valute in data.get('Valute', {}).items():
+        try:
+            nominal = int(valute['Nominal'])
+            value = float(valute['Value'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if nominal > 0:
+            rates[code] = value / nominal
+    return rates_date, rates
+
+
+def is_valid_rates(rates, required=REQUIRED_CURRENCIES):
+    """Ответ пригоден, если в нем есть обязательные валюты с положительным курсом"""
+    return bool(rates) and all(rates.get(code, 0) > 0 for code in required)
+
+
+class CircuitBreaker:
+    """Автомат отключения неисправного источника.
+
+    После failure_threshold ошибок подряд источник отключается (open) на
+    reset_timeout секунд, затем пропускается один пробный запрос
+    (half_open): успех возвращает источник в работу, ошибка - снова
+    отключает.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._state = self.CLOSED
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        if self._state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_running = False
+
+    def allow_request(self):
+        """Можно ли сейчас обращаться к источнику"""
+        with self._lock:
+            self._update_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class RateSource:
+    """HTTP-источник курсов с условными запросами и статистикой задержек.
+
+    parser(chunks) разбирает тело ответа и возвращает (дата, {код: курс}).
+    ETag/Last-Modified и последние курсы запоминаются, поэтому ответ 304
+    возвращает уже известные курсы без повторной загрузки.
+    """
+
+    def __init__(self, name, url, parser, timeout=5.0, breaker=None):
+        self.name = name
+        self.url = url
+        self.parser = parser
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.etag = None
+        self.last_modified = None
+        self.last_rates = None
+        self.last_date = None
+        # Статистика: последняя и сглаженная задержка, число успехов и ошибок
+        self.latency = None
+        self.avg_latency = None
+        self.successes = 0
+        self.failures = 0
+        self.last_error = None
+
+    def fetch(self, session):
+        """Запрашивает курсы; при ошибке или превышении таймаута бросает исключение"""
+        start = time.perf_counter()
+        try:
+            result = self._fetch(session, start)
+            if result.latency > self.timeout:
+                raise TimeoutError(f"ответ получен за {result.latency:.1f} с "
+                                   f"(таймаут {self.timeout:.1f} с)")
+        except Exception as e:
+            self._record(time.perf_counter() - start, e)
+            raise
+        self._record(result.latency)
+        return result
+
+    def _fetch(self, session, start):
+        headers = {}
+        # Без сохраненных курсов ответ 304 бесполезен
+        if self.last_rates is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+        with session.get(self.url, headers=headers, timeout=self.timeout,
+                         stream=True) as response:
+            if response.status_code == 304:
+                return SourceResult(self.name, self.last_date, self.last_rates, True,
+                                    time.perf_counter() - start)
+            response.raise_for_status()
+            rates_date, rates = self.parser(response.iter_content(READ_CHUNK_SIZE))
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        if not is_valid_rates(rates):
+            raise ValueError("в ответе нет курсов основных валют")
+        self.etag = etag
+        self.last_modified = last_modified
+        self.last_rates = rates
+        self.last_date = rates_date
+        return SourceResult(self.name, rates_date, rates, False, time.perf_counter() - start)
+
+    def _record(self, latency, error=None):
+        self.latency = latency
+        # Экспоненциальное сглаживание, чтобы единичный выброс не искажал картину
+        self.avg_latency = latency if self.avg_latency is None else \
+            0.7 * self.avg_latency + 0.3 * latency
+        if error is None:
+            self.successes += 1
+            self.last_error = None
+            self.breaker.record_success()
+        else:
+            self.failures += 1
+            self.last_error = str(error)
+            self.breaker.record_failure()
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'url': self.url,
+            'state': self.breaker.state,
+            'latency': self.latency,
+            'avg_latency': self.avg_latency,
+            'successes': self.successes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+    def state(self):
+        """Валидаторы и последние курсы для сохранения между запусками"""
+        if self.last_rates is None:
+            return None
+        return {'etag': self.etag, 'last_modified': self.last_modified,
+                'rates_date': self.last_date, 'rates': self.last_rates}
+
+    def restore(self, state):
+        self.etag = state.get('etag')
+        self.last_modified = state.get('last_modified')
+        self.last_date = state.get('rates_date')
+        self.last_rates = state.get('rates')
+
+
+def cbr_xml_source(url=CBR_DAILY_URL, timeout=5.0):
+    return RateSource("cbr.ru", url, parse_cbr_xml, timeout)
+
+
+def cbr_json_source(url=CBR_JSON_URL, timeout=5.0):
+    return RateSource("cbr-xml-daily.ru", url, parse_cbr_json, timeout)
+
+
+def default_sources():
+    return [cbr_xml_source(), cbr_json_source()]
+
+
+class RateAggregator:
+    """Параллельно опрашивает источники курсов.
+
+    mode=MODE_FIRST - возвращается первый корректный ответ, остальные
+    запросы завершаются в фоне (их задержка все равно учитывается);
+    mode=MODE_CONSENSUS - ждет все источники (не дольше их таймаутов) и
+    берет медиану курсов по ответам с самой свежей датой.
+    Отключенные автоматом источники не опрашиваются, как и источники,
+    чей прошлый запрос еще не завершился: зависший сервер не занимает
+    новые потоки пула.
+    """
+
+    def __init__(self, sources=None, mode=MODE_FIRST, session=None):
+        self.sources = list(sources) if sources is not None else default_sources()
+        self.mode = mode
+        # Повторы внутри сессии короткие: вместо долгого ожидания
+        # одного источника работают остальные
+        self.session = session or create_session(retries=1, backoff=0.2)
+        self.pool = ThreadPoolExecutor(max_workers=max(len(self.sources), 1),
+                                       thread_name_prefix="rate-source")
+        self._running = {}
+
+    def fetch(self):
+        """Опрашивает источники; RuntimeError, если ни один не дал корректных курсов"""
+        busy = [source for source in self.sources
+                if source in self._running and not self._running[source].done()]
+        active = [source for source in self.sources
+                  if source not in busy and source.breaker.allow_request()]
+        if not active:
+            if busy:
+                raise RuntimeError("источники курсов еще не ответили на прошлый запрос")
+            raise RuntimeError("все источники курсов временно отключены после ошибок")
+
+        futures = {self.pool.submit(source.fetch, self.session): source for source in active}
+        for future, source in futures.items():
+            self._running[source] = future
+        deadline = time.monotonic() + max(source.timeout for source in active)
+        results = []
+        errors = []
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(f"{futures[future].name}: {e}")
+            if self.mode == MODE_FIRST and results:
+                break
+
+        for future in pending:
+            errors.append(f"{futures[future].name}: нет ответа за {futures[future].timeout:.1f} с")
+        if not results:
+            raise RuntimeError("ни один источник не ответил: " + "; ".join(errors))
+
+        if self.mode == MODE_FIRST:
+            first = results[0]
+            return AggregateResult(first.source, first.rates_date, first.rates,
+                                   first.not_modified, results)
+        return self._consensus(results)
+
+    def _consensus(self, results):
+        # Источники могут отставать на день: сравниваем только самые свежие курсы
+        def day_key(result):
+            try:
+                return datetime.strptime(result.rates_date, "%d.%m.%Y")
+            except (TypeError, ValueError):
+                return datetime.min
+
+        latest = max(day_key(result) for result in results)
+        fresh = [result for result in results if day_key(result) == latest]
+        codes = set().union(*(result.rates for result in fresh))
+        rates = {code: statistics.median(result.rates[code] for result in fresh
+                                         if code in result.rates)
+                 for code in codes}
+        return AggregateResult(",".join(result.source for result in fresh),
+                               fresh[0].rates_date, rates,
+                               all(result.not_modified for result in fresh), results)
+
+    def stats(self):
+        """Состояние и задержка каждого источника"""
+        return [source.stats() for source in self.sources]
+
+    def state(self):
+        return {source.name: source.state() for source in self.sources
+                if source.state() is not None}
+
+    def restore(self, state):
+        for source in self.sources:
+            if source.name in state:
+                source.restore(state[source.name])
+
+    def close(self):
+        self.pool.shutdown(wait=False)
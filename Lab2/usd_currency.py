@@ -1,8 +0,0 @@
-from PyQt5.QtCore import QObject, pyqtSignal
-
-
-class USDCurrency(QObject):
-    valueChanged = pyqtSignal(float)
-
-    def __init__(self):
-        super().__init__()
\ No newline at end of file
@@ -74,6 +74,11 @@ def create_transport_database():
         )
     ''')
     
+    # Индексы для выборки рейсов по времени (хронология рейсов)
+    cursor.execute('CREATE INDEX idx_trips_departure ON trips (departure_time)')
+    cursor.execute('CREATE INDEX idx_trips_vehicle_departure ON trips (vehicle_id, departure_time)')
+    cursor.execute('CREATE INDEX idx_trips_driver_departure ON trips (driver_id, departure_time)')
+    
     # Создаем таблицу клиентов
     cursor.execute('''
         CREATE TABLE clients (
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import statistics
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, QEvent, pyqtSignal
+
+# Ограничение числа строк, просматриваемых ANALYZE на индекс (PRAGMA analysis_limit)
+ANALYSIS_LIMIT = 1000
+# Сколько страниц освобождать за один запуск инкрементальной очистки
+INCREMENTAL_VACUUM_PAGES = 2000
+# Сколько раз выполнять каждый запрос при замере задержки
+LATENCY_RUNS = 3
+
+AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+
+def maintenance_log_path(db_path):
+    """Файл с историей обслуживания лежит рядом с БД"""
+    return db_path + ".maintenance.json"
+
+
+def load_maintenance_log(db_path):
+    try:
+        with open(maintenance_log_path(db_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_maintenance_log(db_path, data):
+    try:
+        with open(maintenance_log_path(db_path), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+    except OSError as e:
+        print(f"Ошибка сохранения журнала обслуживания: {e}")
+
+
+def collect_db_stats(connection, db_path):
+    """Собирает размер файла, число свободных страниц и возраст статистики планировщика"""
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+    has_stats = connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'"
+    ).fetchone()[0] > 0
+
+    last_analyze = load_maintenance_log(db_path).get('last_analyze')
+    stats_age_hours = None
+    if last_analyze:
+        analyzed_at = datetime.strptime(last_analyze, "%Y-%m-%d %H:%M:%S")
+        stats_age_hours = (datetime.now() - analyzed_at).total_seconds() / 3600
+
+    return {
+        'file_size': os.path.getsize(db_path),
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist,
+        'freelist_bytes': freelist * page_size,
+        'auto_vacuum': AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+        'has_stats': has_stats,
+        'last_analyze': last_analyze,
+        'stats_age_hours': stats_age_hours,
+    }
+
+
+def measure_latency(connection, queries):
+    """Возвращает медианное время выполнения каждого запроса в миллисекундах"""
+    latency = {}
+    for name, sql in queries.items():
+        runs = []
+        for _ in range(LATENCY_RUNS):
+            start = time.perf_counter()
+            connection.execute(sql).fetchall()
+            runs.append((time.perf_counter() - start) * 1000)
+        latency[name] = statistics.median(runs)
+    return latency
+
+
+class MaintenanceWorkerSignals(QObject):
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+
+class MaintenanceWorker(QRunnable):
+    """Обслуживание БД на отдельном соединении в фоновом потоке.
+
+    Выполняет ANALYZE с ограничением analysis_limit, PRAGMA optimize и,
+    если БД создана с auto_vacuum=INCREMENTAL, порцию инкрементальной
+    очистки. До и после собирает состояние файла и задержку запросов.
+    """
+
+    def __init__(self, db_path, queries, enable_incremental=False):
+        super().__init__()
+        self.db_path = db_path
+        self.queries = queries
+        self.enable_incremental = enable_incremental
+        self.signals = MaintenanceWorkerSignals()
+
+    def run(self):
+        try:
+            report = self._run_maintenance()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(report)
+
+    def _run_maintenance(self):
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        # Управляем транзакциями сами: VACUUM и PRAGMA нельзя выполнять внутри транзакции
+        connection.isolation_level = None
+        try:
+            self.signals.progress.emit("Обслуживание БД: замер до")
+            before = collect_db_stats(connection, self.db_path)
+            before['latency'] = measure_latency(connection, self.queries)
+            steps = []
+
+            if self.enable_incremental and before['auto_vacuum'] != "INCREMENTAL":
+                # Режим auto_vacuum меняется только полной перестройкой файла
+                self.signals.progress.emit("Обслуживание БД: VACUUM")
+                start = time.perf_counter()
+                connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                connection.execute("VACUUM")
+                steps.append(("VACUUM (auto_vacuum = INCREMENTAL)", time.perf_counter() - start))
+
+            self.signals.progress.emit("Обслуживание БД: ANALYZE")
+            start = time.perf_counter()
+            connection.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            connection.execute("ANALYZE")
+            steps.append((f"ANALYZE (analysis_limit = {ANALYSIS_LIMIT})", time.perf_counter() - start))
+
+            start = time.perf_counter()
+            connection.execute("PRAGMA optimize")
+            steps.append(("PRAGMA optimize", time.perf_counter() - start))
+
+            auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if AUTO_VACUUM_MODES.get(auto_vacuum) == "INCREMENTAL":
+                self.signals.progress.emit("Обслуживание БД: incremental_vacuum")
+                start = time.perf_counter()
+                connection.execute(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES})").fetchall()
+                steps.append((f"incremental_vacuum({INCREMENTAL_VACUUM_PAGES})",
+                              time.perf_counter() - start))
+
+            log = load_maintenance_log(self.db_path)
+            log['last_analyze'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            save_maintenance_log(self.db_path, log)
+
+            self.signals.progress.emit("Обслуживание БД: замер после")
+            after = collect_db_stats(connection, self.db_path)
+            after['latency'] = measure_latency(connection, self.queries)
+        finally:
+            connection.close()
+
+        return {'before': before, 'after': after, 'steps': steps}
+
+
+class MaintenanceScheduler(QObject):
+    """Запускает обслуживание БД, когда пользователь ничего не делает.
+
+    Активность отслеживается фильтром событий приложения: любое нажатие
+    клавиши, клика или прокрутки откладывает запуск на idle_seconds.
+    """
+    started = pyqtSignal()
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    INPUT_EVENTS = (QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.Wheel)
+
+    def __init__(self, idle_seconds=120, min_interval_hours=6, parent=None):
+        super().__init__(parent)
+        self.idle_seconds = idle_seconds
+        self.min_interval_hours = min_interval_hours
+        self.db_path = None
+        self.queries = {}
+        self.running = False
+        self.last_activity = time.monotonic()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(30000)
+        self.timer.timeout.connect(self._check_idle)
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.INPUT_EVENTS:
+            self.last_activity = time.monotonic()
+        return False
+
+    def set_database(self, db_path, queries):
+        """Задает БД и запросы для замера задержки; None останавливает планировщик"""
+        self.db_path = db_path
+        self.queries = queries
+        if db_path:
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def _check_idle(self):
+        if self.running or not self.db_path:
+            return
+        if time.monotonic() - self.last_activity < self.idle_seconds:
+            return
+        last_analyze = load_maintenance_log(self.db_path).get('last_analyze')
+        if last_analyze:
+            age = datetime.now() - datetime.strptime(last_analyze, "%Y-%m-%d %H:%M:%S")
+            if age.total_seconds() < self.min_interval_hours * 3600:
+                return
+        self.run_now()
+
+    def run_now(self, enable_incremental=False):
+        """Запускает обслуживание немедленно"""
+        if self.running or not self.db_path:
+            return False
+        worker = MaintenanceWorker(self.db_path, dict(self.queries), enable_incremental)
+        worker.signals.progress.connect(self.progress)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.error.connect(self._on_error)
+        self.running = True
+        self.started.emit()
+        self.pool.start(worker)
+        return True
+
+    def _on_finished(self, report):
+        self.running = False
+        self.finished.emit(report)
+
+    def _on_error(self, message):
+        self.running = False
+        self.error.emit(message)
@@ -0,0 +1,222 @@
+from collections import defaultdict
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor
+
+
+class EditableTableModel(QAbstractTableModel):
+    """Редактируемая модель таблицы БД.
+
+    Изменения не пишутся в БД сразу: модель запоминает измененные строки
+    по первичному ключу и отдает их пакетом через pending_updates().
+    """
+    dirtyChanged = pyqtSignal(int)
+
+    DIRTY_COLOR = QColor(90, 70, 20)
+
+    def __init__(self, connection, table, columns, primary_key, order_by=None, parent=None):
+        super().__init__(parent)
+        self.connection = connection
+        self.table = table
+        self.primary_key = primary_key
+        # Первичный ключ всегда идет первой колонкой и не редактируется
+        self.columns = [primary_key] + [c for c in columns if c != primary_key]
+        self.order_by = order_by or primary_key
+        self._types = {}
+        self._rows = []
+        self._row_by_pk = {}
+        self._original = {}  # pk -> исходная строка до первого изменения
+        self._dirty = defaultdict(dict)  # pk -> {индекс колонки: новое значение}
+        self.load()
+
+    def load(self):
+        """Загружает данные таблицы и сбрасывает все несохраненные изменения"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"PRAGMA table_info({self.table})")
+        self._types = {col[1]: (col[2] or '').upper() for col in cursor.fetchall()}
+
+        cursor.execute(
+            f"SELECT {', '.join(self.columns)} FROM {self.table} ORDER BY {self.order_by}"
+        )
+        self.beginResetModel()
+        self._rows = [list(row) for row in cursor.fetchall()]
+        self._row_by_pk = {row[0]: i for i, row in enumerate(self._rows)}
+        self._original.clear()
+        self._dirty.clear()
+        self.endResetModel()
+        self.dirtyChanged.emit(0)
+
+    # --- Интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return "" if value is None else str(value)
+        if role == Qt.BackgroundRole:
+            pk = self._rows[index.row()][0]
+            if index.column() in self._dirty.get(pk, ()):
+                return self.DIRTY_COLOR
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() > 0:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() == 0:
+            return False
+        try:
+            self._set_cell(index.row(), index.column(), value)
+        except ValueError:
+            return False
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole, Qt.BackgroundRole])
+        self.dirtyChanged.emit(self.dirty_count())
+        return True
+
+    # --- Пакетное редактирование ---
+
+    def set_values(self, indexes, value):
+        """Записывает одно значение во все переданные ячейки одним обновлением вида"""
+        indexes = [i for i in indexes if i.isValid() and i.column() > 0]
+        if not indexes:
+            return 0
+        # Сначала проверяем значение для всех колонок, чтобы не применить его частично
+        for column in {i.column() for i in indexes}:
+            self._coerce(self.columns[column], value)
+        for index in indexes:
+            self._set_cell(index.row(), index.column(), value)
+
+        rows = [i.row() for i in indexes]
+        cols = [i.column() for i in indexes]
+        self.dataChanged.emit(
+            self.index(min(rows), min(cols)),
+            self.index(max(rows), max(cols)),
+            [Qt.DisplayRole, Qt.EditRole, Qt.BackgroundRole]
+        )
+        self.dirtyChanged.emit(self.dirty_count())
+        return len(indexes)
+
+    def _set_cell(self, row, column, value):
+        value = self._coerce(self.columns[column], value)
+        data_row = self._rows[row]
+        pk = data_row[0]
+        original = self._original.setdefault(pk, tuple(data_row))
+        data_row[column] = value
+
+        if value == original[column]:
+            changes = self._dirty.get(pk)
+            if changes:
+                changes.pop(column, None)
+            if not self._dirty.get(pk):
+                self._dirty.pop(pk, None)
+                self._original.pop(pk, None)
+        else:
+            self._dirty[pk][column] = value
+
+    def _coerce(self, column, value):
+        """Приводит введенный текст к типу колонки (ValueError при неверном вводе)"""
+        if value is None:
+            return None
+        text = str(value).strip()
+        if text == "":
+            return None
+        col_type = self._types.get(column, '')
+        if 'INT' in col_type:
+            return int(text)
+        if any(t in col_type for t in ('REAL', 'FLOA', 'DOUB', 'NUMERIC')):
+            return float(text.replace(',', '.'))
+        return text
+
+    # --- Запись в БД ---
+
+    def dirty_count(self):
+        """Количество измененных строк"""
+        return len(self._dirty)
+
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def pending_updates(self):
+        """Возвращает список (sql, параметры) для executemany.
+
+        Строки группируются по набору измененных колонок, поэтому на каждую
+        группу приходится один подготовленный UPDATE.
+        """
+        groups = defaultdict(list)
+        for pk, changes in self._dirty.items():
+            cols = tuple(sorted(changes))
+            groups[cols].append([changes[c] for c in cols] + [pk])
+
+        updates = []
+        for cols, params in groups.items():
+            assignments = ", ".join(f"{self.columns[c]} = ?" for c in cols)
+            sql = f"UPDATE {self.table} SET {assignments} WHERE {self.primary_key} = ?"
+            updates.append((sql, params))
+        return updates
+
+    def mark_saved(self):
+        """Вызывается после успешного коммита: изменения становятся исходными данными"""
+        rows = [self._row_by_pk[pk] for pk in self._dirty]
+        self._dirty.clear()
+        self._original.clear()
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), 0),
+                self.index(max(rows), len(self.columns) - 1),
+                [Qt.BackgroundRole]
+            )
+        self.dirtyChanged.emit(0)
+
+    def revert_changes(self):
+        """Отменяет все несохраненные изменения"""
+        rows = []
+        for pk, original in self._original.items():
+            row = self._row_by_pk[pk]
+            self._rows[row] = list(original)
+            rows.append(row)
+        self._dirty.clear()
+        self._original.clear()
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), 0),
+                self.index(max(rows), len(self.columns) - 1)
+            )
+        self.dirtyChanged.emit(0)
+
+
+def save_models(connection, models):
+    """Сохраняет изменения нескольких моделей в одной транзакции.
+
+    Возвращает количество сохраненных строк. При ошибке транзакция
+    откатывается, а изменения остаются в моделях.
+    """
+    models = [m for m in models if m.is_dirty()]
+    if not models:
+        return 0
+
+    saved = 0
+    with connection:
+        cursor = connection.cursor()
+        for model in models:
+            for sql, params in model.pending_updates():
+                cursor.executemany(sql, params)
+            saved += model.dirty_count()
+
+    for model in models:
+        model.mark_saved()
+    return saved
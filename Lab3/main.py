@@ -4,9 +4,141 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QVBoxLayout,
                              QWidget, QPushButton, QFileDialog, QMessageBox, 
                              QTableView, QComboBox, QDialog, QTextEdit, 
                              QHBoxLayout, QLabel, QDialogButtonBox, QToolBar,
-                             QStatusBar, QMenuBar, QHeaderView, QFrame)
-from PyQt5.QtGui import QStandardItemModel, QStandardItem, QFont, QPalette, QColor
-from PyQt5.QtCore import Qt
+                             QStatusBar, QMenuBar, QHeaderView, QFrame,
+                             QInputDialog, QAbstractItemView)
+from PyQt5.QtGui import QStandardItemModel, QStandardItem, QFont, QPalette, QColor, QKeySequence
+from PyQt5.QtCore import Qt, QThreadPool
+
+from editable_table_model import EditableTableModel, save_models
+from report_worker import QueryWorker
+from trip_timeline import TripTimeline, ensure_timeline_indexes
+from db_maintenance import MaintenanceScheduler, collect_db_stats
+
+# Вкладки главного окна и их описания
+TAB_NAMES = [
+    "Схема БД",
+    "Список таблиц",
+    "Данные по колонке",
+    "Водители",
+    "Транспорт",
+    "Рейсы",
+    "Доходы",
+    "Хронология",
+    "Обслуживание"
+]
+
+TAB_DESCRIPTIONS = [
+    "Информация о структуре базы данных",
+    "Список всех таблиц в системе",
+    "Просмотр данных по выбранной колонке",
+    "Управление водителями и их данными",
+    "Информация о транспортных средствах",
+    "Отслеживание рейсов и маршрутов",
+    "Доходы от выполненных рейсов",
+    "Рейсы по транспорту и водителям на оси времени",
+    "Состояние файла БД и результаты обслуживания"
+]
+
+# Готовые отчеты: вкладка, заголовок и SQL-запрос
+REPORTS = {
+    'drivers': {
+        'tab': 3,
+        'title': "Список водителей",
+        'sql': '''
+            SELECT 
+                driver_id,
+                first_name,
+                last_name,
+                license_number,
+                phone,
+                email,
+                hire_date,
+                status,
+                salary
+            FROM drivers
+            ORDER BY status, last_name
+        ''',
+    },
+    'vehicles': {
+        'tab': 4,
+        'title': "Список транспортных средств",
+        'sql': '''
+            SELECT 
+                vehicle_id,
+                license_plate,
+                model,
+                type,
+                capacity_kg,
+                year,
+                status,
+                last_maintenance,
+                next_maintenance
+            FROM vehicles
+            ORDER BY status, model
+        ''',
+    },
+    'active_trips': {
+        'tab': 5,
+        'title': "Активные и запланированные рейсы",
+        'sql': '''
+            SELECT t.trip_id, r.start_city, r.end_city, 
+                   d.first_name || ' ' || d.last_name as driver,
+                   v.license_plate, t.departure_time, t.status
+            FROM trips t
+            JOIN routes r ON t.route_id = r.route_id
+            JOIN drivers d ON t.driver_id = d.driver_id
+            JOIN vehicles v ON t.vehicle_id = v.vehicle_id
+            WHERE t.status IN ('in_progress', 'scheduled')
+            ORDER BY t.departure_time
+        ''',
+    },
+    'revenue': {
+        'tab': 6,
+        'title': "Отчет по доходам от выполненных рейсов",
+        'sql': '''
+            SELECT 
+                t.trip_id,
+                r.start_city || ' - ' || r.end_city as route,
+                t.cargo_description,
+                t.cargo_weight_kg,
+                t.revenue,
+                t.departure_time
+            FROM trips t
+            JOIN routes r ON t.route_id = r.route_id
+            WHERE t.status = 'completed'
+            ORDER BY t.revenue DESC
+        ''',
+    },
+}
+
+# Таблицы, доступные для редактирования: вкладка, колонки и сортировка
+EDITABLE_TABLES = {
+    'drivers': {
+        'tab': 3,
+        'title': "Редактирование водителей",
+        'primary_key': 'driver_id',
+        'columns': ['first_name', 'last_name', 'license_number', 'phone',
+                    'email', 'hire_date', 'status', 'salary'],
+        'order_by': 'status, last_name',
+    },
+    'vehicles': {
+        'tab': 4,
+        'title': "Редактирование транспорта",
+        'primary_key': 'vehicle_id',
+        'columns': ['license_plate', 'model', 'type', 'capacity_kg', 'year',
+                    'status', 'last_maintenance', 'next_maintenance'],
+        'order_by': 'status, model',
+    },
+    'trips': {
+        'tab': 5,
+        'title': "Редактирование рейсов",
+        'primary_key': 'trip_id',
+        'columns': ['route_id', 'driver_id', 'vehicle_id', 'departure_time',
+                    'arrival_time', 'actual_distance_km', 'status',
+                    'cargo_description', 'cargo_weight_kg', 'revenue'],
+        'order_by': 'departure_time',
+    },
+}
 
 class QueryDialog(QDialog):
     """Модальное окно для выполнения произвольных SQL-запросов"""
@@ -164,6 +296,24 @@ class TransportApp(QMainWindow):
         super().__init__()
         self.connection = None
         self.current_db_path = None
+        self.editable_models = {}  # индекс вкладки -> EditableTableModel
+        
+        # Пул потоков для параллельного обновления отчетов
+        self.report_pool = QThreadPool()
+        self.report_pool.setMaxThreadCount(len(REPORTS))
+        self.pending_reports = set()
+        # Сигналы воркеров текущего обновления: имя отчета -> QueryWorkerSignals.
+        # Результаты других воркеров (например, по прежней БД) отбрасываются
+        self.report_signals = {}
+        # Отчеты текущего обновления, пропущенные из-за несохраненных изменений
+        self.skipped_reports = []
+        
+        # Фоновое обслуживание БД во время простоя
+        self.maintenance = MaintenanceScheduler(parent=self)
+        self.maintenance.progress.connect(lambda text: self.status_bar.showMessage(text))
+        self.maintenance.finished.connect(self.on_maintenance_finished)
+        self.maintenance.error.connect(self.on_maintenance_error)
+        QApplication.instance().installEventFilter(self.maintenance)
         self.init_ui()
         
     def init_ui(self):
@@ -323,16 +473,7 @@ class TransportApp(QMainWindow):
         
     def create_initial_tabs(self):
         """Создает начальные пустые вкладки с красивым оформлением в темной теме"""
-        tab_names = [
-            "Схема БД",
-            "Список таблиц", 
-            "Данные по колонке",
-            "Водители",
-            "Транспорт",
-            "Рейсы"
-        ]
-        
-        for i, name in enumerate(tab_names):
+        for i, name in enumerate(TAB_NAMES):
             tab = QWidget()
             layout = QVBoxLayout()
             layout.setAlignment(Qt.AlignCenter)
@@ -350,17 +491,8 @@ class TransportApp(QMainWindow):
             """)
             layout.addWidget(title_label)
             
-            # Добавляем иконку и описание
-            descriptions = [
-                "Информация о структуре базы данных",
-                "Список всех таблиц в системе",
-                "Просмотр данных по выбранной колонке", 
-                "Управление водителями и их данными",
-                "Информация о транспортных средствах",
-                "Отслеживание рейсов и маршрутов"
-            ]
-            
-            desc_label = QLabel(descriptions[i])
+            # Добавляем описание
+            desc_label = QLabel(TAB_DESCRIPTIONS[i])
             desc_label.setAlignment(Qt.AlignCenter)
             desc_label.setStyleSheet("""
                 QLabel {
@@ -404,6 +536,35 @@ class TransportApp(QMainWindow):
         query_menu = menubar.addMenu('Запросы')
         custom_query_action = query_menu.addAction('Произвольный SQL-запрос')
         custom_query_action.triggered.connect(self.show_custom_query_dialog)
+        refresh_all_action = query_menu.addAction('Обновить все отчеты')
+        refresh_all_action.setShortcut(QKeySequence.Refresh)
+        refresh_all_action.triggered.connect(self.refresh_all_reports)
+        timeline_action = query_menu.addAction('Хронология рейсов')
+        timeline_action.triggered.connect(self.show_trip_timeline)
+        
+        # Меню Редактирование
+        edit_menu = menubar.addMenu('Редактирование')
+        edit_drivers_action = edit_menu.addAction('Редактировать водителей')
+        edit_drivers_action.triggered.connect(lambda: self.show_editable_table('drivers'))
+        edit_vehicles_action = edit_menu.addAction('Редактировать транспорт')
+        edit_vehicles_action.triggered.connect(lambda: self.show_editable_table('vehicles'))
+        edit_trips_action = edit_menu.addAction('Редактировать рейсы')
+        edit_trips_action.triggered.connect(lambda: self.show_editable_table('trips'))
+        edit_menu.addSeparator()
+        save_edits_action = edit_menu.addAction('Сохранить изменения')
+        save_edits_action.setShortcut(QKeySequence.Save)
+        save_edits_action.triggered.connect(self.save_all_edits)
+        revert_edits_action = edit_menu.addAction('Отменить изменения')
+        revert_edits_action.triggered.connect(self.revert_all_edits)
+        
+        # Меню Обслуживание
+        maintenance_menu = menubar.addMenu('Обслуживание')
+        db_status_action = maintenance_menu.addAction('Состояние БД')
+        db_status_action.triggered.connect(self.show_db_status)
+        run_maintenance_action = maintenance_menu.addAction('Выполнить обслуживание')
+        run_maintenance_action.triggered.connect(self.run_maintenance)
+        enable_vacuum_action = maintenance_menu.addAction('Включить инкрементальную очистку')
+        enable_vacuum_action.triggered.connect(self.enable_incremental_vacuum)
     
     def create_toolbar(self):
         """Создает панель инструментов с кнопками и комбобоксом"""
@@ -457,6 +618,16 @@ class TransportApp(QMainWindow):
         self.bt_revenue.clicked.connect(self.show_revenue_report)
         toolbar.addWidget(self.bt_revenue)
         
+        # Кнопка "Обновить все отчеты"
+        self.bt_refresh_all = QPushButton('Обновить все')
+        self.bt_refresh_all.clicked.connect(self.refresh_all_reports)
+        toolbar.addWidget(self.bt_refresh_all)
+        
+        # Кнопка "Хронология рейсов"
+        self.bt_timeline = QPushButton('Хронология')
+        self.bt_timeline.clicked.connect(self.show_trip_timeline)
+        toolbar.addWidget(self.bt_timeline)
+        
         # Изначально отключаем элементы, пока нет подключения
         self.set_connection_elements_enabled(False)
     
@@ -467,6 +638,8 @@ class TransportApp(QMainWindow):
         self.bt_vehicles.setEnabled(enabled)
         self.bt_active_trips.setEnabled(enabled)
         self.bt_revenue.setEnabled(enabled)
+        self.bt_refresh_all.setEnabled(enabled and not self.pending_reports)
+        self.bt_timeline.setEnabled(enabled)
         self.column_combo.setEnabled(enabled)
     
     def set_connection(self):
@@ -479,6 +652,11 @@ class TransportApp(QMainWindow):
         )
         
         if file_path:
+            if not self.confirm_discard_edits(list(self.editable_models)):
+                return
+            self.editable_models.clear()
+            self.cancel_pending_reports()
+            
             try:
                 if self.connection:
                     self.connection.close()
@@ -493,6 +671,7 @@ class TransportApp(QMainWindow):
                 self.update_column_combo()
                 
                 self.set_connection_elements_enabled(True)
+                self.maintenance.set_database(file_path, self.latency_queries())
                 self.status_bar.showMessage(f"Подключено к БД: {file_path}")
                 
             except Exception as e:
@@ -500,10 +679,16 @@ class TransportApp(QMainWindow):
     
     def close_connection(self):
         """Закрытие соединения с БД"""
+        if not self.confirm_discard_edits(list(self.editable_models)):
+            return
+        self.editable_models.clear()
+        self.cancel_pending_reports()
+        
         if self.connection:
             self.connection.close()
             self.connection = None
             self.current_db_path = None
+        self.maintenance.set_database(None, {})
         
         # Очищаем все вкладки - создаем новые виджеты вместо изменения существующих
         for i in range(self.central_widget.count()):
@@ -524,17 +709,7 @@ class TransportApp(QMainWindow):
         layout = QVBoxLayout()
         layout.setAlignment(Qt.AlignCenter)
         
-        tab_names = ["Схема БД", "Список таблиц", "Данные по колонке", "Водители", "Транспорт", "Рейсы"]
-        descriptions = [
-            "Информация о структуре базы данных",
-            "Список всех таблиц в системе",
-            "Просмотр данных по выбранной колонке", 
-            "Управление водителями и их данными",
-            "Информация о транспортных средствах",
-            "Отслеживание рейсов и маршрутов"
-        ]
-        
-        title_label = QLabel(tab_names[index])
+        title_label = QLabel(TAB_NAMES[index])
         title_label.setAlignment(Qt.AlignCenter)
         title_label.setStyleSheet("""
             QLabel {
@@ -546,7 +721,7 @@ class TransportApp(QMainWindow):
         """)
         layout.addWidget(title_label)
         
-        desc_label = QLabel(descriptions[index])
+        desc_label = QLabel(TAB_DESCRIPTIONS[index])
         desc_label.setAlignment(Qt.AlignCenter)
         desc_label.setStyleSheet("""
             QLabel {
@@ -574,8 +749,7 @@ class TransportApp(QMainWindow):
     
     def get_tab_name(self, index):
         """Возвращает название вкладки по индексу"""
-        tab_names = ["Схема БД", "Список таблиц", "Данные по колонке", "Водители", "Транспорт", "Рейсы"]
-        return tab_names[index]
+        return TAB_NAMES[index]
     
     def update_schema_tab(self):
         """Обновляет вкладку с информацией о схеме БД"""
@@ -653,40 +827,7 @@ class TransportApp(QMainWindow):
     
     def show_drivers_list(self):
         """Показывает список водителей"""
-        if not self.connection:
-            QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
-            return
-            
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                SELECT 
-                    driver_id,
-                    first_name,
-                    last_name,
-                    license_number,
-                    phone,
-                    email,
-                    hire_date,
-                    status,
-                    salary
-                FROM drivers
-                ORDER BY status, last_name
-            ''')
-            result = cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-            
-            model = QStandardItemModel()
-            model.setHorizontalHeaderLabels(columns)
-            
-            for row in result:
-                items = [QStandardItem(str(item)) for item in row]
-                model.appendRow(items)
-            
-            self.update_tab_with_table(3, model, "Список водителей")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
+        self.show_report('drivers')
     
     def on_column_changed(self, column_full_name):
         """Обработчик изменения выбранной колонки"""
@@ -715,129 +856,240 @@ class TransportApp(QMainWindow):
     
     def show_active_trips(self):
         """Показывает активные рейсы"""
+        self.show_report('active_trips')
+    
+    def show_revenue_report(self):
+        """Показывает отчет по доходам"""
+        self.show_report('revenue')
+    
+    def show_vehicles_list(self):
+        """Показывает список транспортных средств"""
+        self.show_report('vehicles')
+    
+    def show_report(self, name):
+        """Выполняет готовый отчет на основном соединении и показывает его на вкладке"""
         if not self.connection:
             QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
             return
             
         try:
             cursor = self.connection.cursor()
-            cursor.execute('''
-                SELECT t.trip_id, r.start_city, r.end_city, 
-                       d.first_name || ' ' || d.last_name as driver,
-                       v.license_plate, t.departure_time, t.status
-                FROM trips t
-                JOIN routes r ON t.route_id = r.route_id
-                JOIN drivers d ON t.driver_id = d.driver_id
-                JOIN vehicles v ON t.vehicle_id = v.vehicle_id
-                WHERE t.status IN ('in_progress', 'scheduled')
-                ORDER BY t.departure_time
-            ''')
+            cursor.execute(REPORTS[name]['sql'])
             result = cursor.fetchall()
             columns = [description[0] for description in cursor.description]
             
-            model = QStandardItemModel()
-            model.setHorizontalHeaderLabels(columns)
-            
-            for row in result:
-                items = [QStandardItem(str(item)) for item in row]
-                model.appendRow(items)
-            
-            self.update_tab_with_table(5, model, "Активные и запланированные рейсы")
+            report = REPORTS[name]
+            model = self.build_report_model(name, columns, result)
+            self.update_tab_with_table(report['tab'], model, report['title'])
             
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
     
-    def show_revenue_report(self):
-        """Показывает отчет по доходам"""
+    def build_report_model(self, name, columns, result):
+        """Строит модель таблицы для результата отчета"""
+        model = QStandardItemModel()
+        model.setHorizontalHeaderLabels(columns)
+        
+        for row in result:
+            items = [QStandardItem(str(item)) for item in row]
+            model.appendRow(items)
+        
+        if name == 'revenue' and result:
+            # Добавляем итоговую строку
+            total_revenue = sum(float(row[4]) for row in result if row[4])
+            model.appendRow([
+                QStandardItem("ИТОГО"),
+                QStandardItem(""),
+                QStandardItem(""),
+                QStandardItem(""),
+                QStandardItem(f"{total_revenue:.2f} руб."),
+                QStandardItem("")
+            ])
+        
+        return model
+    
+    def refresh_all_reports(self):
+        """Параллельно обновляет все готовые отчеты.
+        
+        Каждый отчет выполняется в пуле потоков на отдельном соединении только
+        для чтения и попадает на свою вкладку сразу по готовности.
+        """
+        if not self.current_db_path:
+            QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
+            return
+        if self.pending_reports:
+            self.status_bar.showMessage("Обновление отчетов уже выполняется")
+            return
+        
+        self.skipped_reports = []
+        for name, report in REPORTS.items():
+            worker = QueryWorker(name, self.current_db_path, report['sql'])
+            worker.signals.finished.connect(self.on_report_ready)
+            worker.signals.error.connect(self.on_report_error)
+            self.report_signals[name] = worker.signals
+            self.pending_reports.add(name)
+            self.report_pool.start(worker)
+        
+        self.bt_refresh_all.setEnabled(False)
+        self.status_bar.showMessage(f"Обновление отчетов: 0/{len(REPORTS)}")
+    
+    def is_current_report(self, name):
+        """Проверяет, что результат пришел от воркера текущего обновления"""
+        return self.sender() is not None and self.sender() is self.report_signals.get(name)
+    
+    def on_report_ready(self, name, columns, rows, elapsed):
+        """Показывает результат отчета, полученный из пула потоков"""
+        if not self.is_current_report(name):
+            return
+        self.finish_pending_report(name)
+        
+        report = REPORTS[name]
+        # Из обработчика результата нельзя задавать вопросы: вкладка с
+        # несохраненными изменениями пропускается
+        editable = self.editable_models.get(report['tab'])
+        if editable is not None and editable.is_dirty():
+            self.skipped_reports.append(report['title'])
+        else:
+            model = self.build_report_model(name, columns, rows)
+            self.update_tab_with_table(report['tab'], model, report['title'], activate=False, confirm=False)
+        
+        done = len(REPORTS) - len(self.pending_reports)
+        message = f"Обновление отчетов: {done}/{len(REPORTS)} ({report['title']}: {elapsed * 1000:.0f} мс)"
+        if self.skipped_reports:
+            message += f"; пропущены из-за несохраненных изменений: {', '.join(self.skipped_reports)}"
+        self.status_bar.showMessage(message)
+    
+    def on_report_error(self, name, error):
+        """Обработчик ошибки отчета из пула потоков"""
+        if not self.is_current_report(name):
+            return
+        self.finish_pending_report(name)
+        self.status_bar.showMessage(f"Ошибка выполнения отчета \"{REPORTS[name]['title']}\": {error}")
+    
+    def finish_pending_report(self, name):
+        self.pending_reports.discard(name)
+        self.report_signals.pop(name, None)
+        if not self.pending_reports:
+            self.bt_refresh_all.setEnabled(self.connection is not None)
+    
+    def cancel_pending_reports(self):
+        """Забывает незавершенное обновление отчетов (при смене или закрытии БД)"""
+        self.pending_reports.clear()
+        self.report_signals.clear()
+        self.skipped_reports = []
+    
+    def show_trip_timeline(self):
+        """Показывает хронологию рейсов на оси времени"""
         if not self.connection:
             QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
             return
-            
+        
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                SELECT 
-                    t.trip_id,
-                    r.start_city || ' - ' || r.end_city as route,
-                    t.cargo_description,
-                    t.cargo_weight_kg,
-                    t.revenue,
-                    t.departure_time
-                FROM trips t
-                JOIN routes r ON t.route_id = r.route_id
-                WHERE t.status = 'completed'
-                ORDER BY t.revenue DESC
-            ''')
-            result = cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-            
-            model = QStandardItemModel()
-            model.setHorizontalHeaderLabels(columns)
-            
-            total_revenue = 0
-            for row in result:
-                items = [QStandardItem(str(item)) for item in row]
-                model.appendRow(items)
-                if row[4]:  # revenue
-                    total_revenue += float(row[4])
-            
-            # Добавляем итоговую строку
-            if result:
-                model.appendRow([
-                    QStandardItem("ИТОГО"),
-                    QStandardItem(""),
-                    QStandardItem(""),
-                    QStandardItem(""),
-                    QStandardItem(f"{total_revenue:.2f} руб."),
-                    QStandardItem("")
-                ])
-            
-            self.update_tab_with_table(5, model, "Отчет по доходам от выполненных рейсов")
-            
+            ensure_timeline_indexes(self.connection)
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
+            # Без индексов диаграмма работает, но медленнее (например, БД только для чтения)
+            self.status_bar.showMessage(f"Не удалось создать индексы для хронологии: {str(e)}")
+        
+        tab_index = TAB_NAMES.index("Хронология")
+        timeline = TripTimeline(self.current_db_path)
+        # Прежняя диаграмма удаляется вместе с растровым слоем, загруженными рейсами и таймерами
+        old = self.central_widget.widget(tab_index)
+        self.central_widget.removeTab(tab_index)
+        old.deleteLater()
+        self.central_widget.insertTab(tab_index, timeline, TAB_NAMES[tab_index])
+        self.central_widget.setCurrentIndex(tab_index)
     
-    def show_vehicles_list(self):
-        """Показывает список транспортных средств"""
+    def latency_queries(self):
+        """Запросы, по которым замеряется задержка до и после обслуживания"""
+        return {report['title']: report['sql'] for report in REPORTS.values()}
+    
+    def show_db_status(self):
+        """Показывает размер файла, свободные страницы и возраст статистики"""
         if not self.connection:
             QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
             return
-            
+        
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                SELECT 
-                    vehicle_id,
-                    license_plate,
-                    model,
-                    type,
-                    capacity_kg,
-                    year,
-                    status,
-                    last_maintenance,
-                    next_maintenance
-                FROM vehicles
-                ORDER BY status, model
-            ''')
-            result = cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-            
-            model = QStandardItemModel()
-            model.setHorizontalHeaderLabels(columns)
-            
-            for row in result:
-                items = [QStandardItem(str(item)) for item in row]
-                model.appendRow(items)
-            
-            self.update_tab_with_table(4, model, "Список транспортных средств")
-            
+            stats = collect_db_stats(self.connection, self.current_db_path)
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
+            QMessageBox.critical(self, "Ошибка", f"Ошибка получения состояния БД:\n{str(e)}")
+            return
+        
+        model = QStandardItemModel()
+        model.setHorizontalHeaderLabels(['Показатель', 'Значение'])
+        for name, value in self.format_db_stats(stats):
+            model.appendRow([QStandardItem(name), QStandardItem(value)])
+        self.update_tab_with_table(TAB_NAMES.index("Обслуживание"), model, "Состояние базы данных")
+    
+    def format_db_stats(self, stats):
+        """Возвращает пары (показатель, значение) для отображения"""
+        if stats['stats_age_hours'] is not None:
+            stats_age = f"{stats['stats_age_hours']:.1f} ч назад ({stats['last_analyze']})"
+        elif stats['has_stats']:
+            stats_age = "есть, время обновления неизвестно"
+        else:
+            stats_age = "нет (ANALYZE не выполнялся)"
+        
+        rows = [
+            ("Размер файла", f"{stats['file_size'] / 1024:.1f} КБ"),
+            ("Страниц всего", str(stats['page_count'])),
+            ("Свободных страниц", f"{stats['freelist_count']} ({stats['freelist_bytes'] / 1024:.1f} КБ)"),
+            ("Режим auto_vacuum", stats['auto_vacuum']),
+            ("Статистика планировщика", stats_age),
+        ]
+        for name, ms in stats.get('latency', {}).items():
+            rows.append((f"Запрос \"{name}\"", f"{ms:.2f} мс"))
+        return rows
+    
+    def run_maintenance(self, enable_incremental=False):
+        """Запускает обслуживание БД в фоновом потоке"""
+        if not self.connection:
+            QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
+            return
+        if not self.maintenance.run_now(enable_incremental):
+            self.status_bar.showMessage("Обслуживание БД уже выполняется")
+    
+    def enable_incremental_vacuum(self):
+        """Переводит БД в режим auto_vacuum = INCREMENTAL (полный VACUUM)"""
+        answer = QMessageBox.question(
+            self, "Инкрементальная очистка",
+            "Для включения инкрементальной очистки файл БД будет полностью перестроен (VACUUM). "
+            "На большой БД это может занять время. Продолжить?"
+        )
+        if answer == QMessageBox.Yes:
+            self.run_maintenance(enable_incremental=True)
+    
+    def on_maintenance_finished(self, report):
+        """Показывает состояние БД и задержку запросов до и после обслуживания"""
+        before = self.format_db_stats(report['before'])
+        after = dict(self.format_db_stats(report['after']))
+        
+        model = QStandardItemModel()
+        model.setHorizontalHeaderLabels(['Показатель', 'До', 'После'])
+        for name, value in before:
+            model.appendRow([QStandardItem(name), QStandardItem(value),
+                             QStandardItem(after.get(name, ""))])
+        for step, elapsed in report['steps']:
+            model.appendRow([QStandardItem(f"Шаг: {step}"), QStandardItem(""),
+                             QStandardItem(f"{elapsed * 1000:.0f} мс")])
+        
+        self.update_tab_with_table(TAB_NAMES.index("Обслуживание"), model,
+                                   "Результаты обслуживания БД", activate=False)
+        self.status_bar.showMessage("Обслуживание БД завершено")
+    
+    def on_maintenance_error(self, message):
+        self.status_bar.showMessage(f"Ошибка обслуживания БД: {message}")
     
-    def update_tab_with_table(self, tab_index, model, title):
-        """Обновляет указанную вкладку таблицей"""
+    def update_tab_with_table(self, tab_index, model, title, activate=True, confirm=True):
+        """Обновляет указанную вкладку таблицей.
+        
+        confirm=False - вызывающий сам проверил несохраненные изменения вкладки.
+        """
         if tab_index >= self.central_widget.count():
             return
+        if confirm and not self.confirm_discard_edits([tab_index]):
+            return
+        self.editable_models.pop(tab_index, None)
             
         # Создаем полностью новую вкладку вместо изменения существующей
         new_tab = QWidget()
@@ -885,7 +1137,117 @@ class TransportApp(QMainWindow):
         current_tab_text = self.central_widget.tabText(tab_index)
         self.central_widget.removeTab(tab_index)
         self.central_widget.insertTab(tab_index, new_tab, current_tab_text)
-        self.central_widget.setCurrentIndex(tab_index)
+        if activate:
+            self.central_widget.setCurrentIndex(tab_index)
+    
+    def show_editable_table(self, table):
+        """Открывает таблицу БД для редактирования на соответствующей вкладке"""
+        if not self.connection:
+            QMessageBox.warning(self, "Ошибка", "Нет подключения к базе данных")
+            return
+        
+        config = EDITABLE_TABLES[table]
+        tab_index = config['tab']
+        if not self.confirm_discard_edits([tab_index]):
+            return
+        
+        try:
+            model = EditableTableModel(
+                self.connection, table, config['columns'],
+                config['primary_key'], config['order_by']
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки таблицы {table}:\n{str(e)}")
+            return
+        
+        # Старая модель вкладки больше не нужна - изменения уже подтверждены выше
+        self.editable_models.pop(tab_index, None)
+        self.update_tab_with_table(tab_index, model, config['title'])
+        self.editable_models[tab_index] = model
+        
+        # Делаем таблицу на вкладке редактируемой и добавляем кнопки
+        tab = self.central_widget.widget(tab_index)
+        table_view = tab.findChild(QTableView)
+        table_view.setSelectionBehavior(QAbstractItemView.SelectItems)
+        table_view.setEditTriggers(QAbstractItemView.DoubleClicked |
+                                   QAbstractItemView.EditKeyPressed |
+                                   QAbstractItemView.AnyKeyPressed)
+        
+        buttons_layout = QHBoxLayout()
+        dirty_label = QLabel("Изменено строк: 0")
+        model.dirtyChanged.connect(lambda count: dirty_label.setText(f"Изменено строк: {count}"))
+        buttons_layout.addWidget(dirty_label)
+        buttons_layout.addStretch()
+        
+        fill_button = QPushButton("Заполнить выделенные")
+        fill_button.clicked.connect(lambda: self.fill_selected_cells(table_view))
+        buttons_layout.addWidget(fill_button)
+        
+        revert_button = QPushButton("Отменить")
+        revert_button.clicked.connect(model.revert_changes)
+        buttons_layout.addWidget(revert_button)
+        
+        save_button = QPushButton("Сохранить")
+        save_button.clicked.connect(self.save_all_edits)
+        buttons_layout.addWidget(save_button)
+        
+        tab.layout().addLayout(buttons_layout)
+    
+    def fill_selected_cells(self, table_view):
+        """Записывает одно значение во все выделенные ячейки"""
+        indexes = table_view.selectionModel().selectedIndexes()
+        if not indexes:
+            QMessageBox.warning(self, "Ошибка", "Выделите ячейки для заполнения")
+            return
+        
+        value, ok = QInputDialog.getText(self, "Заполнить выделенные",
+                                         f"Новое значение для {len(indexes)} ячеек:")
+        if not ok:
+            return
+        
+        try:
+            table_view.model().set_values(indexes, value)
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", f"Недопустимое значение: {value}")
+    
+    def save_all_edits(self):
+        """Сохраняет изменения всех редактируемых вкладок одной транзакцией"""
+        if not self.connection or not self.editable_models:
+            return True
+        
+        try:
+            saved = save_models(self.connection, self.editable_models.values())
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить изменения:\n{str(e)}")
+            return False
+        
+        self.status_bar.showMessage(f"Сохранено строк: {saved}")
+        return True
+    
+    def revert_all_edits(self):
+        """Отменяет несохраненные изменения на всех вкладках"""
+        for model in self.editable_models.values():
+            model.revert_changes()
+        self.status_bar.showMessage("Изменения отменены")
+    
+    def confirm_discard_edits(self, tab_indexes):
+        """Спрашивает, что делать с несохраненными изменениями на вкладках.
+        
+        Возвращает False, если пользователь отменил действие.
+        """
+        dirty = [i for i in tab_indexes
+                 if i in self.editable_models and self.editable_models[i].is_dirty()]
+        if not dirty:
+            return True
+        
+        answer = QMessageBox.question(
+            self, "Несохраненные изменения",
+            "Есть несохраненные изменения. Сохранить их?",
+            QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel
+        )
+        if answer == QMessageBox.Save:
+            return self.save_all_edits()
+        return answer == QMessageBox.Discard
     
     def show_custom_query_dialog(self):
         """Показывает модальное окно для выполнения произвольных SQL-запросов"""
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+def open_readonly(db_path):
+    """Открывает отдельное соединение с БД только для чтения"""
+    uri = Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True)
+
+
+class QueryWorkerSignals(QObject):
+    # имя запроса, колонки, строки, время выполнения в секундах
+    finished = pyqtSignal(str, list, list, float)
+    # имя запроса, текст ошибки
+    error = pyqtSignal(str, str)
+
+
+class QueryWorker(QRunnable):
+    """Выполняет SELECT-запрос в пуле потоков на собственном соединении.
+
+    Соединение открывается и закрывается внутри run(), поэтому несколько
+    воркеров читают БД параллельно и не мешают соединению главного окна.
+    Результат доставляется в GUI-поток через сигналы.
+    """
+
+    def __init__(self, name, db_path, sql, params=()):
+        super().__init__()
+        self.name = name
+        self.db_path = db_path
+        self.sql = sql
+        self.params = params
+        self.signals = QueryWorkerSignals()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            connection = open_readonly(self.db_path)
+            try:
+                cursor = connection.execute(self.sql, self.params)
+                rows = cursor.fetchall()
+                columns = [description[0] for description in cursor.description]
+            finally:
+                connection.close()
+        except Exception as e:
+            self.signals.error.emit(self.name, str(e))
+            return
+
+        self.signals.finished.emit(self.name, columns, rows, time.perf_counter() - start)
@@ -0,0 +1,550 @@
+import math
+import time
+from datetime import datetime, timezone
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton
+from PyQt5.QtGui import QPainter, QColor, QFont, QPixmap
+from PyQt5.QtCore import Qt, QRectF, QTimer, QThreadPool
+
+from report_worker import QueryWorker
+
+# Индексы, без которых выборка окна времени превращается в полный просмотр trips
+TIMELINE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_trips_departure ON trips (departure_time)",
+    "CREATE INDEX IF NOT EXISTS idx_trips_vehicle_departure ON trips (vehicle_id, departure_time)",
+    "CREATE INDEX IF NOT EXISTS idx_trips_driver_departure ON trips (driver_id, departure_time)",
+]
+
+# Режимы группировки: колонка рейса, запрос списка дорожек
+LANE_MODES = {
+    'vehicles': {
+        'title': "По транспорту",
+        'column': 'vehicle_id',
+        'lanes_sql': "SELECT vehicle_id, license_plate FROM vehicles ORDER BY vehicle_id",
+    },
+    'drivers': {
+        'title': "По водителям",
+        'column': 'driver_id',
+        'lanes_sql': "SELECT driver_id, last_name || ' ' || first_name FROM drivers ORDER BY driver_id",
+    },
+}
+
+STATUS_COLORS = {
+    'completed': QColor("#4CAF50"),
+    'in_progress': QColor("#2196F3"),
+    'scheduled': QColor("#FFC107"),
+}
+DEFAULT_TRIP_COLOR = QColor("#9E9E9E")
+
+# Размеры бакетов агрегации (сек): берется наименьший, не уже MIN_BAR_PX пикселей
+BUCKET_SIZES = [60, 300, 900, 3600, 3 * 3600, 6 * 3600, 12 * 3600,
+                86400, 7 * 86400, 30 * 86400, 365 * 86400]
+TICK_SIZES = BUCKET_SIZES
+
+# Дальше этого масштаба рейсы рисуются полосами плотности
+DETAIL_MAX_SEC_PER_PX = 300
+MIN_BAR_PX = 3
+DEFAULT_MAX_TRIP_SEC = 7 * 86400
+
+RANGE_SQL = "SELECT MIN(departure_time), MAX(departure_time) FROM trips"
+
+
+def to_db_time(epoch):
+    """Переводит секунды эпохи в текстовый формат времени таблицы trips"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def ensure_timeline_indexes(connection):
+    """Создает индексы для выборки рейсов по окну времени"""
+    with connection:
+        for sql in TIMELINE_INDEXES:
+            connection.execute(sql)
+
+
+class TimelineCanvas(QWidget):
+    """Диаграмма рейсов (Гантт), рисуемая вручную в paintEvent.
+
+    Из БД выбирается только видимое окно времени и диапазон дорожек с запасом
+    по краям, запрос выполняется в пуле потоков. При мелком масштабе рейсы
+    агрегируются в SQL в полосы плотности, поэтому количество рисуемых
+    прямоугольников ограничено размером окна, а не числом рейсов.
+    """
+    LABEL_WIDTH = 140
+    HEADER_HEIGHT = 28
+    LANE_HEIGHT = 22
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.mode = 'vehicles'
+        self.setMinimumHeight(300)
+        self.setMouseTracking(False)
+        self.setFocusPolicy(Qt.StrongFocus)
+
+        # Видимая область: левый край (сек эпохи), масштаб (сек на пиксель), верхняя дорожка
+        self.t0 = time.time() - 30 * 86400
+        self.sec_per_px = 3600.0
+        self.lane_offset = 0.0
+
+        self.lanes = []  # [(id, подпись)]
+        self.lane_index = {}
+        self.max_trip_sec = DEFAULT_MAX_TRIP_SEC
+
+        # Последний загруженный фрагмент данных (сгруппирован по индексу дорожки)
+        # и окно, которое он покрывает
+        self.items_by_lane = {}
+        self.item_count = 0
+        self.density = False
+        self.bucket = 0
+        self.max_count = 1
+        self.loaded_window = None  # (t_from, t_to, lane_from, lane_to, bucket)
+        self.last_query_ms = 0.0
+
+        # Растровый слой с отрисованной частью фрагмента и параметры, при которых он построен
+        self.layer = None
+        self.layer_t_from = 0.0
+        self.layer_t_to = 0.0
+        self.layer_lane_from = 0
+        self.layer_sec_per_px = 1.0
+
+        self.pool = QThreadPool.globalInstance()
+        self._query_running = False
+        self._query_dirty = False
+        self._pending_window = None
+        self._pending_mode = None
+        self._drag_pos = None
+
+        self._query_timer = QTimer(self)
+        self._query_timer.setSingleShot(True)
+        self._query_timer.setInterval(30)
+        self._query_timer.timeout.connect(self._request_window)
+
+        # Перестроение слоя после окончания масштабирования
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(150)
+        self._render_timer.timeout.connect(self._on_zoom_settled)
+
+        self.on_status = None
+
+    # --- Загрузка данных ---
+
+    def set_mode(self, mode):
+        """Переключает группировку рейсов по транспорту или по водителям"""
+        self.mode = mode
+        self.lanes = []
+        self.lane_index = {}
+        self.items_by_lane = {}
+        self.item_count = 0
+        self.loaded_window = None
+        self.layer = None
+        self.lane_offset = 0.0
+        self._run_query(f'lanes:{mode}', LANE_MODES[mode]['lanes_sql'])
+        self.update()
+
+    def load(self):
+        """Загружает дорожки, границы данных и максимальную длительность рейса"""
+        self.fit_all()
+        self._run_query('max_duration', '''
+            SELECT MAX(strftime('%s', arrival_time) - strftime('%s', departure_time))
+            FROM trips
+        ''')
+        self.set_mode(self.mode)
+
+    def fit_all(self):
+        """Запрашивает границы данных и показывает весь период"""
+        self._run_query('range', RANGE_SQL)
+
+    def _run_query(self, name, sql, params=()):
+        worker = QueryWorker(name, self.db_path, sql, params)
+        worker.signals.finished.connect(self._on_query_finished)
+        worker.signals.error.connect(self._on_query_error)
+        self.pool.start(worker)
+
+    def _schedule_query(self):
+        # Во время непрерывной навигации запрос отправляется не чаще раза в 30 мс
+        if not self._window_covered() and not self._query_timer.isActive():
+            self._query_timer.start()
+        if self.layer is not None:
+            if self.layer_sec_per_px != self.sec_per_px:
+                self._render_timer.start()
+            elif not self._layer_covered() and self._window_covered():
+                # Сдвиг вышел за слой, но данные уже загружены
+                self._render_layer()
+
+    def _on_zoom_settled(self):
+        if self._window_covered():
+            self._render_layer()
+            self.update()
+
+    def _wanted_window(self):
+        """Окно для выборки: видимая область плюс половина ширины/высоты с каждой стороны"""
+        width_sec = max(self.width() - self.LABEL_WIDTH, 1) * self.sec_per_px
+        t_from = self.t0 - width_sec / 2
+        t_to = self.t0 + width_sec * 1.5
+        lanes_visible = self._visible_lane_count()
+        lane_from = max(int(self.lane_offset - lanes_visible / 2), 0)
+        lane_to = min(int(self.lane_offset + lanes_visible * 1.5) + 1, len(self.lanes) - 1)
+        bucket = 0
+        if self.sec_per_px > DETAIL_MAX_SEC_PER_PX:
+            bucket = next((b for b in BUCKET_SIZES if b >= self.sec_per_px * MIN_BAR_PX),
+                          BUCKET_SIZES[-1])
+            t_from = math.floor(t_from / bucket) * bucket
+        return t_from, t_to, lane_from, lane_to, bucket
+
+    def _layer_range(self):
+        """Время, рисуемое в слой: видимая область плюс половина ширины с каждой стороны"""
+        width_sec = max(self.width() - self.LABEL_WIDTH, 1) * self.sec_per_px
+        return self.t0 - width_sec / 2, self.t0 + width_sec * 1.5
+
+    def _layer_covered(self):
+        """Покрывает ли слой видимую область по времени"""
+        width_sec = max(self.width() - self.LABEL_WIDTH, 1) * self.sec_per_px
+        return self.layer_t_from <= self.t0 and self.t0 + width_sec <= self.layer_t_to
+
+    def _window_covered(self):
+        """Покрывает ли уже загруженный фрагмент видимую область при текущем уровне детализации"""
+        if not self.loaded_window or not self.lanes:
+            return False
+        t_from, t_to, lane_from, lane_to, bucket = self.loaded_window
+        width_sec = max(self.width() - self.LABEL_WIDTH, 1) * self.sec_per_px
+        wanted_bucket = self._wanted_window()[4]
+        first_lane = int(self.lane_offset)
+        last_lane = min(first_lane + self._visible_lane_count(), len(self.lanes) - 1)
+        return (bucket == wanted_bucket
+                and t_from <= self.t0 and self.t0 + width_sec <= t_to
+                and lane_from <= first_lane and last_lane <= lane_to)
+
+    def _request_window(self):
+        if not self.lanes:
+            return
+        if self._query_running:
+            self._query_dirty = True
+            return
+
+        t_from, t_to, lane_from, lane_to, bucket = window = self._wanted_window()
+        column = LANE_MODES[self.mode]['column']
+        params = {
+            'from': to_db_time(t_from - self.max_trip_sec),
+            'to': to_db_time(t_to),
+            'start': to_db_time(t_from),
+            'lo': self.lanes[lane_from][0],
+            'hi': self.lanes[lane_to][0],
+            't0': t_from,
+            'bucket': bucket,
+        }
+        if bucket:
+            sql = f'''
+                SELECT {column},
+                       CAST((strftime('%s', departure_time) - :t0) / :bucket AS INTEGER) AS b,
+                       COUNT(*)
+                FROM trips
+                WHERE departure_time BETWEEN :from AND :to
+                  AND arrival_time > :start
+                  AND {column} BETWEEN :lo AND :hi
+                GROUP BY 1, 2
+            '''
+        else:
+            sql = f'''
+                SELECT {column},
+                       CAST(strftime('%s', departure_time) AS INTEGER),
+                       CAST(strftime('%s', arrival_time) AS INTEGER),
+                       status
+                FROM trips
+                WHERE departure_time BETWEEN :from AND :to
+                  AND arrival_time > :start
+                  AND {column} BETWEEN :lo AND :hi
+            '''
+
+        self._query_running = True
+        self._pending_window = window
+        self._pending_mode = self.mode
+        self._run_query('window', sql, params)
+
+    def _on_query_finished(self, name, columns, rows, elapsed):
+        if name.startswith('lanes:'):
+            if name != f'lanes:{self.mode}':
+                return
+            self.lanes = rows
+            self.lane_index = {lane_id: i for i, (lane_id, _) in enumerate(rows)}
+            self._schedule_query()
+        elif name == 'range':
+            first, last = rows[0] if rows else (None, None)
+            if first and last:
+                self.fit_range(first, last)
+        elif name == 'max_duration':
+            if rows and rows[0][0]:
+                self.max_trip_sec = int(rows[0][0])
+            self.loaded_window = None
+            self._schedule_query()
+        elif name == 'window':
+            self._query_running = False
+            if self._pending_mode == self.mode:
+                self._store_items(rows)
+                self.loaded_window = self._pending_window
+                self.bucket = self._pending_window[4]
+                self.density = bool(self.bucket)
+                self.max_count = max((r[2] for r in rows), default=1) if self.density else 1
+                self.last_query_ms = elapsed * 1000
+                self._render_layer()
+            if self._query_dirty or not self._window_covered():
+                self._query_dirty = False
+                self._schedule_query()
+        self._report_status()
+        self.update()
+
+    def _store_items(self, rows):
+        by_lane = {}
+        for row in rows:
+            index = self.lane_index.get(row[0])
+            if index is not None:
+                by_lane.setdefault(index, []).append(row)
+        self.items_by_lane = by_lane
+        self.item_count = len(rows)
+
+    def _on_query_error(self, name, error):
+        if name == 'window':
+            self._query_running = False
+        if self.on_status:
+            self.on_status(f"Ошибка запроса: {error}")
+
+    def fit_range(self, first, last):
+        """Показывает весь период от first до last (текст времени БД)"""
+        start = datetime.strptime(first, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+        end = datetime.strptime(last, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+        end = max(end + 86400, start + 86400)
+        width = max(self.width() - self.LABEL_WIDTH, 100)
+        self.sec_per_px = (end - start) / width
+        self.t0 = start
+        self._schedule_query()
+        self.update()
+
+    # --- Геометрия ---
+
+    def _visible_lane_count(self):
+        return max(int((self.height() - self.HEADER_HEIGHT) / self.LANE_HEIGHT) + 1, 1)
+
+    def _x(self, epoch):
+        return self.LABEL_WIDTH + (epoch - self.t0) / self.sec_per_px
+
+    def _lane_y(self, index):
+        return self.HEADER_HEIGHT + (index - self.lane_offset) * self.LANE_HEIGHT
+
+    # --- Отрисовка ---
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#2b2b2b"))
+        painter.setFont(QFont("Arial", 8))
+
+        first_lane = max(int(self.lane_offset), 0)
+        last_lane = min(first_lane + self._visible_lane_count(), len(self.lanes) - 1)
+
+        painter.setClipRect(QRectF(self.LABEL_WIDTH, self.HEADER_HEIGHT,
+                                   self.width() - self.LABEL_WIDTH, self.height()))
+        self._paint_lane_stripes(painter, first_lane, last_lane)
+        if self.layer is not None:
+            # Слой с рейсами только переносится и масштабируется - перерисовка
+            # отдельных рейсов происходит после остановки навигации
+            scale = self.layer_sec_per_px / self.sec_per_px
+            target = QRectF(self._x(self.layer_t_from), self._lane_y(self.layer_lane_from),
+                            self.layer.width() * scale, self.layer.height())
+            painter.drawPixmap(target, self.layer, QRectF(self.layer.rect()))
+        painter.setClipping(False)
+
+        self._paint_labels(painter, first_lane, last_lane)
+        self._paint_axis(painter)
+
+    def _render_layer(self):
+        """Рисует загруженный фрагмент в растровый слой при текущем масштабе.
+
+        Ширина слоя ограничена видимой областью с запасом (_layer_range), а не
+        всем загруженным окном: после приближения окно, загруженное при мелком
+        масштабе, заняло бы сотни тысяч пикселей.
+        """
+        if not self.loaded_window:
+            self.layer = None
+            return
+        window_from, window_to, lane_from, lane_to, _ = self.loaded_window
+        t_from, t_to = self._layer_range()
+        t_from, t_to = max(t_from, window_from), min(t_to, window_to)
+        width = int(math.ceil((t_to - t_from) / self.sec_per_px)) + 1
+        height = (lane_to - lane_from + 1) * self.LANE_HEIGHT
+        layer = QPixmap(max(width, 1), max(height, 1))
+        layer.fill(Qt.transparent)
+
+        painter = QPainter(layer)
+        painter.setPen(Qt.NoPen)
+        if self.density:
+            self._paint_density(painter, window_from, t_from, width, lane_from, lane_to)
+        else:
+            self._paint_trips(painter, t_from, width, lane_from, lane_to)
+        painter.end()
+
+        self.layer = layer
+        self.layer_t_from = t_from
+        self.layer_t_to = t_to
+        self.layer_lane_from = lane_from
+        self.layer_sec_per_px = self.sec_per_px
+
+    def _paint_lane_stripes(self, painter, first_lane, last_lane):
+        stripe = QColor("#333333")
+        for i in range(first_lane, last_lane + 1):
+            if i % 2:
+                painter.fillRect(QRectF(self.LABEL_WIDTH, self._lane_y(i),
+                                        self.width(), self.LANE_HEIGHT), stripe)
+
+    def _paint_trips(self, painter, t_from, width, lane_from, lane_to):
+        # Прямоугольники группируются по цвету: один drawRects на статус
+        by_color = {}
+        spp = self.sec_per_px
+        height = self.LANE_HEIGHT - 6
+        for index in range(lane_from, lane_to + 1):
+            y = (index - lane_from) * self.LANE_HEIGHT + 3
+            for _, start, end, status in self.items_by_lane.get(index, ()):
+                x1 = (start - t_from) / spp
+                bar = max((end - start) / spp, 1.0)
+                if x1 + bar < 0 or x1 > width:
+                    continue
+                rect = QRectF(x1, y, bar, height)
+                by_color.setdefault(status, []).append(rect)
+
+        for status, rects in by_color.items():
+            painter.setBrush(STATUS_COLORS.get(status, DEFAULT_TRIP_COLOR))
+            painter.drawRects(rects)
+
+    def _paint_density(self, painter, window_from, t_from, width, lane_from, lane_to):
+        # Яркость полосы - логарифм числа рейсов в бакете, 8 уровней.
+        # Номера бакетов отсчитываются от начала загруженного окна window_from
+        levels = [[] for _ in range(8)]
+        log_max = math.log1p(self.max_count)
+        bar_width = max(self.bucket / self.sec_per_px, 1.0)
+        origin = (window_from - t_from) / self.sec_per_px
+        height = self.LANE_HEIGHT - 4
+        for index in range(lane_from, lane_to + 1):
+            y = (index - lane_from) * self.LANE_HEIGHT + 2
+            for _, bucket_index, count in self.items_by_lane.get(index, ()):
+                x = origin + bucket_index * self.bucket / self.sec_per_px
+                if x + bar_width < 0 or x > width:
+                    continue
+                level = min(int(math.log1p(count) / log_max * 7.999), 7) if log_max else 7
+                levels[level].append(QRectF(x, y, bar_width, height))
+
+        for level, rects in enumerate(levels):
+            if rects:
+                color = QColor("#2196F3")
+                color.setAlpha(60 + level * 27)
+                painter.setBrush(color)
+                painter.drawRects(rects)
+
+    def _paint_labels(self, painter, first_lane, last_lane):
+        painter.fillRect(QRectF(0, 0, self.LABEL_WIDTH, self.height()), QColor("#222222"))
+        painter.setPen(QColor("#cccccc"))
+        for i in range(first_lane, last_lane + 1):
+            painter.drawText(QRectF(6, self._lane_y(i), self.LABEL_WIDTH - 8, self.LANE_HEIGHT),
+                             Qt.AlignVCenter | Qt.AlignLeft, str(self.lanes[i][1]))
+
+    def _paint_axis(self, painter):
+        painter.fillRect(QRectF(0, 0, self.width(), self.HEADER_HEIGHT), QColor("#1e1e1e"))
+        tick = next((t for t in TICK_SIZES if t / self.sec_per_px >= 110), TICK_SIZES[-1])
+        fmt = "%d.%m %H:%M" if tick < 86400 else "%d.%m.%Y"
+        t_end = self.t0 + (self.width() - self.LABEL_WIDTH) * self.sec_per_px
+        t = math.floor(self.t0 / tick) * tick
+        grid = QColor("#444444")
+        while t <= t_end:
+            x = self._x(t)
+            if x >= self.LABEL_WIDTH:
+                painter.setPen(grid)
+                painter.drawLine(int(x), self.HEADER_HEIGHT, int(x), self.height())
+                painter.setPen(QColor("#cccccc"))
+                label = datetime.fromtimestamp(t, timezone.utc).strftime(fmt)
+                painter.drawText(int(x) + 4, self.HEADER_HEIGHT - 9, label)
+            t += tick
+
+    # --- Навигация ---
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if event.modifiers() & Qt.ShiftModifier:
+            self._scroll_lanes(-steps * 3)
+        else:
+            # Масштабирование вокруг точки под курсором
+            x = event.pos().x() - self.LABEL_WIDTH
+            anchor = self.t0 + x * self.sec_per_px
+            self.sec_per_px = min(max(self.sec_per_px * 0.8 ** steps, 1.0), 365 * 86400 / 100)
+            self.t0 = anchor - x * self.sec_per_px
+        self._schedule_query()
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_pos = event.pos()
+
+    def mouseMoveEvent(self, event):
+        if self._drag_pos is None:
+            return
+        delta = event.pos() - self._drag_pos
+        self._drag_pos = event.pos()
+        self.t0 -= delta.x() * self.sec_per_px
+        self._scroll_lanes(-delta.y() / self.LANE_HEIGHT)
+        self._schedule_query()
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        self._drag_pos = None
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._schedule_query()
+
+    def _scroll_lanes(self, lanes):
+        max_offset = max(len(self.lanes) - self._visible_lane_count() + 1, 0)
+        self.lane_offset = min(max(self.lane_offset + lanes, 0.0), float(max_offset))
+
+    def _report_status(self):
+        if not self.on_status:
+            return
+        mode = f"плотность (бакет {self.bucket // 60} мин)" if self.density else "детально"
+        self.on_status(
+            f"Дорожек: {len(self.lanes)}, элементов в окне: {self.item_count}, "
+            f"режим: {mode}, запрос: {self.last_query_ms:.0f} мс"
+        )
+
+
+class TripTimeline(QWidget):
+    """Вкладка хронологии рейсов: панель управления и диаграмма"""
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Группировка:"))
+        self.mode_combo = QComboBox()
+        for mode, config in LANE_MODES.items():
+            self.mode_combo.addItem(config['title'], mode)
+        controls.addWidget(self.mode_combo)
+
+        self.fit_button = QPushButton("Весь период")
+        controls.addWidget(self.fit_button)
+
+        hint = QLabel("Колесо - масштаб, Shift+колесо - дорожки, перетаскивание - сдвиг")
+        hint.setStyleSheet("QLabel { color: #888888; font-weight: normal; }")
+        controls.addWidget(hint)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.canvas = TimelineCanvas(db_path)
+        layout.addWidget(self.canvas, 1)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("QLabel { color: #cccccc; font-weight: normal; }")
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.canvas.on_status = self.status_label.setText
+        self.mode_combo.currentIndexChanged.connect(
+            lambda: self.canvas.set_mode(self.mode_combo.currentData())
+        )
+        self.fit_button.clicked.connect(self.canvas.fit_all)
+        self.canvas.load()
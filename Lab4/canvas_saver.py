@@ -0,0 +1,105 @@
+"""Кодирование PNG и запись файлов вне потока интерфейса.
+
+Изображение canvas снимается в потоке интерфейса (grabToImage), а сжатие
+в PNG и запись на диск выполняются в фоновом потоке: PyQt отпускает GIL
+на время QImageWriter.write, поэтому рисование в это время не тормозит.
+Задания выполняются по одному в порядке поступления.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtGui import QImageWriter
+
+# Уровень сжатия PNG по умолчанию (0 - без сжатия, 9 - максимальное).
+# Для рисунков из линий уровень 1 почти не уступает в размере, но в разы быстрее
+DEFAULT_COMPRESSION = 1
+
+
+def compression_to_quality(level):
+    """Уровень сжатия zlib 0-9 -> качество QImageWriter для PNG (-1 - по умолчанию Qt)"""
+    if level is None or level < 0:
+        return -1
+    level = min(int(level), 9)
+    # Qt переводит качество в уровень как (100 - quality) * 9 / 91
+    return 100 - (level * 91 + 8) // 9
+
+
+def write_file(path, data):
+    """Атомарно записывает байты в файл: временный файл, fsync, os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_png(image, path, compression=DEFAULT_COMPRESSION):
+    """Кодирует QImage в PNG и атомарно записывает; OSError при ошибке"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    os.close(fd)
+    try:
+        writer = QImageWriter(tmp_path, b"png")
+        writer.setQuality(compression_to_quality(compression))
+        if not writer.write(image):
+            raise OSError(f"не удалось записать {path}: {writer.errorString()}")
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class CanvasSaver:
+    """Очередь фоновых заданий сохранения.
+
+    Методы возвращают concurrent.futures.Future; колбэки Future
+    вызываются в фоновом потоке, поэтому результат в интерфейс
+    передается через сигналы Qt.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="canvas-saver")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self):
+        """Число поставленных и еще не выполненных заданий"""
+        return self._pending
+
+    def submit(self, func, *args):
+        """Ставит в очередь произвольное задание"""
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def save_png(self, image, path, compression=DEFAULT_COMPRESSION):
+        return self.submit(write_png, image, path, compression)
+
+    def save_bytes(self, path, data):
+        return self.submit(write_file, path, data)
+
+    def close(self):
+        """Дожидается завершения поставленных заданий"""
+        self._executor.shutdown(wait=True)
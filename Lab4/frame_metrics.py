@@ -0,0 +1,112 @@
+"""Замеры плавности рисования: время кадров, отрисовки canvas и задержка ввода.
+
+    * кадр - интервал между сигналами QQuickWindow.frameSwapped (паузы
+      длиннее IDLE_GAP, когда окну нечего перерисовывать, не учитываются);
+    * отрисовка - время выполнения onPaint у Canvas;
+    * задержка ввода - от обработки первой еще не нарисованной точки мыши
+      до показа кадра, в котором она нарисована.
+
+Хранятся последние MAX_SAMPLES замеров каждого вида. frame() может
+вызываться из потока отрисовки Qt, остальные методы - из потока
+интерфейса.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+from canvas_saver import write_file
+
+METRICS_FILE = "frame_metrics.json"
+MAX_SAMPLES = 10000
+PERCENTILES = (50, 95, 99)
+KINDS = ("frame", "paint", "latency")
+# Интервал между кадрами, после которого окно считается простаивавшим, с
+IDLE_GAP = 0.25
+
+
+def percentile(sorted_samples, p):
+    """p-й процентиль (по рангу) отсортированного списка"""
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * p / 100))]
+
+
+def summarize(samples):
+    """Число замеров, процентили и максимум в миллисекундах"""
+    samples_ms = sorted(sample * 1000 for sample in samples)
+    if not samples_ms:
+        return {"count": 0}
+    summary = {"count": len(samples_ms)}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = round(percentile(samples_ms, p), 3)
+    summary["max_ms"] = round(samples_ms[-1], 3)
+    return summary
+
+
+class FrameMetrics:
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self._lock = threading.Lock()
+        self.samples = {kind: deque(maxlen=max_samples) for kind in KINDS}
+        self._last_frame = None
+        self._paint_started = None
+        # Время первой точки, еще не попавшей в onPaint, и первой нарисованной,
+        # но еще не показанной на экране
+        self._input_pending = None
+        self._input_painted = None
+
+    def reset(self):
+        with self._lock:
+            for samples in self.samples.values():
+                samples.clear()
+            self._last_frame = None
+
+    def input(self):
+        """Пришла точка мыши"""
+        if self._input_pending is None:
+            self._input_pending = time.perf_counter()
+
+    def paint_begin(self):
+        self._paint_started = time.perf_counter()
+
+    def paint_end(self):
+        now = time.perf_counter()
+        with self._lock:
+            if self._paint_started is not None:
+                self.samples["paint"].append(now - self._paint_started)
+                self._paint_started = None
+            if self._input_pending is not None:
+                if self._input_painted is None:
+                    self._input_painted = self._input_pending
+                self._input_pending = None
+
+    def frame(self):
+        """Кадр показан на экране"""
+        now = time.perf_counter()
+        with self._lock:
+            if self._last_frame is not None and now - self._last_frame < IDLE_GAP:
+                self.samples["frame"].append(now - self._last_frame)
+            self._last_frame = now
+            if self._input_painted is not None:
+                self.samples["latency"].append(now - self._input_painted)
+                self._input_painted = None
+
+    def summary(self):
+        with self._lock:
+            samples = {kind: list(values) for kind, values in self.samples.items()}
+        return {kind: summarize(values) for kind, values in samples.items()}
+
+    def text(self):
+        """Краткая сводка для оверлея"""
+        lines = []
+        names = {"frame": "кадр", "paint": "onPaint", "latency": "ввод->экран"}
+        for kind, summary in self.summary().items():
+            if summary["count"]:
+                lines.append(f"{names[kind]}: p50 {summary['p50_ms']:.1f} p95 {summary['p95_ms']:.1f} "
+                             f"p99 {summary['p99_ms']:.1f} мс")
+            else:
+                lines.append(f"{names[kind]}: нет данных")
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Записывает сводку в JSON-файл"""
+        data = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), **self.summary()}
+        write_file(path, json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
@@ -0,0 +1,89 @@
+"""Модель ленты истории сохранений для QML.
+
+Строки - сохранения из списка SnapshotStore (index.json), от новых к
+старым; каталог сохранений не перечисляется. Миниатюра строки
+запрашивается у ThumbnailCache, только когда QML показывает строку;
+пока она декодируется, роль thumbnail пуста.
+"""
+from datetime import datetime
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal, pyqtSlot
+
+NAME_ROLE = Qt.UserRole + 1
+TIME_ROLE = Qt.UserRole + 2
+KIND_ROLE = Qt.UserRole + 3
+THUMBNAIL_ROLE = Qt.UserRole + 4
+
+
+class HistoryModel(QAbstractListModel):
+    # Миниатюра готова (испускается в фоновом потоке кэша)
+    thumbnailReady = pyqtSignal(str)
+
+    def __init__(self, store, cache):
+        super().__init__()
+        self._store = store
+        self._cache = cache
+        self._snapshots = []
+        # Имя сохранения -> номер строки
+        self._rows = {}
+        self.thumbnailReady.connect(self._on_thumbnail_ready)
+        self.refresh()
+
+    def roleNames(self):
+        return {NAME_ROLE: b"name", TIME_ROLE: b"time", KIND_ROLE: b"kind", THUMBNAIL_ROLE: b"thumbnail"}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._snapshots)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._snapshots):
+            return None
+        snapshot = self._snapshots[index.row()]
+        if role == NAME_ROLE:
+            return snapshot["name"]
+        if role == TIME_ROLE:
+            return datetime.fromtimestamp(snapshot["time"] / 1000).strftime("%d.%m %H:%M:%S")
+        if role == KIND_ROLE:
+            return snapshot["kind"]
+        if role == THUMBNAIL_ROLE:
+            if self._cache.get(snapshot["name"]) is not None:
+                return "image://thumbnails/" + snapshot["name"]
+            self._cache.request(snapshot)
+            return ""
+        return None
+
+    def names(self):
+        return set(self._rows)
+
+    @pyqtSlot()
+    def refresh(self):
+        """Обновляет строки по списку сохранений: удаляет исчезнувшие, добавляет новые"""
+        snapshots = self._store.snapshots()[::-1]
+        names = [snapshot["name"] for snapshot in snapshots]
+        new_names = set(names)
+        # Удаление снизу вверх, чтобы номера еще не обработанных строк не сдвигались
+        for row in range(len(self._snapshots) - 1, -1, -1):
+            if self._snapshots[row]["name"] not in new_names:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._snapshots[row]
+                self.endRemoveRows()
+        old_names = [snapshot["name"] for snapshot in self._snapshots]
+        added = len(names) - len(old_names)
+        if names[added:] == old_names:
+            # Обычный случай: новые сохранения появились в начале ленты
+            if added:
+                self.beginInsertRows(QModelIndex(), 0, added - 1)
+                self._snapshots[:0] = snapshots[:added]
+                self.endInsertRows()
+        else:
+            self.beginResetModel()
+            self._snapshots = snapshots
+            self.endResetModel()
+        self._rows = {snapshot["name"]: row for row, snapshot in enumerate(self._snapshots)}
+
+    @pyqtSlot(str)
+    def _on_thumbnail_ready(self, name):
+        row = self._rows.get(name)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [THUMBNAIL_ROLE])
@@ -1,21 +1,65 @@
+import argparse
 import sys
 import os
+import time
 from datetime import datetime
-from PyQt5.QtCore import QUrl, QObject, QTimer, pyqtSignal, pyqtSlot, pyqtProperty
+from PyQt5.QtCore import Qt, QUrl, QObject, QRectF, QTimer, pyqtSignal, pyqtSlot, pyqtProperty
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtQml import QQmlApplicationEngine
+from PyQt5.QtQml import QQmlApplicationEngine, qmlRegisterType
+from PyQt5.QtQuick import QQuickItem
+
+from canvas_saver import DEFAULT_COMPRESSION, CanvasSaver
+from frame_metrics import METRICS_FILE, FrameMetrics
+from history_model import HistoryModel
+from snapshot_store import KIND_AUTO, KIND_MANUAL, SnapshotStore, snapshot_name
+from stroke_journal import FLUSH_INTERVAL, StrokeJournal, recover
+from stroke_store import STROKES_FILE, StrokeStore
+from thumbnail_cache import THUMBNAILS_FILE, ThumbnailCache, ThumbnailProvider
+from tiled_canvas import TiledCanvasItem
 
 
 class Interface(QObject):
     # Сигналы для уведомления об изменении свойств
     saveTimerRunningChanged = pyqtSignal()
     saveIntervalChanged = pyqtSignal()
+    # Рисунок изменился после последнего сохранения или был сохранен
+    dirtyChanged = pyqtSignal()
+    pngCompressionChanged = pyqtSignal()
     
-    # Сигнал для запроса сохранения
+    # Сигнал о начале сохранения: изображение снято, идет кодирование
     saveRequested = pyqtSignal()
+    # Сохранение завершено: имя файла, успех, текст ошибки
+    saveFinished = pyqtSignal(str, bool, str, arguments=['filename', 'ok', 'error'])
+
+    # Включение замеров и обновление их сводки
+    metricsEnabledChanged = pyqtSignal()
+    metricsChanged = pyqtSignal()
+
+    # Список сохранений изменился (может испускаться в фоновом потоке)
+    snapshotsChanged = pyqtSignal()
+
+    # Пакет сохраненных штрихов для отрисовки в canvas и конец воспроизведения
+    strokesReplayed = pyqtSignal('QVariantList')
+    replayFinished = pyqtSignal()
+    # Начат новый рисунок: canvas нужно очистить
+    drawingCleared = pyqtSignal()
     
-    def __init__(self):
+    def __init__(self, render_strategy="threaded", render_target="image", metrics=False, metrics_file=None):
         super().__init__()
+        # Как Canvas рисует: immediate/threaded/cooperative и в image/fbo
+        self._render_strategy = render_strategy
+        self._render_target = render_target
+
+        # Замеры кадров, onPaint и задержки ввода; сводка обновляется раз в полсекунды
+        self._metrics = FrameMetrics()
+        self._metrics_enabled = metrics
+        self._metrics_file = metrics_file
+        self._metrics_text = ""
+        self._metrics_timer = QTimer()
+        self._metrics_timer.timeout.connect(self._update_metrics)
+        if metrics:
+            self._metrics_timer.start(500)
+
         # Таймер для автоматического сохранения
         self._save_timer = QTimer()
         self._save_timer.timeout.connect(self._save_canvas_auto)
@@ -23,13 +67,65 @@ class Interface(QObject):
         # Настройки сохранения
         self._save_interval = 10000  # 10 секунд
         self._save_directory = "lab4/saved_canvases"
-        self._save_counter = 0
+        # Сколько последних сохранений хранится без прореживания
         self._max_saves = 100
+
+        # Счетчик изменений рисунка: растет с каждой точкой штриха.
+        # Автосохранение выполняется, только если он изменился с прошлого сохранения
+        self._generation = 0
+        self._saved_generation = 0
+        self._strokes_generation = 0
+        # Область canvas, измененная с последнего сохранения (None - весь canvas):
+        # при сохранении кодируются только задетые ею плитки
+        self._dirty_rect = None
+        # Автосохранение не срабатывает посреди штриха и ждет паузы во вводе
+        self._idle_delay = 1000  # 1 секунда
+        self._last_input = 0.0
+        self._idle_timer = QTimer()
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._save_canvas_auto)
+
+        # PNG кодируется и пишется в фоновом потоке
+        self._saver = CanvasSaver()
+        self._png_compression = DEFAULT_COMPRESSION
+        self._canvas = None
+        # Снимки canvas, ожидающие готовности (ссылка нужна до сигнала ready)
+        self._grabs = set()
         
         # Создаем директорию для сохранения, если её нет
         if not os.path.exists(self._save_directory):
             os.makedirs(self._save_directory)
             print(f"Создана директория: {self._save_directory}")
+
+        # Сохранения без повторов по содержимому, с прореживанием старых и ограничением объема.
+        # Файлы, сохраненные до появления списка, добавляются в него в фоне
+        self._snapshots = SnapshotStore(self._save_directory, keep_last=self._max_saves)
+        self._saver.submit(self._import_legacy)
+
+        # Лента истории: список сохранений и миниатюры, которые декодируются в фоне
+        self._thumbnails = ThumbnailCache(self._snapshots, os.path.join(self._save_directory, THUMBNAILS_FILE),
+                                          ready=lambda name: self._history.thumbnailReady.emit(name))
+        self._history = HistoryModel(self._snapshots, self._thumbnails)
+        self.snapshotsChanged.connect(self._history.refresh)
+        # Отдает миниатюры в QML (image://thumbnails/<имя>), регистрируется в движке QML
+        self.thumbnail_provider = ThumbnailProvider(self._thumbnails)
+
+        # Векторная копия рисунка: штрихи сохраняются рядом с PNG
+        self._strokes_file = os.path.join(self._save_directory, STROKES_FILE)
+        self._strokes = self._load_strokes()
+        self._replay = None
+
+        # Журнал штрихов после последней записи strokes.bin: после сбоя штрихи
+        # из него дописываются к strokes.bin. На диск журнал пишется пакетами
+        recovered = recover(self._save_directory, self._strokes)
+        self._journal = StrokeJournal(self._save_directory)
+        self._journal_timer = QTimer()
+        self._journal_timer.timeout.connect(self._journal.flush)
+        self._journal_timer.start(FLUSH_INTERVAL)
+        if recovered:
+            print(f"Восстановлено штрихов из журнала: {recovered}")
+            self._generation += 1
+            self.saveStrokes()
         
         # Автоматически запускаем автосохранение при создании
         self._save_timer.start(self._save_interval)
@@ -43,6 +139,98 @@ class Interface(QObject):
     @pyqtProperty(int, notify=saveIntervalChanged)
     def saveInterval(self):
         return self._save_interval
+
+    @pyqtProperty(QObject, constant=True)
+    def history(self):
+        """Модель ленты истории сохранений"""
+        return self._history
+
+    @pyqtProperty(bool, notify=metricsEnabledChanged)
+    def metricsEnabled(self):
+        return self._metrics_enabled
+
+    @pyqtSlot(bool)
+    def setMetricsEnabled(self, enabled):
+        """Включает замеры (и их оверлей) с чистой статистикой или выключает"""
+        if enabled == self._metrics_enabled:
+            return
+        self._metrics_enabled = enabled
+        if enabled:
+            self._metrics.reset()
+            self._metrics_timer.start(500)
+        else:
+            self._metrics_timer.stop()
+        self.metricsEnabledChanged.emit()
+
+    @pyqtProperty(str, notify=metricsChanged)
+    def metricsText(self):
+        return self._metrics_text
+
+    def _update_metrics(self):
+        self._metrics_text = self._metrics.text()
+        self.metricsChanged.emit()
+
+    @pyqtSlot()
+    def paintBegin(self):
+        self._metrics.paint_begin()
+
+    @pyqtSlot()
+    def paintEnd(self):
+        self._metrics.paint_end()
+
+    def _on_frame_swapped(self):
+        # Вызывается в потоке отрисовки Qt
+        if self._metrics_enabled:
+            self._metrics.frame()
+
+    @pyqtSlot(result=str)
+    def exportMetrics(self):
+        """Записывает процентили замеров в JSON и возвращает путь к файлу"""
+        path = self._metrics_file or os.path.join(self._save_directory, METRICS_FILE)
+        try:
+            self._metrics.export(path)
+        except OSError as e:
+            print(f"Ошибка записи замеров: {e}")
+            return ""
+        print(f"Замеры записаны в {path}")
+        return path
+
+    @pyqtProperty(str, constant=True)
+    def renderStrategy(self):
+        return self._render_strategy
+
+    @pyqtProperty(str, constant=True)
+    def renderTarget(self):
+        return self._render_target
+
+    @pyqtProperty(bool, notify=dirtyChanged)
+    def dirty(self):
+        """Есть изменения, не попавшие в сохранение"""
+        return self._generation != self._saved_generation
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @pyqtProperty(int, notify=pngCompressionChanged)
+    def pngCompression(self):
+        return self._png_compression
+
+    @pyqtSlot(int)
+    def setPngCompression(self, level):
+        """Уровень сжатия PNG: 0 - без сжатия, 9 - максимальное, -1 - по умолчанию Qt"""
+        level = max(-1, min(9, level))
+        if level != self._png_compression:
+            self._png_compression = level
+            self.pngCompressionChanged.emit()
+
+    @pyqtSlot(QQuickItem)
+    def registerCanvas(self, canvas):
+        """Запоминает canvas, изображение которого сохраняется"""
+        self._canvas = canvas
+        window = canvas.window()
+        if window is not None:
+            window.frameSwapped.connect(self._on_frame_swapped, Qt.DirectConnection)
     
     @pyqtSlot(int)
     def setSaveInterval(self, interval_ms):
@@ -67,6 +255,7 @@ class Interface(QObject):
         """Останавливает автоматическое сохранение"""
         if self._save_timer.isActive():
             self._save_timer.stop()
+            self._idle_timer.stop()
             self.saveTimerRunningChanged.emit()
             print("Автосохранение остановлено")
     
@@ -82,25 +271,253 @@ class Interface(QObject):
     def saveCanvasManually(self):
         """Ручное сохранение"""
         print("Ручное сохранение...")
-        self.saveRequested.emit()
+        self._save_now(KIND_MANUAL)
+
+    def _touch(self, x, y, thickness):
+        """Отмечает изменение рисунка в точке (x, y) линией толщины thickness"""
+        self._generation += 1
+        if self._dirty_rect is not None:
+            # Запас на скругление концов и сглаживание
+            margin = thickness / 2 + 2
+            self._dirty_rect = self._dirty_rect.united(QRectF(x - margin, y - margin, 2 * margin, 2 * margin))
+        self._last_input = time.monotonic()
+        if self._generation == self._saved_generation + 1:
+            self.dirtyChanged.emit()
+
+    # Запись штрихов из MouseArea
+    @pyqtSlot(float, float, str, float)
+    def beginStroke(self, x, y, color, thickness):
+        if self._metrics_enabled:
+            self._metrics.input()
+        stroke = self._strokes.begin(x, y, color, thickness)
+        self._journal.begin(len(self._strokes), stroke)
+        self._touch(x, y, thickness)
+
+    @pyqtSlot(float, float)
+    def addPoint(self, x, y):
+        if self._metrics_enabled:
+            self._metrics.input()
+        stroke = self._strokes.current
+        if stroke is not None:
+            stroke.add(x, y)
+            self._journal.point(stroke)
+            self._touch(x, y, stroke.width)
+
+    @pyqtSlot()
+    def endStroke(self):
+        if self._strokes.end() is not None:
+            self._journal.end(len(self._strokes) - 1)
+        self._last_input = time.monotonic()
+
+    @pyqtSlot()
+    def replayStrokes(self):
+        """Отдает сохраненные штрихи в QML пакетами, по одному за итерацию цикла событий"""
+        self._replay = self._strokes.batches()
+        self._replay_next()
+
+    def _replay_next(self):
+        if self._replay is None:
+            return
+        batch = next(self._replay, None)
+        if batch is None:
+            self._replay = None
+            self.replayFinished.emit()
+            return
+        self.strokesReplayed.emit(batch)
+        QTimer.singleShot(0, self._replay_next)
+
+    @pyqtSlot()
+    def newDrawing(self):
+        """Начинает новый рисунок.
+
+        Несохраненные изменения сначала сохраняются в историю; когда снимок
+        canvas готов, штрихи, strokes.bin и журнал очищаются, поэтому при
+        следующем запуске воспроизводится только новый рисунок.
+        """
+        self.endStroke()
+        grab = self._save_now(KIND_MANUAL) if self.dirty else None
+        if grab is None:
+            self._clear_drawing()
+        else:
+            grab.ready.connect(self._clear_drawing)
+
+    def _clear_drawing(self):
+        self._replay = None
+        self._strokes.clear()
+        self._journal.clear()
+        # Пустой strokes.bin записывается сразу; чистый canvas совпадает с
+        # последним сохранением, а следующее сохранение кодирует весь canvas
+        self._generation += 1
+        self.saveStrokes()
+        self._saved_generation = self._generation
+        self._dirty_rect = None
+        self.dirtyChanged.emit()
+        self.drawingCleared.emit()
+        print("Начат новый рисунок")
+
+    def _load_strokes(self):
+        if not os.path.exists(self._strokes_file):
+            return StrokeStore()
+        try:
+            store = StrokeStore.load(self._strokes_file)
+            print(f"Загружено штрихов: {len(store)} (точек: {store.point_count()})")
+            return store
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения штрихов: {e}")
+            return StrokeStore()
+
+    @pyqtSlot()
+    def saveStrokes(self):
+        """Сохраняет штрихи в двоичный файл в фоне, если они изменились"""
+        if self._strokes_generation == self._generation:
+            return
+        self._strokes_generation = self._generation
+        # Новый файл журнала начинается с событий, не попавших в этот strokes.bin
+        seq = self._journal.rotate(len(self._strokes), self._strokes.current)
+        future = self._saver.save_bytes(self._strokes_file, self._strokes.encode())
+        future.add_done_callback(lambda future: self._on_strokes_saved(future, seq))
+
+    def _on_strokes_saved(self, future, seq):
+        if future.exception() is not None:
+            print(f"Ошибка сохранения штрихов: {future.exception()}")
+        else:
+            self._journal.discard(seq)
+
+    @pyqtSlot()
+    def shutdown(self):
+        """Сохраняет штрихи и дожидается записи всех файлов (при выходе)"""
+        self._journal_timer.stop()
+        if self._metrics_enabled:
+            self.exportMetrics()
+        self.saveStrokes()
+        self._saver.close()
+        self._journal.close()
+        self._thumbnails.close()
+        try:
+            self._thumbnails.save({snapshot["name"] for snapshot in self._snapshots.snapshots()})
+        except OSError as e:
+            print(f"Ошибка сохранения кэша миниатюр: {e}")
     
     @pyqtSlot(str, result=str)
     def getSavePath(self, filename):
         """Возвращает полный путь для сохранения файла"""
         return os.path.join(self._save_directory, filename).replace('\\', '/')
     
+    def _idle_remaining(self):
+        """Сколько мс осталось до паузы во вводе, достаточной для сохранения"""
+        if self._strokes.current is not None:
+            return self._idle_delay
+        elapsed = (time.monotonic() - self._last_input) * 1000
+        return max(0, int(self._idle_delay - elapsed))
+
     def _save_canvas_auto(self):
         """Метод, вызываемый по таймеру для автосохранения (через Python)"""
+        # Прошлое сохранение еще кодируется - попробуем на следующем срабатывании
+        if self._generation == self._saved_generation or self._saver.pending:
+            return
+        # Рисование продолжается: сохраним, когда ввод затихнет
+        remaining = self._idle_remaining()
+        if remaining > 0:
+            self._idle_timer.start(remaining)
+            return
         print("Автосохранение...")
+        self._save_now()
+
+    def _save_now(self, kind=KIND_AUTO):
+        """Снимает изображение canvas и ставит его сохранение в очередь; возвращает снимок или None"""
+        self._idle_timer.stop()
+        if self._canvas is None:
+            print("Ошибка: canvas не зарегистрирован")
+            return None
+        grab = self._canvas.grabToImage()
+        if grab is None:
+            print("Ошибка: не удалось снять изображение canvas")
+            return None
+        timestamp_ms = int(time.time() * 1000)
+        dirty, self._dirty_rect = self._dirty_rect, QRectF()
+        self._grabs.add(grab)
+        grab.ready.connect(lambda: self._on_grabbed(grab, kind, timestamp_ms, dirty))
+
+        self._saved_generation = self._generation
+        self.saveStrokes()
         self.saveRequested.emit()
+        self.dirtyChanged.emit()
+        return grab
+
+    def _on_grabbed(self, grab, kind, timestamp_ms, dirty):
+        self._grabs.discard(grab)
+        image = grab.image()
+        if dirty is not None:
+            # Координаты canvas -> пиксели снимка (на экранах с масштабом они различаются)
+            scale = image.width() / self._canvas.width() if self._canvas.width() else 1.0
+            dirty = QRectF(dirty.x() * scale, dirty.y() * scale,
+                           dirty.width() * scale, dirty.height() * scale).toAlignedRect()
+        future = self._saver.submit(self._snapshots.add, image, kind, timestamp_ms,
+                                    self._png_compression, dirty)
+        filename = snapshot_name(timestamp_ms)
+        future.add_done_callback(lambda future: self._on_png_saved(future, filename))
+
+    def _import_legacy(self):
+        if self._snapshots.import_legacy():
+            self.snapshotsChanged.emit()
+
+    def _on_png_saved(self, future, filename):
+        # Вызывается в фоновом потоке; сигнал доставляется в поток интерфейса
+        error = future.exception()
+        if error is not None:
+            print(f"Ошибка сохранения {filename}: {error}")
+        elif future.result()["duplicate"]:
+            print(f"{filename}: изображение не изменилось, файлы не записаны")
+        else:
+            print(f"{filename}: записано плиток: {future.result()['written']}")
+        self.saveFinished.emit(filename, error is None, str(error or ""))
+        self.snapshotsChanged.emit()
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Paint с автосохранением")
+    parser.add_argument("--render-strategy", choices=["threaded", "immediate", "cooperative"], default="threaded",
+                        help="как Canvas выполняет рисование (по умолчанию в отдельном потоке)")
+    parser.add_argument("--render-target", choices=["image", "fbo"], default="image",
+                        help="куда рисует Canvas: QImage или FBO (нужен OpenGL)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="замерять кадры и задержку ввода, показывать оверлей (переключается F3)")
+    parser.add_argument("--metrics-file", default=None,
+                        help=f"куда записать процентили при выходе (по умолчанию {METRICS_FILE} в папке сохранений)")
+    parser.add_argument("--poster", metavar="ШxВ", default=None,
+                        help="большой рисунок из плиток с прокруткой и масштабом, например 20000x20000")
+    parser.add_argument("--poster-dir", default="lab4/saved_canvases/poster",
+                        help="папка плиток большого рисунка")
+    parser.add_argument("--poster-cache", type=int, default=256, metavar="МБ",
+                        help="объем плиток большого рисунка в памяти")
+    # Остальные аргументы (например, -platform) передаются Qt
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    if args.poster:
+        # Отдельный режим: штрихи рисуются прямо в плитки, без автосохранения снимков
+        try:
+            poster_width, poster_height = (int(side) for side in args.poster.lower().split("x"))
+        except ValueError:
+            parser.error("--poster: размер задается как ШxВ, например 20000x20000")
+        qmlRegisterType(TiledCanvasItem, "Paint", 1, 0, "TiledCanvas")
+        engine = QQmlApplicationEngine()
+        context = engine.rootContext()
+        context.setContextProperty("_posterDir", args.poster_dir)
+        context.setContextProperty("_posterWidth", poster_width)
+        context.setContextProperty("_posterHeight", poster_height)
+        context.setContextProperty("_posterCacheMegabytes", args.poster_cache)
+        engine.load("lab4/posterWindow.qml")
+        if not engine.rootObjects():
+            print("Ошибка: Не удалось загрузить QML файл!")
+            sys.exit(-1)
+        sys.exit(app.exec())
 
-    interface = Interface()
+    interface = Interface(args.render_strategy, args.render_target, args.metrics, args.metrics_file)
+    app.aboutToQuit.connect(interface.shutdown)
     engine = QQmlApplicationEngine()
     engine.rootContext().setContextProperty("_backend", interface)
+    engine.addImageProvider("thumbnails", interface.thumbnail_provider)
 
     # Загружаем QML
     engine.load("lab4/mainWindow.qml")
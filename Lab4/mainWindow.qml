@@ -10,6 +10,7 @@ Window {
 
     // Свойства
     property string lastSavedImage: ""
+    property bool saving: false
     property bool autoSaveEnabled: _backend.saveTimerRunning
 
     Rectangle {
@@ -90,10 +91,27 @@ Window {
 
                             MouseArea {
                                 anchors.fill: parent
-                                onClicked: {
-                                    console.log("Ручное сохранение...")
-                                    saveCanvas()
-                                }
+                                onClicked: _backend.saveCanvasManually()
+                            }
+                        }
+
+                        // Новый рисунок: текущий остается в ленте истории
+                        Rectangle {
+                            width: 120
+                            height: 30
+                            color: "#2196F3"
+                            radius: 5
+
+                            Text {
+                                anchors.centerIn: parent
+                                text: "Новый рисунок"
+                                color: "white"
+                                font.bold: true
+                            }
+
+                            MouseArea {
+                                anchors.fill: parent
+                                onClicked: _backend.newDrawing()
                             }
                         }
 
@@ -129,7 +147,9 @@ Window {
                         // Отображение информации
                         Text {
                             id: saveInfo
-                            text: lastSavedImage ? "Последнее сохранение: " + lastSavedImage : "Еще не сохранено"
+                            text: (saving ? "Сохранение... " : "")
+                                  + (lastSavedImage ? "Последнее сохранение: " + lastSavedImage : "Еще не сохранено")
+                                  + (_backend.dirty ? " (есть изменения)" : "")
                             color: "white"
                             font.pixelSize: 12
                         }
@@ -145,82 +165,197 @@ Window {
             left: parent.left
             right: parent.right
             top: tools.bottom
-            bottom: parent.bottom
+            bottom: history.top
             margins: 8
         }
 
-        property real lastX
-        property real lastY
         property color color: tools.paintColor
+        // Штрихи, ожидающие отрисовки: сохраненные и текущий. Точки мыши копятся
+        // между кадрами и рисуются одной ломаной за кадр
+        property var pendingStrokes: []
+        property var liveStroke: null
+        // Очистить canvas в следующем onPaint (новый рисунок)
+        property bool clearRequested: false
+
+        renderStrategy: _backend.renderStrategy === "immediate" ? Canvas.Immediate
+                      : _backend.renderStrategy === "cooperative" ? Canvas.Cooperative : Canvas.Threaded
+        renderTarget: _backend.renderTarget === "fbo" ? Canvas.FramebufferObject : Canvas.Image
 
         onPaint: {
+            var metrics = _backend.metricsEnabled
+            if (metrics)
+                _backend.paintBegin()
             var ctx = getContext("2d")
-            ctx.lineWidth = tools.thickness
-            ctx.strokeStyle = canvas.color
-            ctx.beginPath()
-            ctx.moveTo(lastX, lastY)
-
-            lastX = paint_area.mouseX
-            lastY = paint_area.mouseY
-
-            ctx.lineTo(lastX, lastY)
-            ctx.stroke()
-        }
+            if (clearRequested) {
+                ctx.clearRect(0, 0, width, height)
+                clearRequested = false
+            }
+            ctx.lineCap = "round"
+            ctx.lineJoin = "round"
+
+            // Каждый штрих - одна ломаная
+            for (var i = 0; i < pendingStrokes.length; i++) {
+                var stroke = pendingStrokes[i]
+                var points = stroke.points
+                if (points.length < 4)
+                    continue
+                ctx.lineWidth = stroke.width
+                ctx.strokeStyle = stroke.color
+                ctx.beginPath()
+                ctx.moveTo(points[0], points[1])
+                for (var j = 2; j < points.length; j += 2)
+                    ctx.lineTo(points[j], points[j + 1])
+                ctx.stroke()
+            }
 
-        // Функция для сохранения canvas
-        function saveToFile() {
-            var timestamp = new Date().getTime()
-            var filename = "canvas_" + timestamp + ".png"
-            
-            // Получаем полный путь от Python бэкенда
-            var fullPath = _backend.getSavePath(filename)
-            
-            console.log("Пытаюсь сохранить в:", fullPath)
-            
-            // Сохраняем в папку saved_canvases
-            var saved = canvas.save(fullPath)
-            
-            if (saved) {
-                root.lastSavedImage = filename
-                console.log("Успешно сохранено:", filename)
-                return true
+            // Текущий штрих продолжится с последней нарисованной точки
+            if (liveStroke && paint_area.pressed) {
+                liveStroke.points = liveStroke.points.slice(-2)
+                pendingStrokes = [liveStroke]
             } else {
-                console.log("Ошибка: Не удалось сохранить файл")
-                return false
+                liveStroke = null
+                pendingStrokes = []
             }
+            if (metrics)
+                _backend.paintEnd()
+        }
+
+        // Когда canvas готов, рисуем штрихи, сохраненные в прошлых сеансах
+        onAvailableChanged: {
+            if (available)
+                _backend.replayStrokes()
         }
 
+        // Изображение canvas снимает и сохраняет Python
+        Component.onCompleted: _backend.registerCanvas(canvas)
+
         MouseArea {
             id: paint_area
             anchors.fill: parent
 
             onPressed: {
-                canvas.lastX = mouseX
-                canvas.lastY = mouseY
+                canvas.liveStroke = {"color": tools.paintColor.toString(), "width": tools.thickness,
+                                     "points": [mouseX, mouseY]}
+                canvas.pendingStrokes.push(canvas.liveStroke)
+                _backend.beginStroke(mouseX, mouseY, tools.paintColor, tools.thickness)
             }
 
+            // Запрос перерисовки выполняется один раз за кадр, сколько бы событий ни пришло
             onPositionChanged: {
+                canvas.liveStroke.points.push(mouseX, mouseY)
+                _backend.addPoint(mouseX, mouseY)
                 canvas.requestPaint()
             }
+
+            onReleased: _backend.endStroke()
+            onCanceled: _backend.endStroke()
         }
     }
 
-    // Функция сохранения canvas
-    function saveCanvas() {
-        console.log("Сохранение canvas...")
-        if (canvas.saveToFile()) {
-            console.log("Успешно сохранено!")
-        } else {
-            console.log("Сохранение не удалось!")
+    // Замеры кадров и задержки ввода (F3). Оверлей лежит поверх canvas,
+    // но не внутри него, чтобы не попадать в сохранения
+    Rectangle {
+        anchors {
+            top: canvas.top
+            right: canvas.right
+            margins: 4
+        }
+        visible: _backend.metricsEnabled
+        width: metricsInfo.width + 12
+        height: metricsInfo.height + 8
+        color: "#b0000000"
+        radius: 4
+
+        Text {
+            id: metricsInfo
+            anchors.centerIn: parent
+            text: _backend.metricsText
+            color: "white"
+            font.family: "monospace"
+            font.pixelSize: 11
         }
     }
 
-    // Обработчик автосохранения из Python
+    Shortcut {
+        sequence: "F3"
+        onActivated: _backend.setMetricsEnabled(!_backend.metricsEnabled)
+    }
+
+    // Лента истории сохранений: от новых к старым, миниатюры готовит Python
+    Rectangle {
+        id: history
+        anchors {
+            left: parent.left
+            right: parent.right
+            bottom: parent.bottom
+        }
+        height: 116
+        color: "#3c3c3c"
+
+        ListView {
+            anchors.fill: parent
+            anchors.margins: 5
+            orientation: ListView.Horizontal
+            spacing: 5
+            clip: true
+            model: _backend.history
+            // Миниатюры соседних сохранений запрашиваются заранее
+            cacheBuffer: 500
+
+            delegate: Column {
+                spacing: 2
+
+                Rectangle {
+                    width: 120
+                    height: 90
+                    color: "white"
+                    border.color: kind === "manual" ? "#4CAF50" : "#777777"
+
+                    Image {
+                        anchors.fill: parent
+                        anchors.margins: 1
+                        source: thumbnail
+                        fillMode: Image.PreserveAspectFit
+                        cache: false
+                    }
+                }
+
+                Text {
+                    text: time
+                    color: "white"
+                    font.pixelSize: 10
+                }
+            }
+        }
+    }
+
+    // Пакеты сохраненных штрихов из Python
+    Connections {
+        target: _backend
+        function onStrokesReplayed(batch) {
+            canvas.pendingStrokes = canvas.pendingStrokes.concat(batch)
+            canvas.requestPaint()
+        }
+        function onDrawingCleared() {
+            canvas.pendingStrokes = []
+            canvas.liveStroke = null
+            canvas.clearRequested = true
+            canvas.requestPaint()
+        }
+    }
+
+    // Ход сохранения: PNG кодируется в фоновом потоке Python
     Connections {
         target: _backend
         function onSaveRequested() {
-            console.log("Автосохранение из Python...")
-            saveCanvas()
+            root.saving = true
+        }
+        function onSaveFinished(filename, ok, error) {
+            root.saving = false
+            if (ok)
+                root.lastSavedImage = filename
+            else
+                console.log("Ошибка сохранения:", error)
         }
     }
 
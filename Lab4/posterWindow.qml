@@ -0,0 +1,158 @@
+import QtQuick 2.15
+import QtQuick.Window 2.15
+import Paint 1.0
+
+// Большой рисунок: колесо мыши - масштаб, правая кнопка - прокрутка
+Window {
+    id: root
+    visible: true
+    width: 1000
+    height: 1000
+    title: "Paint! (плакат)"
+
+    Rectangle {
+        id: tools
+        width: parent.width
+        height: 150
+        color: "#545454"
+        z: 1
+
+        property color paintColor: "#33B5E5"
+        property int thickness: 1
+        property int spacing: 4
+
+        Column {
+            spacing: tools.spacing
+            anchors.centerIn: parent
+
+            // Цвета
+            Row {
+                spacing: tools.spacing
+                anchors.horizontalCenter: parent.horizontalCenter
+
+                Repeater {
+                    model: ["#33B5E5", "#99CC00", "#FFBB33", "#FF4444"]
+                    Square {
+                        width: 80
+                        active: tools.paintColor === color
+                        color: modelData
+                        onClicked: tools.paintColor = color
+                    }
+                }
+            }
+
+            // Толщина линии и масштаб
+            Row {
+                spacing: tools.spacing
+                anchors.horizontalCenter: parent.horizontalCenter
+
+                Repeater {
+                    model: [1,2,3,4,5]
+
+                    Circle {
+                        active: tools.thickness === thickness
+                        thickness: modelData
+                        text: thickness
+                        onClicked: tools.thickness = thickness
+                    }
+                }
+
+                Rectangle {
+                    width: 80
+                    height: 25
+                    color: "white"
+                    radius: 5
+
+                    Text {
+                        anchors.centerIn: parent
+                        text: "Весь рисунок"
+                    }
+
+                    MouseArea {
+                        anchors.fill: parent
+                        onClicked: canvas.fitToView()
+                    }
+                }
+
+                Text {
+                    anchors.verticalCenter: parent.verticalCenter
+                    color: "white"
+                    text: (canvas.zoom * 100).toFixed(canvas.zoom < 0.1 ? 2 : 0) + "%"
+                }
+            }
+        }
+    }
+
+    TiledCanvas {
+        id: canvas
+        anchors {
+            left: parent.left
+            right: parent.right
+            top: tools.bottom
+            bottom: status.top
+        }
+        clip: true
+        directory: _posterDir
+        docWidth: _posterWidth
+        docHeight: _posterHeight
+        cacheMegabytes: _posterCacheMegabytes
+        color: tools.paintColor
+        // Толщина задается в пикселях экрана
+        thickness: tools.thickness / canvas.zoom
+
+        MouseArea {
+            anchors.fill: parent
+            acceptedButtons: Qt.LeftButton | Qt.RightButton
+
+            property point last
+
+            onPressed: {
+                last = Qt.point(mouse.x, mouse.y)
+                if (mouse.button === Qt.LeftButton)
+                    canvas.beginStroke(mouse.x, mouse.y)
+            }
+
+            onPositionChanged: {
+                if (pressedButtons & Qt.RightButton)
+                    canvas.panBy(mouse.x - last.x, mouse.y - last.y)
+                else
+                    canvas.addPoint(mouse.x, mouse.y)
+                last = Qt.point(mouse.x, mouse.y)
+            }
+
+            onReleased: canvas.endStroke()
+            onCanceled: canvas.endStroke()
+
+            onWheel: canvas.zoomAt(Math.pow(1.25, wheel.angleDelta.y / 120), wheel.x, wheel.y)
+        }
+    }
+
+    // Перед выходом плитки дописываются на диск
+    Connections {
+        target: Qt.application
+        function onAboutToQuit() { canvas.close() }
+    }
+
+    // Строка статуса: что сейчас в кэше плиток
+    Rectangle {
+        id: status
+        anchors {
+            left: parent.left
+            right: parent.right
+            bottom: parent.bottom
+        }
+        height: 24
+        color: "#545454"
+
+        Text {
+            anchors {
+                left: parent.left
+                verticalCenter: parent.verticalCenter
+                leftMargin: 8
+            }
+            color: "white"
+            font.pixelSize: 12
+            text: canvas.stats
+        }
+    }
+}
@@ -0,0 +1,335 @@
+"""Хранилище сохраненных изображений canvas: плитки, дедупликация, ограничение объема.
+
+Изображение делится на плитки TILE_SIZE x TILE_SIZE. Снимок - это манифест:
+размер изображения и хеши пикселей плиток по строкам. Плитки хранятся
+в папке tiles/ по хешу, поэтому одинаковые плитки разных снимков
+записываются один раз. При сохранении кодируются только плитки,
+задетые изменениями (dirty) с прошлого снимка, и только если такой
+плитки еще нет; остальные берутся из прошлого манифеста без чтения
+пикселей. Список снимков ведется в index.json, поэтому для просмотра
+истории не нужно перечислять файлы.
+
+Снимки прошлых версий (один PNG на снимок, поле file) остаются в списке
+и хранятся по тем же правилам.
+
+Правила хранения (prune):
+  * последние keep_last снимков хранятся всегда;
+  * из более старых за последние hourly_hours часов остается последний
+    снимок каждого часа, за последние daily_days дней - каждого дня;
+  * снимки, сохраненные вручную, не прореживаются;
+  * если файлы занимают больше disk_budget байт, удаляются самые старые
+    снимки (кроме последнего).
+
+Все методы, кроме snapshots() и find(), рассчитаны на вызов из одного
+фонового потока (CanvasSaver); snapshots() можно вызывать из любого потока.
+
+    python snapshot_store.py list
+    python snapshot_store.py export canvas_1765538674488.png out.png
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import QPoint, QRect, Qt
+from PyQt5.QtGui import QImage, QPainter
+
+from canvas_saver import DEFAULT_COMPRESSION, write_file, write_png
+
+INDEX_FILE = "index.json"
+TILES_DIR = "tiles"
+INDEX_VERSION = 2
+TILE_SIZE = 256
+
+KIND_AUTO = "auto"
+KIND_MANUAL = "manual"
+
+DEFAULT_KEEP_LAST = 100
+DEFAULT_HOURLY_HOURS = 24
+DEFAULT_DAILY_DAYS = 30
+DEFAULT_DISK_BUDGET = 200 * 1024 * 1024
+
+LEGACY_PATTERN = re.compile(r"canvas_(\d+)\.png$")
+
+
+def image_hash(image):
+    """Хеш пикселей изображения (размер и формат тоже учитываются)"""
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.width()}x{image.height()}:".encode())
+    digest.update(bits)
+    return digest.hexdigest()
+
+
+def snapshot_name(timestamp_ms):
+    return f"canvas_{timestamp_ms}.png"
+
+
+def tile_rects(width, height, tile_size=TILE_SIZE):
+    """Прямоугольники плиток по строкам; крайние плитки могут быть меньше"""
+    return [QRect(x, y, min(tile_size, width - x), min(tile_size, height - y))
+            for y in range(0, height, tile_size) for x in range(0, width, tile_size)]
+
+
+def tile_file(digest):
+    return f"{TILES_DIR}/{digest}.png"
+
+
+class SnapshotStore:
+    def __init__(self, directory, keep_last=DEFAULT_KEEP_LAST, hourly_hours=DEFAULT_HOURLY_HOURS,
+                 daily_days=DEFAULT_DAILY_DAYS, disk_budget=DEFAULT_DISK_BUDGET, tile_size=TILE_SIZE):
+        self.directory = directory
+        self.index_file = os.path.join(directory, INDEX_FILE)
+        self.keep_last = keep_last
+        self.hourly_hours = hourly_hours
+        self.daily_days = daily_days
+        self.disk_budget = disk_budget
+        self.tile_size = tile_size
+        self._lock = threading.Lock()
+        # Снимки от старых к новым. Плиточный снимок: name, time, kind, width,
+        # height, tile, tiles (хеши); снимок прошлых версий: name, time, kind, file, size, hash
+        self._snapshots = []
+        # Хеш плитки -> размер файла
+        self._tile_sizes = {}
+        # Последний снимок, сохраненный в этом сеансе: от него считаются изменения
+        self._previous = None
+        os.makedirs(os.path.join(directory, TILES_DIR), exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения списка сохранений: {e}")
+            data = {}
+        self._snapshots = sorted(data.get("snapshots", []), key=lambda snapshot: snapshot["time"])
+        self._tile_sizes = dict(data.get("tiles", {}))
+
+    def _save_index(self):
+        with self._lock:
+            data = {"version": INDEX_VERSION, "snapshots": list(self._snapshots),
+                    "tiles": dict(self._tile_sizes)}
+        write_file(self.index_file, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def snapshots(self):
+        """Копия списка снимков от старых к новым"""
+        with self._lock:
+            return list(self._snapshots)
+
+    def find(self, name):
+        for snapshot in self.snapshots():
+            if snapshot["name"] == name:
+                return snapshot
+        return None
+
+    def files(self, snapshot):
+        """Файлы снимка (пути относительно папки) и их размеры"""
+        if "tiles" in snapshot:
+            return {tile_file(digest): self._tile_sizes.get(digest, 0) for digest in snapshot["tiles"]}
+        return {snapshot["file"]: snapshot["size"]}
+
+    def total_size(self, snapshots=None):
+        """Объем файлов на диске: каждый файл учитывается один раз"""
+        files = {}
+        for snapshot in self._snapshots if snapshots is None else snapshots:
+            files.update(self.files(snapshot))
+        return sum(files.values())
+
+    def add(self, image, kind=KIND_AUTO, timestamp_ms=None, compression=DEFAULT_COMPRESSION, dirty=None):
+        """Сохраняет снимок и возвращает запись о нем (словарь).
+
+        dirty - QRect в пикселях изображения, где рисунок мог измениться с
+        прошлого снимка этого сеанса; None - изменения могли быть везде.
+        В записи дополнительно возвращаются written - число записанных
+        плиток и duplicate - True, если не записано ни одной. После
+        добавления применяются правила хранения.
+        """
+        timestamp_ms = int(time.time() * 1000) if timestamp_ms is None else timestamp_ms
+        image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+        width, height = image.width(), image.height()
+        previous = self._previous
+        if (dirty is None or previous is None or (previous["width"], previous["height"]) != (width, height)
+                or previous["tile"] != self.tile_size):
+            previous = None
+
+        tiles = []
+        written = 0
+        for index, rect in enumerate(tile_rects(width, height, self.tile_size)):
+            if previous is not None and not dirty.intersects(rect):
+                tiles.append(previous["tiles"][index])
+                continue
+            tile = image.copy(rect)
+            digest = image_hash(tile)
+            if digest not in self._tile_sizes:
+                path = os.path.join(self.directory, tile_file(digest))
+                write_png(tile, path, compression)
+                with self._lock:
+                    self._tile_sizes[digest] = os.path.getsize(path)
+                written += 1
+            tiles.append(digest)
+
+        snapshot = {"name": snapshot_name(timestamp_ms), "time": timestamp_ms, "kind": kind,
+                    "width": width, "height": height, "tile": self.tile_size, "tiles": tiles}
+        with self._lock:
+            self._snapshots.append(snapshot)
+            self._snapshots.sort(key=lambda item: item["time"])
+        self._previous = snapshot
+        self.prune()
+        return dict(snapshot, written=written, duplicate=written == 0)
+
+    def load(self, snapshot):
+        """Собирает изображение снимка; OSError, если файлы снимка не читаются"""
+        if "tiles" not in snapshot:
+            image = QImage(os.path.join(self.directory, snapshot["file"]))
+            if image.isNull():
+                raise OSError(f"не удалось прочитать {snapshot['file']}")
+            return image
+        image = QImage(snapshot["width"], snapshot["height"], QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        try:
+            rects = tile_rects(snapshot["width"], snapshot["height"], snapshot["tile"])
+            for rect, digest in zip(rects, snapshot["tiles"]):
+                tile = QImage(os.path.join(self.directory, tile_file(digest)))
+                if tile.isNull():
+                    raise OSError(f"не удалось прочитать плитку {digest}")
+                painter.drawImage(QPoint(rect.x(), rect.y()), tile)
+        finally:
+            painter.end()
+        return image
+
+    def import_legacy(self):
+        """Добавляет в список файлы canvas_<время>.png, сохраненные до появления index.json"""
+        known = {snapshot.get("file") for snapshot in self._snapshots}
+        added = 0
+        for path in glob.glob(os.path.join(self.directory, "canvas_*.png")):
+            file = os.path.basename(path)
+            match = LEGACY_PATTERN.match(file)
+            if not match or file in known:
+                continue
+            image = QImage(path)
+            if image.isNull():
+                continue
+            snapshot = {"name": file, "time": int(match.group(1)), "kind": KIND_AUTO,
+                        "file": file, "size": os.path.getsize(path), "hash": image_hash(image)}
+            with self._lock:
+                self._snapshots.append(snapshot)
+            added += 1
+        if added:
+            with self._lock:
+                self._snapshots.sort(key=lambda item: item["time"])
+            self.prune()
+        return added
+
+    def select(self, snapshots, now_ms):
+        """Снимки, которые остаются по правилам хранения (без учета объема)"""
+        keep = snapshots[-self.keep_last:] if self.keep_last > 0 else []
+        kept_ids = {id(snapshot) for snapshot in keep}
+        hour_ms = 3600 * 1000
+        hourly_from = now_ms - self.hourly_hours * hour_ms
+        daily_from = now_ms - self.daily_days * 24 * hour_ms
+        buckets = set()
+        # От новых к старым: в каждом часе/дне остается самый новый снимок
+        for snapshot in reversed(snapshots):
+            if id(snapshot) in kept_ids:
+                continue
+            moment = snapshot["time"]
+            if snapshot["kind"] == KIND_MANUAL:
+                bucket = None
+            elif moment >= hourly_from:
+                bucket = ("hour", moment // hour_ms)
+            elif moment >= daily_from:
+                bucket = ("day", datetime.fromtimestamp(moment / 1000).date())
+            else:
+                continue
+            if bucket is not None:
+                if bucket in buckets:
+                    continue
+                buckets.add(bucket)
+            keep.append(snapshot)
+            kept_ids.add(id(snapshot))
+        return sorted(keep, key=lambda item: item["time"])
+
+    def prune(self, now_ms=None):
+        """Применяет правила хранения, удаляет ненужные файлы и сохраняет список.
+
+        Возвращает число удаленных снимков.
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        with self._lock:
+            snapshots = list(self._snapshots)
+        keep = self.select(snapshots, now_ms)
+        # Ограничение объема: удаляем самые старые, последний снимок остается всегда
+        while len(keep) > 1 and self.total_size(keep) > self.disk_budget:
+            keep.pop(0)
+
+        removed = len(snapshots) - len(keep)
+        if removed:
+            used = set()
+            for snapshot in keep:
+                used.update(self.files(snapshot))
+            unused = set()
+            for snapshot in snapshots:
+                unused.update(file for file in self.files(snapshot) if file not in used)
+            with self._lock:
+                self._snapshots = keep
+                for file in unused:
+                    if file.startswith(TILES_DIR + "/"):
+                        self._tile_sizes.pop(file[len(TILES_DIR) + 1:-len(".png")], None)
+            for file in unused:
+                try:
+                    os.remove(os.path.join(self.directory, file))
+                except OSError:
+                    pass
+        self._save_index()
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сохранения рисунка Paint")
+    parser.add_argument("--dir", default="saved_canvases", help="папка сохранений")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="показать сохранения")
+    export = commands.add_parser("export", help="собрать сохранение в PNG")
+    export.add_argument("name", help="имя сохранения (canvas_<время>.png)")
+    export.add_argument("output", help="PNG-файл")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.dir)
+    if args.command == "list":
+        for snapshot in store.snapshots():
+            moment = datetime.fromtimestamp(snapshot["time"] / 1000).strftime("%Y-%m-%d %H:%M:%S")
+            size = sum(store.files(snapshot).values())
+            print(f"{snapshot['name']:28} {moment} {snapshot['kind']:6} {size:>10}")
+        print(f"Всего на диске: {store.total_size()} байт")
+        return
+
+    snapshot = store.find(args.name)
+    if snapshot is None:
+        print(f"Нет сохранения {args.name}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        image = store.load(snapshot)
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not image.save(args.output):
+        print(f"Не удалось сохранить {args.output}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.output}: {image.width()}x{image.height()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Журнал штрихов: события рисования дописываются в файл до сохранения strokes.bin.
+
+Интерфейс только упаковывает событие в буфер в памяти. Буфер
+записывается и сбрасывается на диск (fsync) в фоновом потоке, когда в
+нем набирается FLUSH_BYTES байт или по таймеру (flush()). При сбое
+теряется не больше одного такого пакета.
+
+Журнал ведется файлами journal_<номер>.bin. При сохранении strokes.bin
+начинается новый файл (rotate), а старые удаляются, когда strokes.bin
+записан (discard); при очистке рисунка удаляются все файлы (clear). При запуске после сбоя события из оставшихся файлов
+дописываются к штрихам из strokes.bin (recover). Каждый штрих в журнале
+помечен своим номером, поэтому штрихи, уже попавшие в strokes.bin,
+повторно не добавляются.
+
+Записи (little-endian), после заголовка '<8sH' (сигнатура, версия):
+
+    'B' '<IdIfff'   начало штриха: номер, время начала, цвет ARGB, толщина, x, y
+    'P' '<fff'      точка текущего штриха: x, y, время в мс от начала штриха
+    'E' '<I'        конец штриха: номер
+"""
+import glob
+import os
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from stroke_store import Stroke
+
+MAGIC = b"STRKJRNL"
+VERSION = 1
+HEADER = struct.Struct("<8sH")
+BEGIN = struct.Struct("<cIdIfff")
+POINT = struct.Struct("<cfff")
+END = struct.Struct("<cI")
+RECORDS = {b"B": BEGIN, b"P": POINT, b"E": END}
+
+JOURNAL_PATTERN = re.compile(r"journal_(\d+)\.bin$")
+# Размер буфера, после которого он записывается, не дожидаясь таймера
+FLUSH_BYTES = 64 * 1024
+# Интервал записи буфера по таймеру, мс
+FLUSH_INTERVAL = 250
+
+
+def journal_files(directory):
+    """Файлы журнала [(номер, путь)] по возрастанию номера"""
+    files = []
+    for path in glob.glob(os.path.join(directory, "journal_*.bin")):
+        match = JOURNAL_PATTERN.search(path)
+        if match:
+            files.append((int(match.group(1)), path))
+    return sorted(files)
+
+
+def read_records(data):
+    """Записи файла журнала; обрезанная последняя запись (сбой при записи) пропускается"""
+    if len(data) < HEADER.size:
+        return
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("неизвестная сигнатура журнала штрихов")
+    if version != VERSION:
+        raise ValueError(f"неподдерживаемая версия журнала штрихов: {version}")
+    offset = HEADER.size
+    while offset < len(data):
+        record = RECORDS.get(data[offset:offset + 1])
+        if record is None:
+            raise ValueError(f"неизвестная запись журнала в позиции {offset}")
+        if offset + record.size > len(data):
+            return
+        yield record.unpack_from(data, offset)
+        offset += record.size
+
+
+def recover(directory, store):
+    """Дописывает в store штрихи из журнала, которых в нем еще нет.
+
+    Возвращает число восстановленных штрихов.
+    """
+    base = len(store.strokes)
+    current, current_index = None, None
+    recovered = 0
+
+    def finish():
+        nonlocal current, recovered
+        if current is not None:
+            store.strokes.append(current)
+            recovered += 1
+            current = None
+
+    for _, path in journal_files(directory):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            for record in read_records(data):
+                kind = record[0]
+                if kind == b"B":
+                    _, index, started, color, width, x, y = record
+                    # Начало того же штриха повторяется в новом файле после rotate
+                    if index != current_index:
+                        finish()
+                    current, current_index = None, index
+                    if index >= base:
+                        current = Stroke(color, width, started)
+                        current.add(x, y, 0.0)
+                elif kind == b"P":
+                    if current is not None:
+                        current.add(*record[1:])
+                elif record[1] == current_index:
+                    finish()
+                    current_index = None
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения журнала {os.path.basename(path)}: {e}")
+    finish()
+    return recovered
+
+
+class StrokeJournal:
+    """Запись журнала штрихов.
+
+    begin/point/end/flush/rotate вызываются из потока интерфейса; файлы
+    пишутся в собственном фоновом потоке в порядке вызовов.
+    """
+
+    def __init__(self, directory, flush_bytes=FLUSH_BYTES):
+        self.directory = directory
+        self.flush_bytes = flush_bytes
+        files = journal_files(directory)
+        # Номер текущего файла: после файлов, оставшихся от прошлого запуска
+        self.seq = files[-1][0] + 1 if files else 1
+        self._buffer = bytearray()
+        self._file = None
+        self._file_seq = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stroke-journal")
+
+    def path(self, seq):
+        return os.path.join(self.directory, f"journal_{seq}.bin")
+
+    def begin(self, index, stroke):
+        """Начало штриха с номером index (первая точка уже в stroke)"""
+        self._buffer += BEGIN.pack(b"B", index, stroke.started, stroke.color, stroke.width,
+                                   stroke.xs[0], stroke.ys[0])
+
+    def point(self, stroke):
+        """Последняя точка текущего штриха"""
+        self._buffer += POINT.pack(b"P", stroke.xs[-1], stroke.ys[-1], stroke.ts[-1])
+        if len(self._buffer) >= self.flush_bytes:
+            self.flush()
+
+    def end(self, index):
+        self._buffer += END.pack(b"E", index)
+
+    def flush(self):
+        """Передает накопленные события на запись с fsync"""
+        if not self._buffer:
+            return
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        self._executor.submit(self._write, self.seq, data)
+
+    def rotate(self, index=None, stroke=None):
+        """Начинает новый файл журнала и возвращает его номер.
+
+        Вызывается, когда штрихи без текущего закодированы для записи в
+        strokes.bin. Незавершенный штрих (index, stroke) повторяется в новом
+        файле целиком, чтобы старые файлы можно было удалить.
+        """
+        self.flush()
+        self.seq += 1
+        if stroke is not None:
+            self.begin(index, stroke)
+            for x, y, t in zip(stroke.xs[1:], stroke.ys[1:], stroke.ts[1:]):
+                self._buffer += POINT.pack(b"P", x, y, t)
+        return self.seq
+
+    def clear(self):
+        """Удаляет весь журнал (рисунок очищен) и возвращает номер нового файла.
+
+        Дожидается удаления: иначе после сбоя штрихи прежнего рисунка
+        восстановились бы поверх нового.
+        """
+        self._buffer.clear()
+        self.seq += 1
+        self._executor.submit(self._remove_before, self.seq).result()
+        return self.seq
+
+    def discard(self, seq):
+        """Удаляет файлы журнала с номером меньше seq (их штрихи уже в strokes.bin)"""
+        self._executor.submit(self._remove_before, seq)
+
+    def close(self):
+        """Записывает оставшиеся события и дожидается окончания записи"""
+        self.flush()
+        self._executor.submit(self._close_file)
+        self._executor.shutdown(wait=True)
+
+    def _write(self, seq, data):
+        try:
+            if self._file_seq != seq:
+                self._close_file()
+                self._file = open(self.path(seq), "ab")
+                self._file_seq = seq
+                if self._file.tell() == 0:
+                    self._file.write(HEADER.pack(MAGIC, VERSION))
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            print(f"Ошибка записи журнала штрихов: {e}")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_seq = None
+
+    def _remove_before(self, seq):
+        for file_seq, path in journal_files(self.directory):
+            if file_seq >= seq:
+                break
+            if file_seq == self._file_seq:
+                self._close_file()
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Ошибка удаления журнала штрихов: {e}")
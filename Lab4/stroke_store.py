@@ -0,0 +1,235 @@
+"""Векторная модель рисунка: штрихи как массивы точек.
+
+Каждый штрих - цвет, толщина и три массива array('f'): x, y и время
+точки в миллисекундах от начала штриха. По штрихам рисунок можно
+заново отрисовать в любом разрешении (render_strokes) и быстро
+загрузить без разбора PNG.
+
+Двоичный формат (little-endian):
+
+    заголовок '<8sHHI'   сигнатура, версия, резерв, число штрихов
+    для каждого штриха:
+      '<dIfI'            время начала (секунды Unix), цвет ARGB,
+                         толщина, число точек n
+      x, y, t            по n x float32
+
+    python stroke_store.py render strokes.bin big.png --scale 4
+"""
+import argparse
+import struct
+import sys
+import time
+from array import array
+
+from PyQt5.QtCore import QPointF, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPolygonF
+
+from canvas_saver import write_file
+
+STROKES_FILE = "strokes.bin"
+MAGIC = b"STROKES\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHI")
+STROKE_HEADER = struct.Struct("<dIfI")
+# Сколько точек отдается в QML за один пакет при воспроизведении
+REPLAY_BATCH_POINTS = 20000
+
+
+def _to_le(values):
+    """Байты массива в порядке little-endian"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(data):
+    values = array("f")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class Stroke:
+    """Один штрих: цвет, толщина и точки (x, y, t)"""
+    __slots__ = ("started", "color", "width", "xs", "ys", "ts")
+
+    def __init__(self, color, width, started=None, xs=None, ys=None, ts=None):
+        self.started = time.time() if started is None else started
+        self.color = QColor(color).rgba() if not isinstance(color, int) else color
+        self.width = float(width)
+        self.xs = xs if xs is not None else array("f")
+        self.ys = ys if ys is not None else array("f")
+        self.ts = ts if ts is not None else array("f")
+
+    def __len__(self):
+        return len(self.xs)
+
+    def add(self, x, y, t=None):
+        if t is None:
+            t = (time.time() - self.started) * 1000
+        self.xs.append(x)
+        self.ys.append(y)
+        self.ts.append(t)
+
+    @property
+    def color_name(self):
+        """Цвет в виде '#aarrggbb' для QML"""
+        return QColor.fromRgba(self.color).name(QColor.HexArgb)
+
+    def points(self):
+        """Точки подряд [x0, y0, x1, y1, ...] для передачи в QML"""
+        flat = array("f", bytes(8 * len(self)))
+        flat[0::2] = self.xs
+        flat[1::2] = self.ys
+        return flat.tolist()
+
+    def to_qml(self):
+        return {"color": self.color_name, "width": self.width, "points": self.points()}
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) с учетом толщины"""
+        half = self.width / 2
+        return (min(self.xs) - half, min(self.ys) - half, max(self.xs) + half, max(self.ys) + half)
+
+
+class StrokeStore:
+    """Все штрихи рисунка и штрих, который рисуется сейчас"""
+
+    def __init__(self):
+        self.strokes = []
+        self.current = None
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def point_count(self):
+        return sum(len(stroke) for stroke in self.strokes)
+
+    def begin(self, x, y, color, width):
+        """Начинает штрих; незавершенный предыдущий штрих завершается"""
+        self.end()
+        self.current = Stroke(color, width)
+        self.current.add(x, y, 0.0)
+        return self.current
+
+    def add(self, x, y):
+        if self.current is not None:
+            self.current.add(x, y)
+
+    def end(self):
+        """Завершает текущий штрих и возвращает его (или None)"""
+        stroke, self.current = self.current, None
+        if stroke is not None:
+            self.strokes.append(stroke)
+        return stroke
+
+    def clear(self):
+        self.strokes.clear()
+        self.current = None
+
+    def batches(self, max_points=REPLAY_BATCH_POINTS):
+        """Штрихи для QML пакетами примерно по max_points точек"""
+        batch, points = [], 0
+        for stroke in self.strokes:
+            batch.append(stroke.to_qml())
+            points += len(stroke)
+            if points >= max_points:
+                yield batch
+                batch, points = [], 0
+        if batch:
+            yield batch
+
+    def encode(self):
+        parts = [HEADER.pack(MAGIC, VERSION, 0, len(self.strokes))]
+        for stroke in self.strokes:
+            parts.append(STROKE_HEADER.pack(stroke.started, stroke.color, stroke.width, len(stroke)))
+            parts += [_to_le(stroke.xs), _to_le(stroke.ys), _to_le(stroke.ts)]
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, data):
+        """Разбирает файл штрихов; ValueError, если он поврежден"""
+        if len(data) < HEADER.size:
+            raise ValueError("файл штрихов обрезан")
+        magic, version, _, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("неизвестная сигнатура файла штрихов")
+        if version != VERSION:
+            raise ValueError(f"неподдерживаемая версия файла штрихов: {version}")
+        store = cls()
+        offset = HEADER.size
+        view = memoryview(data)
+        for _ in range(count):
+            if offset + STROKE_HEADER.size > len(data):
+                raise ValueError("файл штрихов обрезан")
+            started, color, width, n = STROKE_HEADER.unpack_from(data, offset)
+            offset += STROKE_HEADER.size
+            size = 4 * n
+            if offset + 3 * size > len(data):
+                raise ValueError("файл штрихов обрезан")
+            xs = _from_le(view[offset:offset + size])
+            ys = _from_le(view[offset + size:offset + 2 * size])
+            ts = _from_le(view[offset + 2 * size:offset + 3 * size])
+            offset += 3 * size
+            store.strokes.append(Stroke(color, width, started, xs, ys, ts))
+        return store
+
+    def save(self, path):
+        """Атомарно записывает штрихи в файл"""
+        write_file(path, self.encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.decode(f.read())
+
+
+def render_strokes(strokes, width, height, scale=1.0, background=Qt.transparent):
+    """Рисует штрихи в QImage размером width x height, увеличивая координаты в scale раз"""
+    image = QImage(int(width), int(height), QImage.Format_ARGB32_Premultiplied)
+    image.fill(background)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.scale(scale, scale)
+    for stroke in strokes:
+        pen = QPen(QColor.fromRgba(stroke.color), stroke.width)
+        pen.setCapStyle(Qt.RoundCap)
+        pen.setJoinStyle(Qt.RoundJoin)
+        painter.setPen(pen)
+        if len(stroke) == 1:
+            painter.drawPoint(QPointF(stroke.xs[0], stroke.ys[0]))
+        else:
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(stroke.xs, stroke.ys)]))
+    painter.end()
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Штрихи рисунка Paint")
+    commands = parser.add_subparsers(dest="command", required=True)
+    render = commands.add_parser("render", help="отрисовать штрихи в PNG")
+    render.add_argument("strokes", help="файл штрихов")
+    render.add_argument("output", help="PNG-файл")
+    render.add_argument("--scale", type=float, default=1.0, help="масштаб")
+    render.add_argument("--background", default="white", help="цвет фона")
+    args = parser.parse_args()
+
+    store = StrokeStore.load(args.strokes)
+    if not store.strokes:
+        print("В файле нет штрихов", file=sys.stderr)
+        sys.exit(1)
+    right = max(stroke.bounds()[2] for stroke in store.strokes)
+    bottom = max(stroke.bounds()[3] for stroke in store.strokes)
+    image = render_strokes(store.strokes, right * args.scale + 1, bottom * args.scale + 1,
+                           args.scale, QColor(args.background))
+    if not image.save(args.output):
+        print(f"Не удалось сохранить {args.output}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.output}: {image.width()}x{image.height()}, штрихов: {len(store)}, "
+          f"точек: {store.point_count()}")
+
+
+if __name__ == "__main__":
+    main()
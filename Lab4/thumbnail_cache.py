@@ -0,0 +1,228 @@
+"""Миниатюры сохранений для ленты истории.
+
+Миниатюры декодируются пулом фоновых потоков: QImageReader.setScaledSize
+уменьшает изображение при чтении, плиточный снимок собирается из
+уменьшенных плиток. Готовые миниатюры хранятся в LRU-кэше,
+ограниченном объемом пикселей, а их PNG - в файле кэша, который
+читается при следующем запуске. Поэтому при прокрутке истории
+изображения сохранений обычно вообще не читаются.
+
+Формат файла кэша (little-endian): заголовок '<8sHI' (сигнатура, версия,
+число записей), затем для каждой записи '<HI' (длина имени, длина PNG),
+имя в UTF-8 и PNG миниатюры.
+"""
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QPoint, QSize, Qt
+from PyQt5.QtGui import QImage, QImageReader, QPainter
+from PyQt5.QtQuick import QQuickImageProvider
+
+from canvas_saver import write_file
+from snapshot_store import tile_file, tile_rects
+
+THUMBNAILS_FILE = "thumbnails.bin"
+MAGIC = b"THUMBS\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHI")
+ENTRY = struct.Struct("<HI")
+
+THUMBNAIL_SIZE = QSize(120, 90)
+# Объем декодированных миниатюр в памяти и PNG миниатюр в файле кэша
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_FILE_BYTES = 32 * 1024 * 1024
+DEFAULT_WORKERS = 2
+
+
+def _read_scaled(path, size):
+    reader = QImageReader(path)
+    reader.setScaledSize(size)
+    image = reader.read()
+    if image.isNull():
+        raise OSError(f"не удалось прочитать {os.path.basename(path)}: {reader.errorString()}")
+    return image
+
+
+def render_thumbnail(store, snapshot, size=THUMBNAIL_SIZE):
+    """Уменьшенное изображение сохранения, вписанное в size"""
+    if "tiles" not in snapshot:
+        path = os.path.join(store.directory, snapshot["file"])
+        reader = QImageReader(path)
+        scaled = reader.size().scaled(size, Qt.KeepAspectRatio)
+        return _read_scaled(path, scaled)
+
+    width, height = snapshot["width"], snapshot["height"]
+    factor = min(size.width() / width, size.height() / height)
+    image = QImage(max(1, round(width * factor)), max(1, round(height * factor)),
+                   QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    try:
+        for rect, digest in zip(tile_rects(width, height, snapshot["tile"]), snapshot["tiles"]):
+            tile_size = QSize(max(1, math.ceil(rect.width() * factor)), max(1, math.ceil(rect.height() * factor)))
+            tile = _read_scaled(os.path.join(store.directory, tile_file(digest)), tile_size)
+            painter.drawImage(QPoint(int(rect.x() * factor), int(rect.y() * factor)), tile)
+    finally:
+        painter.end()
+    return image
+
+
+def encode_png(image):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+class ThumbnailCache:
+    """LRU-кэш миниатюр с фоновым декодированием.
+
+    get() и request() вызываются из потока интерфейса; ready(name)
+    вызывается в фоновом потоке, когда миниатюра готова.
+    """
+
+    def __init__(self, store, path=None, ready=None, size=THUMBNAIL_SIZE, max_bytes=DEFAULT_MAX_BYTES,
+                 max_file_bytes=DEFAULT_MAX_FILE_BYTES, workers=DEFAULT_WORKERS):
+        self.store = store
+        self.path = path
+        self.ready = ready
+        self.size = size
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        # Имя сохранения -> QImage, от давно использованных к недавним
+        self._images = OrderedDict()
+        self._bytes = 0
+        # Имя сохранения -> PNG миниатюры (то, что пишется в файл кэша)
+        self._encoded = OrderedDict()
+        self._encoded_bytes = 0
+        self._in_flight = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self._loaded = self._executor.submit(self._load) if path else None
+
+    def get(self, name):
+        """Миниатюра из памяти или None"""
+        with self._lock:
+            image = self._images.get(name)
+            if image is not None:
+                self._images.move_to_end(name)
+            return image
+
+    def request(self, snapshot):
+        """Ставит декодирование миниатюры в очередь, если ее нет в памяти"""
+        name = snapshot["name"]
+        with self._lock:
+            if name in self._images or name in self._in_flight:
+                return
+            self._in_flight.add(name)
+        self._executor.submit(self._decode, snapshot)
+
+    def _decode(self, snapshot):
+        name = snapshot["name"]
+        try:
+            if self._loaded is not None:
+                self._loaded.result()
+            with self._lock:
+                data = self._encoded.get(name)
+            image = QImage.fromData(data, "PNG") if data else None
+            if image is None or image.isNull():
+                image = render_thumbnail(self.store, snapshot, self.size)
+                data = encode_png(image)
+            with self._lock:
+                self._put(name, image, data)
+        except Exception as e:
+            print(f"Ошибка миниатюры {name}: {e}")
+            return
+        finally:
+            with self._lock:
+                self._in_flight.discard(name)
+        if self.ready is not None:
+            self.ready(name)
+
+    def _put(self, name, image, data):
+        if name not in self._images:
+            self._images[name] = image
+            self._bytes += image.sizeInBytes()
+        self._images.move_to_end(name)
+        while self._bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self._bytes -= evicted.sizeInBytes()
+
+        if name not in self._encoded:
+            self._encoded[name] = data
+            self._encoded_bytes += len(data)
+        self._encoded.move_to_end(name)
+        while self._encoded_bytes > self.max_file_bytes and len(self._encoded) > 1:
+            _, evicted = self._encoded.popitem(last=False)
+            self._encoded_bytes -= len(evicted)
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"Ошибка чтения кэша миниатюр: {e}")
+            return
+        if len(data) < HEADER.size:
+            return
+        magic, version, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            print("Кэш миниатюр другой версии, он будет создан заново")
+            return
+        offset = HEADER.size
+        entries = []
+        for _ in range(count):
+            if offset + ENTRY.size > len(data):
+                break
+            name_size, png_size = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            if offset + name_size + png_size > len(data):
+                break
+            name = data[offset:offset + name_size].decode("utf-8")
+            offset += name_size
+            entries.append((name, data[offset:offset + png_size]))
+            offset += png_size
+        with self._lock:
+            for name, png in entries:
+                if name not in self._encoded:
+                    self._encoded[name] = png
+                    self._encoded_bytes += len(png)
+
+    def save(self, names=None):
+        """Записывает файл кэша; names - сохранения, миниатюры которых стоит хранить"""
+        if not self.path:
+            return
+        if self._loaded is not None:
+            self._loaded.result()
+        with self._lock:
+            entries = [(name, png) for name, png in self._encoded.items() if names is None or name in names]
+        parts = [HEADER.pack(MAGIC, VERSION, len(entries))]
+        for name, png in entries:
+            encoded_name = name.encode("utf-8")
+            parts += [ENTRY.pack(len(encoded_name), len(png)), encoded_name, png]
+        write_file(self.path, b"".join(parts))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class ThumbnailProvider(QQuickImageProvider):
+    """image://thumbnails/<имя сохранения> - миниатюра из памяти кэша"""
+
+    def __init__(self, cache):
+        super().__init__(QQuickImageProvider.Image)
+        self.cache = cache
+
+    def requestImage(self, name, requested_size):
+        image = self.cache.get(name)
+        if image is None:
+            image = QImage(1, 1, QImage.Format_ARGB32_Premultiplied)
+            image.fill(Qt.transparent)
+        return image, image.size()
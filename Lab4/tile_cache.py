@@ -0,0 +1,224 @@
+"""Плитки большого рисунка: LRU-кэш в памяти, вытеснение на диск и пирамида уровней.
+
+Рисунок хранится плитками TILE_SIZE x TILE_SIZE. Уровень 0 - полное
+разрешение, плитка уровня L покрывает 2^L x 2^L плиток уровня 0 и
+собирается из четырех плиток уровня L-1, уменьшенных вдвое. Уровни
+выше 0 строятся только при запросе и помечаются устаревшими (stale),
+когда под ними рисуют.
+
+В памяти держатся недавно использованные плитки общим объемом до
+max_bytes. Вытесненная измененная плитка записывается на диск в
+фоновом потоке (L<уровень>/<x>_<y>.png); пока запись не закончена,
+плитка берется из очереди записи. Плитки, на которых ничего не
+нарисовано, не хранятся вовсе: какие плитки есть, записано в
+manifest.json.
+"""
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QPoint, Qt
+from PyQt5.QtGui import QImage, QPainter
+
+from canvas_saver import write_file, write_png
+
+MANIFEST_FILE = "manifest.json"
+TILE_SIZE = 256
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class TileCache:
+    """Плитки рисунка width x height.
+
+    Все методы, кроме фоновой записи, вызываются из потока интерфейса
+    (или из потока отрисовки Qt, пока поток интерфейса ждет его).
+    """
+
+    def __init__(self, directory, width, height, tile_size=TILE_SIZE, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self.tile_bytes = tile_size * tile_size * 4
+        # (уровень, x, y) -> QImage, от давно использованных к недавним
+        self._tiles = OrderedDict()
+        self._dirty = set()
+        # Плитки, стоящие в очереди на запись: (уровень, x, y) -> QImage
+        self._spilling = {}
+        self._spill_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tile-spill")
+        # Счетчики: вытеснено измененных плиток и прочитано с диска
+        self.spilled = 0
+        self.loaded = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_manifest(width, height)
+
+    def _load_manifest(self, width, height):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        data = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения манифеста плиток: {e}")
+        if data and data.get("tile") != self.tile_size:
+            print("Манифест плиток другого формата, рисунок начинается заново")
+            data = {}
+        # Размер уже начатого рисунка не меняется
+        self.width = data.get("width", width)
+        self.height = data.get("height", height)
+        self.levels = max(1, math.ceil(math.log2(max(self.width, self.height) / self.tile_size)) + 1)
+        # Плитки с содержимым по уровням и устаревшие плитки уровней выше 0
+        self._present = [set() for _ in range(self.levels)]
+        for level, tiles in enumerate(data.get("present", [])[:self.levels]):
+            self._present[level] = {tuple(tile) for tile in tiles}
+        self._stale = {tuple(tile) for tile in data.get("stale", [])}
+
+    def columns(self, level=0):
+        return math.ceil(self.width / (self.tile_size << level))
+
+    def rows(self, level=0):
+        return math.ceil(self.height / (self.tile_size << level))
+
+    @property
+    def memory_bytes(self):
+        return len(self._tiles) * self.tile_bytes
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def path(self, level, x, y):
+        return os.path.join(self.directory, f"L{level}", f"{x}_{y}.png")
+
+    def has_content(self, level, x, y):
+        return (x, y) in self._present[level]
+
+    def _new_tile(self):
+        image = QImage(self.tile_size, self.tile_size, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        return image
+
+    def get(self, level, x, y):
+        """Плитка или None, если на ней ничего нет"""
+        if not self.has_content(level, x, y):
+            return None
+        key = (level, x, y)
+        if key in self._stale:
+            return self._rebuild(level, x, y)
+        image = self._tiles.get(key)
+        if image is not None:
+            self._tiles.move_to_end(key)
+            return image
+        with self._spill_lock:
+            spilling = self._spilling.get(key)
+        if spilling is not None:
+            # Копия: в очереди остается изображение, которое сейчас кодируется
+            image = spilling.copy()
+            self._dirty.add(key)
+        else:
+            image = QImage(self.path(level, x, y))
+            if image.isNull():
+                if level == 0:
+                    print(f"Не удалось прочитать плитку {self.path(level, x, y)}")
+                    return None
+                return self._rebuild(level, x, y)
+            self.loaded += 1
+        self._put(key, image)
+        return image
+
+    def _rebuild(self, level, x, y):
+        """Собирает плитку уровня level из четырех плиток уровня ниже"""
+        key = (level, x, y)
+        image = self._new_tile()
+        half = self.tile_size // 2
+        painter = QPainter(image)
+        try:
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    child = self.get(level - 1, 2 * x + dx, 2 * y + dy)
+                    if child is not None:
+                        small = child.scaled(half, half, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+                        painter.drawImage(QPoint(dx * half, dy * half), small)
+        finally:
+            painter.end()
+        self._stale.discard(key)
+        self._dirty.add(key)
+        self._put(key, image)
+        return image
+
+    def _put(self, key, image):
+        self._tiles[key] = image
+        self._tiles.move_to_end(key)
+        while len(self._tiles) * self.tile_bytes > self.max_bytes and len(self._tiles) > 1:
+            evicted_key, evicted = self._tiles.popitem(last=False)
+            if evicted_key in self._dirty:
+                self._dirty.discard(evicted_key)
+                self._spill(evicted_key, evicted)
+                self.spilled += 1
+
+    def _spill(self, key, image):
+        with self._spill_lock:
+            self._spilling[key] = image
+        self._executor.submit(self._write, key, image)
+
+    def _write(self, key, image):
+        path = self.path(*key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_png(image, path)
+        except OSError as e:
+            print(f"Ошибка записи плитки {path}: {e}")
+        finally:
+            with self._spill_lock:
+                if self._spilling.get(key) is image:
+                    del self._spilling[key]
+
+    def tiles_for(self, rect):
+        """Плитки уровня 0, которые задевает прямоугольник рисунка (x, y, w, h)"""
+        x, y, w, h = rect
+        size = self.tile_size
+        first_x, last_x = max(0, int(x // size)), min(self.columns() - 1, int((x + w) // size))
+        first_y, last_y = max(0, int(y // size)), min(self.rows() - 1, int((y + h) // size))
+        return [(tx, ty) for ty in range(first_y, last_y + 1) for tx in range(first_x, last_x + 1)]
+
+    def edit(self, x, y):
+        """Плитка уровня 0 для рисования (создается при необходимости).
+
+        Плитки уровней выше, покрывающие ее, становятся устаревшими.
+        """
+        key = (0, x, y)
+        image = self.get(0, x, y) if self.has_content(0, x, y) else None
+        if image is None:
+            image = self._new_tile()
+            self._present[0].add((x, y))
+            self._put(key, image)
+        self._dirty.add(key)
+        for level in range(1, self.levels):
+            parent = (level, x >> level, y >> level)
+            self._present[level].add(parent[1:])
+            self._stale.add(parent)
+            self._tiles.pop(parent, None)
+            self._dirty.discard(parent)
+        return image
+
+    def flush(self, wait=False):
+        """Записывает измененные плитки и манифест на диск (в фоновом потоке)"""
+        for key in list(self._dirty):
+            image = self._tiles.get(key)
+            if image is not None:
+                self._spill(key, image.copy())
+        self._dirty.clear()
+        manifest = {"width": self.width, "height": self.height, "tile": self.tile_size,
+                    "present": [sorted(tiles) for tiles in self._present], "stale": sorted(self._stale)}
+        data = json.dumps(manifest).encode("utf-8")
+        future = self._executor.submit(write_file, os.path.join(self.directory, MANIFEST_FILE), data)
+        if wait:
+            future.result()
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
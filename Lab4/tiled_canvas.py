@@ -0,0 +1,241 @@
+"""Большой рисунок (например, 20000x20000) с прокруткой и масштабом.
+
+TiledCanvas - элемент QML, который рисует только видимые плитки
+TileCache. При уменьшении масштаба берутся плитки уровня пирамиды,
+близкого к экрану по разрешению, поэтому даже весь рисунок целиком
+складывается из нескольких десятков плиток. Штрихи рисуются прямо в
+плитки уровня 0 в координатах рисунка.
+
+    python main.py --poster 20000x20000
+"""
+import math
+
+from PyQt5.QtCore import QPointF, QRectF, QTimer, Qt, pyqtProperty, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QColor, QPainter, QPen
+from PyQt5.QtQuick import QQuickPaintedItem
+
+from tile_cache import DEFAULT_MAX_BYTES, TileCache
+
+MIN_ZOOM = 1 / 256
+MAX_ZOOM = 16
+# Интервал записи измененных плиток на диск, мс
+FLUSH_INTERVAL = 10000
+
+
+class TiledCanvasItem(QQuickPaintedItem):
+    zoomChanged = pyqtSignal()
+    # Изменилась статистика кэша плиток
+    statsChanged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cache = None
+        self._directory = ""
+        self._doc_width = 20000
+        self._doc_height = 20000
+        self._max_bytes = DEFAULT_MAX_BYTES
+        # Экранная точка = точка рисунка * zoom + pan
+        self._zoom = 1.0
+        self._pan = QPointF(0, 0)
+        self._color = QColor("#33B5E5")
+        self._thickness = 1.0
+        self._last_point = None
+        self._drawn_tiles = 0
+        self.setOpaquePainting(True)
+        self.setFillColor(QColor("white"))
+        self._flush_timer = QTimer()
+        self._flush_timer.timeout.connect(self.flush)
+
+    # Настройки из QML (задаются до загрузки)
+    @pyqtProperty(str)
+    def directory(self):
+        return self._directory
+
+    @directory.setter
+    def directory(self, directory):
+        self._directory = directory
+
+    @pyqtProperty(int)
+    def docWidth(self):
+        return self._cache.width if self._cache else self._doc_width
+
+    @docWidth.setter
+    def docWidth(self, width):
+        self._doc_width = width
+
+    @pyqtProperty(int)
+    def docHeight(self):
+        return self._cache.height if self._cache else self._doc_height
+
+    @docHeight.setter
+    def docHeight(self, height):
+        self._doc_height = height
+
+    @pyqtProperty(int)
+    def cacheMegabytes(self):
+        return self._max_bytes // (1024 * 1024)
+
+    @cacheMegabytes.setter
+    def cacheMegabytes(self, megabytes):
+        self._max_bytes = megabytes * 1024 * 1024
+
+    @pyqtProperty(QColor)
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, color):
+        self._color = QColor(color)
+
+    @pyqtProperty(float)
+    def thickness(self):
+        return self._thickness
+
+    @thickness.setter
+    def thickness(self, thickness):
+        self._thickness = thickness
+
+    @pyqtProperty(float, notify=zoomChanged)
+    def zoom(self):
+        return self._zoom
+
+    @pyqtProperty(str, notify=statsChanged)
+    def stats(self):
+        """Состояние кэша для строки статуса"""
+        if self._cache is None:
+            return ""
+        cache = self._cache
+        return (f"{cache.width}x{cache.height}, уровень {self.level()}, плиток на экране: {self._drawn_tiles}, "
+                f"в памяти: {len(cache)} ({cache.memory_bytes // (1024 * 1024)} МБ), "
+                f"вытеснено: {cache.spilled}, прочитано: {cache.loaded}")
+
+    def componentComplete(self):
+        super().componentComplete()
+        self._cache = TileCache(self._directory, self._doc_width, self._doc_height, max_bytes=self._max_bytes)
+        self._flush_timer.start(FLUSH_INTERVAL)
+
+    def level(self):
+        """Уровень пирамиды для текущего масштаба: плитка на экране не меньше половины своего размера"""
+        if self._zoom >= 1 or self._cache is None:
+            return 0
+        return min(self._cache.levels - 1, int(math.floor(math.log2(1 / self._zoom))))
+
+    def to_document(self, x, y):
+        return QPointF((x - self._pan.x()) / self._zoom, (y - self._pan.y()) / self._zoom)
+
+    def paint(self, painter):
+        if self._cache is None:
+            return
+        cache = self._cache
+        level = self.level()
+        span = cache.tile_size << level
+        # Видимая часть рисунка в его координатах
+        top_left = self.to_document(0, 0)
+        bottom_right = self.to_document(self.width(), self.height())
+        first_x = max(0, int(top_left.x() // span))
+        first_y = max(0, int(top_left.y() // span))
+        last_x = min(cache.columns(level) - 1, int(bottom_right.x() // span))
+        last_y = min(cache.rows(level) - 1, int(bottom_right.y() // span))
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, self._zoom < 1)
+        drawn = 0
+        screen_span = span * self._zoom
+        for ty in range(first_y, last_y + 1):
+            for tx in range(first_x, last_x + 1):
+                tile = cache.get(level, tx, ty)
+                if tile is None:
+                    continue
+                target = QRectF(tx * screen_span + self._pan.x(), ty * screen_span + self._pan.y(),
+                                screen_span, screen_span)
+                painter.drawImage(target, tile)
+                drawn += 1
+        # Граница рисунка
+        painter.setPen(QPen(QColor("#999999"), 1))
+        painter.drawRect(QRectF(self._pan.x(), self._pan.y(), cache.width * self._zoom, cache.height * self._zoom))
+        # paint() может выполняться в потоке отрисовки, поэтому statsChanged
+        # испускается в слотах потока интерфейса
+        self._drawn_tiles = drawn
+
+    @pyqtSlot(float, float)
+    def panBy(self, dx, dy):
+        self._pan += QPointF(dx, dy)
+        self.update()
+        self.statsChanged.emit()
+
+    @pyqtSlot(float, float, float)
+    def zoomAt(self, factor, x, y):
+        """Меняет масштаб в factor раз, оставляя точку экрана (x, y) на месте"""
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, self._zoom * factor))
+        point = self.to_document(x, y)
+        self._zoom = zoom
+        self._pan = QPointF(x - point.x() * zoom, y - point.y() * zoom)
+        self.zoomChanged.emit()
+        self.update()
+        self.statsChanged.emit()
+
+    @pyqtSlot()
+    def fitToView(self):
+        """Показывает рисунок целиком"""
+        if self._cache is None or self.width() <= 0 or self.height() <= 0:
+            return
+        self._zoom = max(MIN_ZOOM, min(self.width() / self._cache.width, self.height() / self._cache.height))
+        self._pan = QPointF((self.width() - self._cache.width * self._zoom) / 2,
+                            (self.height() - self._cache.height * self._zoom) / 2)
+        self.zoomChanged.emit()
+        self.update()
+        self.statsChanged.emit()
+
+    # Рисование: координаты экрана из MouseArea
+    @pyqtSlot(float, float)
+    def beginStroke(self, x, y):
+        self._last_point = self.to_document(x, y)
+        self._draw_segment(self._last_point, self._last_point)
+
+    @pyqtSlot(float, float)
+    def addPoint(self, x, y):
+        if self._last_point is None:
+            return
+        point = self.to_document(x, y)
+        self._draw_segment(self._last_point, point)
+        self._last_point = point
+
+    @pyqtSlot()
+    def endStroke(self):
+        self._last_point = None
+        self.statsChanged.emit()
+
+    def _draw_segment(self, start, end):
+        cache = self._cache
+        if cache is None:
+            return
+        margin = self._thickness / 2 + 1
+        left, right = min(start.x(), end.x()) - margin, max(start.x(), end.x()) + margin
+        top, bottom = min(start.y(), end.y()) - margin, max(start.y(), end.y()) + margin
+        pen = QPen(self._color, self._thickness)
+        pen.setCapStyle(Qt.RoundCap)
+        size = cache.tile_size
+        for tx, ty in cache.tiles_for((left, top, right - left, bottom - top)):
+            image = cache.edit(tx, ty)
+            tile_painter = QPainter(image)
+            tile_painter.setRenderHint(QPainter.Antialiasing)
+            tile_painter.translate(-tx * size, -ty * size)
+            tile_painter.setPen(pen)
+            tile_painter.drawLine(start, end)
+            tile_painter.end()
+        # Перерисовывается только задетая область экрана
+        self.update(QRectF(left * self._zoom + self._pan.x(), top * self._zoom + self._pan.y(),
+                           (right - left) * self._zoom, (bottom - top) * self._zoom).toAlignedRect())
+
+    @pyqtSlot()
+    def flush(self):
+        """Записывает измененные плитки на диск в фоне"""
+        if self._cache is not None:
+            self._cache.flush()
+            self.statsChanged.emit()
+
+    @pyqtSlot()
+    def close(self):
+        """Записывает все плитки и дожидается записи (при выходе)"""
+        self._flush_timer.stop()
+        if self._cache is not None:
+            self._cache.close()